@@ -0,0 +1,78 @@
+"""Benchmarks AnalysisResultLoader parsing analysis results whole against parsing them incrementally with ijson.
+
+The bundled fixtures are scaled up to a range of page counts, then each file is loaded both ways with the sections the
+DocumentCanvas loads: the page sizes and documents of a model result, and the words and lines of a layout result. The time
+and peak memory of each load show where the loader's `stream_min_bytes` threshold should be.
+
+Run from the repository root with: python -m benchmarks.analysis_result_loader
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import timeit
+import tracemalloc
+from benchmarks.fixtures import (load_analyze_result, scale_pages)
+from modules.analysis_result_loader import AnalysisResultLoader
+
+# The fixtures and the sections the DocumentCanvas loads from each.
+LOADS = {
+    'model': (os.path.join('pdfs', 'Invoice_6.pdf.ocr_1.0.0.json'), ('pages', 'documents'), ('pageNumber', 'width', 'height')),
+    'layout': (os.path.join('model_training', 'Invoice_1.pdf.ocr.json'), ('pages',), ('pageNumber', 'width', 'height', 'words', 'lines'))
+}
+
+
+def measure_load(analysis_result_path: str, sections: tuple[str, ...], page_keys: tuple[str, ...], stream: bool, repeat: int):
+    """Measures loading an analysis result file with a fresh loader, so nothing is served from its cache.
+
+    :param analysis_result_path: The path to the analysis result file.
+    :param sections: The sections of the analysis result to load.
+    :param page_keys: The keys to keep from each page.
+    :param stream: Whether to parse the file incrementally rather than whole.
+    :param repeat: The number of times to time the load.
+    :return: The fastest time in seconds, and the peak memory allocated in bytes.
+    """
+
+    def load():
+        loader = AnalysisResultLoader(stream_min_bytes=0 if stream else float('inf'))
+        return loader.load(analysis_result_path, sections, page_keys)
+
+    seconds = min(timeit.repeat(load, repeat=repeat, number=1))
+
+    tracemalloc.start()
+    load()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return seconds, peak_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark loading analysis results whole against incrementally.')
+    parser.add_argument('--page-counts', type=int, nargs='+', default=[10, 100, 300, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for kind, (fixture_path, sections, page_keys) in LOADS.items():
+            analyze_result = load_analyze_result(fixture_path)
+            for page_count in args.page_counts:
+                analysis_result_path = os.path.join(work_dir, f"{kind}_{page_count}.ocr.json")
+                with open(analysis_result_path, 'w') as file:
+                    json.dump({'analyzeResult': scale_pages(analyze_result, page_count)}, file)
+
+                size = os.path.getsize(analysis_result_path)
+                whole_seconds, whole_peak = measure_load(
+                    analysis_result_path, sections, page_keys, stream=False, repeat=args.repeat)
+                stream_seconds, stream_peak = measure_load(
+                    analysis_result_path, sections, page_keys, stream=True, repeat=args.repeat)
+
+                print(f"{kind} {page_count} pages ({size / 1024 / 1024:.1f} MiB): "
+                      f"whole {whole_seconds * 1000:.1f} ms, {whole_peak / 1024 / 1024:.1f} MiB peak; "
+                      f"stream {stream_seconds * 1000:.1f} ms, {stream_peak / 1024 / 1024:.1f} MiB peak")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""Loads the bundled analysis results and scales them up into synthetic documents for benchmarking.
+
+The scaled documents repeat the pages of a fixture, shifting the page numbers and span offsets of every copy, and repeat the
+rows of its table fields across the pages, so the benchmarks can measure how each stage behaves on long documents.
+"""
+
+import copy
+import json
+import os
+import re
+import shutil
+import subprocess
+
+
+def load_analyze_result(ocr_json_path: str):
+    """Loads the `analyzeResult` of an analysis result file.
+
+    :param ocr_json_path: The path to the analysis result file, e.g. `<document>.ocr.json`.
+    :return: The analysis result.
+    """
+
+    with open(ocr_json_path, 'r') as file:
+        return json.load(file)['analyzeResult']
+
+
+def to_analyze_result_dict(value, is_fields: bool = False):
+    """Converts a formatted analysis result back into the shape produced by AnalyzeResult.to_dict().
+
+    :param value: The formatted analysis result, or a value within it.
+    :param is_fields: Whether the value is a dictionary of document fields, whose keys are field names and kept as they are.
+    :return: The value with snake case keys and polygons as lists of points.
+    """
+
+    if isinstance(value, list):
+        return [to_analyze_result_dict(item) for item in value]
+
+    if not isinstance(value, dict):
+        return value
+
+    result = {}
+    for key, item in value.items():
+        if key == 'polygon':
+            item = [{'x': item[i], 'y': item[i + 1]}
+                    for i in range(0, len(item), 2)]
+        elif is_fields:
+            item = to_analyze_result_dict(item)
+        else:
+            item = to_analyze_result_dict(
+                item, is_fields=key == 'fields' or (key == 'value' and value.get('valueType') == 'dictionary'))
+
+        result[key if is_fields else re.sub(r'(?<!^)(?=[A-Z])', '_', key).lower()] = item
+
+    return result
+
+
+def scale_pages(analyze_result: dict, page_count: int):
+    """Scales an analysis result up to a number of pages by repeating its pages.
+
+    Every element of a repeated page, and the region of every field other than table rows, is copied with its page number and
+    span offsets shifted to the copy.
+
+    :param analyze_result: The `analyzeResult` of a Document Intelligence analysis.
+    :param page_count: The number of pages of the scaled analysis result.
+    :return: The scaled analysis result.
+    """
+
+    source_page_count = len(analyze_result['pages'])
+    content_length = len(analyze_result.get('content') or '')
+    copies = -(-page_count // source_page_count)
+
+    scaled = {key: value for key, value in analyze_result.items()
+              if key not in ('pages', 'paragraphs', 'tables', 'keyValuePairs', 'documents')}
+    scaled['content'] = (analyze_result.get('content') or '') * copies
+
+    for key in ('pages', 'paragraphs', 'tables', 'keyValuePairs'):
+        if key not in analyze_result:
+            continue
+
+        scaled[key] = []
+        for i in range(copies):
+            for element in analyze_result[key]:
+                element_copy = _shift(
+                    element, i * source_page_count, i * content_length)
+                if key != 'pages' or element_copy['pageNumber'] <= page_count:
+                    scaled[key].append(element_copy)
+
+    if 'documents' in analyze_result:
+        scaled['documents'] = []
+        for document in analyze_result['documents']:
+            document_copy = copy.deepcopy(document)
+            document_copy['boundingRegions'] = _repeat_regions(
+                document.get('boundingRegions') or [], copies, source_page_count, page_count)
+            _scale_field_regions(
+                document_copy['fields'], copies, source_page_count, page_count)
+            scaled['documents'].append(document_copy)
+
+    return scaled
+
+
+def scale_table_rows(analyze_result: dict, row_count: int):
+    """Scales the table fields of an analysis result up to a number of rows, spread evenly across its pages.
+
+    :param analyze_result: The `analyzeResult` of a Document Intelligence analysis.
+    :param row_count: The number of rows of each table field.
+    :return: The scaled analysis result.
+    """
+
+    scaled = copy.deepcopy(analyze_result)
+    page_count = len(scaled['pages'])
+
+    for document in scaled.get('documents') or []:
+        for field in document['fields'].values():
+            rows = field.get('value') or []
+            if field.get('valueType') != 'list' or len(rows) == 0:
+                continue
+
+            rows_per_page = -(-row_count // page_count)
+            scaled_rows = []
+            for i in range(row_count):
+                row = copy.deepcopy(rows[i % len(rows)])
+                page_number = i // rows_per_page + 1
+                for row_field in (row.get('value') or {}).values():
+                    for bounding_region in row_field.get('boundingRegions') or []:
+                        bounding_region['pageNumber'] = page_number
+                scaled_rows.append(row)
+            field['value'] = scaled_rows
+
+    return scaled
+
+
+def generate_document(analyze_result: dict, page_count: int = 100, row_count: int = 1000):
+    """Generates a synthetic document from an analysis result, scaled up in both pages and table rows.
+
+    :param analyze_result: The `analyzeResult` of a Document Intelligence analysis.
+    :param page_count: The number of pages of the document.
+    :param row_count: The number of rows of each table field.
+    :return: The analysis result of the synthetic document.
+    """
+
+    return scale_table_rows(scale_pages(analyze_result, page_count), row_count)
+
+
+def generate_pdf(pdf_file_path: str, page_count: int, output_pdf_path: str):
+    """Generates a long PDF by repeating a PDF file with Poppler's pdfunite.
+
+    :param pdf_file_path: The path to the PDF file to repeat.
+    :param page_count: The number of times to repeat the PDF file.
+    :param output_pdf_path: The path to save the generated PDF to.
+    :return: The path to the generated PDF, or None if pdfunite is not installed.
+    """
+
+    if shutil.which('pdfunite') is None:
+        return None
+
+    if not os.path.exists(output_pdf_path):
+        subprocess.run(['pdfunite', *([pdf_file_path] * page_count), output_pdf_path],
+                       check=True, capture_output=True)
+
+    return output_pdf_path
+
+
+def _shift(value, page_offset: int, span_offset: int):
+    if isinstance(value, list):
+        return [_shift(item, page_offset, span_offset) for item in value]
+
+    if not isinstance(value, dict):
+        return value
+
+    shifted = {}
+    for key, item in value.items():
+        if key == 'pageNumber':
+            item = item + page_offset
+        elif key == 'offset' and isinstance(item, int):
+            item = item + span_offset
+        else:
+            item = _shift(item, page_offset, span_offset)
+        shifted[key] = item
+
+    return shifted
+
+
+def _repeat_regions(bounding_regions: list[dict], copies: int, source_page_count: int, page_count: int):
+    regions = []
+    for i in range(copies):
+        for bounding_region in bounding_regions:
+            page_number = bounding_region['pageNumber'] + i * source_page_count
+            if page_number <= page_count:
+                regions.append({**bounding_region, 'pageNumber': page_number})
+    return regions
+
+
+def _scale_field_regions(fields: dict, copies: int, source_page_count: int, page_count: int):
+    # The rows of table fields are left on their pages, as they are spread across the pages by scale_table_rows.
+    for field in fields.values():
+        if 'boundingRegions' in field:
+            field['boundingRegions'] = _repeat_regions(
+                field['boundingRegions'], copies, source_page_count, page_count)
@@ -0,0 +1,426 @@
+"""Runs a load test of the ModelTrainingClient against the local service emulator.
+
+Each scenario exercises one stage of the training loop at each of the given concurrency levels, and reports its throughput,
+latency percentiles, and the requests the emulator throttled or failed along the way:
+
+- `upload`: `upload_training_data` of the training data folder, with the given number of concurrent file uploads.
+- `analyze`: `run_layout_analysis` of the training documents, with the given number of concurrent analyses.
+- `build`: `create_model`, with the given number of concurrent builds.
+- `delete`: `delete_training_data` of seeded blobs, with the given number of concurrent batch delete requests of 256 blobs each.
+- `batch_analyze`: `BatchAnalysisClient.analyze_documents_iter` of copies of the training documents, with the given number of
+  analyses in flight.
+- `build_jobs`: `ModelBuildJobManager.start_build` and `wait`, with the given number of builds tracked at once.
+
+The build scenarios upload the training data first if the container has none, since the emulator fails builds without labels.
+
+No Azure resources are needed. Run from the repository root with, for example:
+
+    python -m benchmarks.load_test --concurrency 1 4 16 --operations 64 --throttle-rate 0.05
+"""
+
+import argparse
+import itertools
+import json
+import asyncio
+import email.utils
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.service_emulator import ServiceEmulator
+from modules import instrumentation
+from modules.app_settings import AppSettings
+from modules.batch_analysis_client import BatchAnalysisClient
+from modules.model_training_client import (DELETE_BATCH_SIZE, ModelTrainingClient)
+from modules.service_client_factory import ServiceClientFactory
+
+SCENARIOS = ['upload', 'analyze', 'build', 'delete', 'batch_analyze', 'build_jobs']
+
+
+class LoadTestResult:
+    """A class representing the outcome of a load test scenario at one concurrency level."""
+
+    def __init__(self, scenario: str, concurrency: int, latencies_seconds: list[float], errors: int, elapsed_seconds: float, requests: dict[str, int]):
+        """Initializes the LoadTestResult.
+
+        :param scenario: The name of the scenario, e.g. `analyze`.
+        :param concurrency: The number of concurrent operations.
+        :param latencies_seconds: The latency of each successful operation, in seconds.
+        :param errors: The number of operations that failed.
+        :param elapsed_seconds: The wall-clock time of the scenario, in seconds.
+        :param requests: The counts of the requests served by the emulator, by service and status or injected fault.
+        """
+
+        import numpy as np
+
+        self.scenario = scenario
+        self.concurrency = concurrency
+        self.operations = len(latencies_seconds)
+        self.errors = errors
+        self.elapsed_seconds = elapsed_seconds
+        self.requests = requests
+
+        latencies = np.asarray(latencies_seconds, dtype=np.float64)
+        if len(latencies) > 0:
+            self.p50_seconds, self.p95_seconds, self.p99_seconds = (
+                float(value) for value in np.percentile(latencies, [50, 95, 99]))
+        else:
+            self.p50_seconds = self.p95_seconds = self.p99_seconds = 0.0
+
+    @property
+    def throughput(self):
+        """The number of successful operations per second."""
+
+        return self.operations / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    @property
+    def throttled(self):
+        """The number of requests the emulator throttled."""
+
+        return sum(count for key, count in self.requests.items() if key.endswith('/throttled'))
+
+    @property
+    def failed(self):
+        """The number of requests the emulator failed."""
+
+        return sum(count for key, count in self.requests.items() if key.endswith('/failed'))
+
+    def to_dict(self):
+        return {
+            "scenario": self.scenario,
+            "concurrency": self.concurrency,
+            "operations": self.operations,
+            "errors": self.errors,
+            "elapsedSeconds": self.elapsed_seconds,
+            "throughput": self.throughput,
+            "p50Seconds": self.p50_seconds,
+            "p95Seconds": self.p95_seconds,
+            "p99Seconds": self.p99_seconds,
+            "requests": self.requests
+        }
+
+
+class LoadTest:
+    """A load test of the ModelTrainingClient against a service emulator."""
+
+    def __init__(self, emulator: ServiceEmulator, training_data_dir: str, work_dir: str, shared_clients: bool = True, retry_total: int = 5, retry_backoff_factor: float = 0.8):
+        """Initializes the LoadTest.
+
+        :param emulator: The running service emulator.
+        :param training_data_dir: The directory of training data to upload and analyze.
+        :param work_dir: The directory to write the layout analysis results to.
+        :param shared_clients: Whether the clients share pooled service clients through a ServiceClientFactory, rather than each creating its own.
+        :param retry_total: The maximum number of retries for a failed request, when the clients are shared.
+        :param retry_backoff_factor: The backoff factor for retries, in seconds, when the clients are shared.
+        """
+
+        self.emulator = emulator
+        self.settings: AppSettings = emulator.get_settings()
+        self.training_data_dir = training_data_dir
+        self.work_dir = work_dir
+        self.shared_clients = shared_clients
+        self.retry_total = retry_total
+        self.retry_backoff_factor = retry_backoff_factor
+        self.document_paths = sorted(os.path.join(training_data_dir, file_name)
+                                     for file_name in os.listdir(training_data_dir) if file_name.lower().endswith('.pdf'))
+
+    def run(self, scenario: str, concurrency: int, operations: int):
+        """Runs a scenario at a concurrency level.
+
+        :param scenario: The name of the scenario, one of SCENARIOS.
+        :param concurrency: The number of concurrent operations.
+        :param operations: The number of operations to run. For `upload`, the number of times to upload the training data folder, and for `delete`, the number of batch delete requests.
+        :return: The result of the scenario.
+        """
+
+        client_factory = None
+        if self.shared_clients:
+            client_factory = ServiceClientFactory(
+                pool_maxsize=max(concurrency, 10), retry_total=self.retry_total, retry_backoff_factor=self.retry_backoff_factor)
+
+        try:
+            if scenario in ('build', 'build_jobs'):
+                self.__ensure_training_data__(client_factory)
+            self.emulator.reset_stats()
+            if scenario == 'upload':
+                latencies, errors, elapsed_seconds = self.__run_upload__(
+                    client_factory, concurrency, operations)
+            elif scenario in ('analyze', 'build'):
+                latencies, errors, elapsed_seconds = self.__run_operations__(
+                    scenario, client_factory, concurrency, operations)
+            elif scenario == 'delete':
+                latencies, errors, elapsed_seconds = self.__run_delete__(
+                    client_factory, concurrency, operations)
+            elif scenario == 'batch_analyze':
+                latencies, errors, elapsed_seconds = asyncio.run(
+                    self.__run_batch_analyze__(concurrency, operations))
+            elif scenario == 'build_jobs':
+                latencies, errors, elapsed_seconds = self.__run_build_jobs__(
+                    client_factory, concurrency, operations)
+            else:
+                raise ValueError(f"Unknown scenario: {scenario}")
+        finally:
+            if client_factory is not None:
+                client_factory.close()
+
+        return LoadTestResult(scenario, concurrency, latencies, errors, elapsed_seconds, self.emulator.reset_stats())
+
+    def __run_upload__(self, client_factory: ServiceClientFactory | None, concurrency: int, operations: int):
+        """Uploads the training data folder repeatedly, timing each file upload through its instrumentation span."""
+
+        client = ModelTrainingClient(self.settings, client_factory=client_factory)
+        sink = instrumentation.InMemorySink()
+        instrumentation.enable(sink)
+        errors = 0
+        try:
+            start_time = time.perf_counter()
+            for _ in range(operations):
+                result = client.upload_training_data(
+                    self.training_data_dir, max_concurrency=concurrency, raise_on_error=False)
+                errors += len(result.failed)
+            elapsed_seconds = time.perf_counter() - start_time
+        finally:
+            instrumentation.disable()
+
+        latencies = [record.duration_seconds for record in sink.records
+                     if record.stage == 'upload_training_file' and record.error is None]
+        return latencies, errors, elapsed_seconds
+
+    def __run_operations__(self, scenario: str, client_factory: ServiceClientFactory | None, concurrency: int, operations: int):
+        """Runs analyses or model builds concurrently, with a client per worker thread."""
+
+        # The clients keep the latest result of each operation, so each worker thread has its own.
+        clients = threading.local()
+        model_ids = itertools.count()
+
+        def get_client():
+            client = getattr(clients, 'client', None)
+            if client is None:
+                client = ModelTrainingClient(
+                    self.settings, client_factory=client_factory)
+                client.training_data_container_client_sas_url = client.training_data_container_client.url
+                clients.client = client
+            return client
+
+        def run_operation(index: int):
+            client = get_client()
+            start_time = time.perf_counter()
+            if scenario == 'analyze':
+                document_path = self.document_paths[index % len(self.document_paths)]
+                client.run_layout_analysis(
+                    document_path, os.path.join(self.work_dir, f"{index}.ocr.json"))
+            else:
+                client.create_model(f"load-test-{next(model_ids)}")
+            return time.perf_counter() - start_time
+
+        latencies = []
+        errors = 0
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(run_operation, index)
+                       for index in range(operations)]
+            for future in futures:
+                try:
+                    latencies.append(future.result())
+                except Exception:
+                    errors += 1
+        elapsed_seconds = time.perf_counter() - start_time
+
+        return latencies, errors, elapsed_seconds
+
+    def __ensure_training_data__(self, client_factory: ServiceClientFactory | None):
+        """Uploads the training data folder if the container has no labels to build a model from."""
+
+        container = self.emulator.containers.get(self.settings.training_data_container_name, {})
+        if not any(blob_name.endswith('.labels.json') for blob_name in list(container)):
+            ModelTrainingClient(self.settings, client_factory=client_factory).upload_training_data(
+                self.training_data_dir, incremental=True)
+
+    def __run_delete__(self, client_factory: ServiceClientFactory | None, concurrency: int, operations: int):
+        """Deletes seeded blobs in batches, timing each batch delete request."""
+
+        # Seeding the blobs through upload requests would dominate the run, so they are added to the emulator directly.
+        prefix = 'load-test/'
+        last_modified = email.utils.formatdate(usegmt=True)
+        with self.emulator._lock:
+            container = self.emulator.containers.setdefault(self.settings.training_data_container_name, {})
+            for index in range(operations * DELETE_BATCH_SIZE):
+                container[f"{prefix}{index}.pdf"] = {
+                    'size': 0, 'md5': '1B2M2Y8AsgTpgAmY7PhCfg==', 'etag': f'"0x{index:015X}"', 'last_modified': last_modified}
+
+        client = ModelTrainingClient(self.settings, client_factory=client_factory)
+        batch_delete = client.__delete_training_data_batch__
+        latencies = []
+        errors = 0
+        lock = threading.Lock()
+
+        def timed_batch_delete(blob_names: list[str]):
+            nonlocal errors
+            start_time = time.perf_counter()
+            try:
+                responses = batch_delete(blob_names)
+            except Exception:
+                with lock:
+                    errors += 1
+                raise
+            with lock:
+                if all(response.status_code in (200, 202) for response in responses):
+                    latencies.append(time.perf_counter() - start_time)
+                else:
+                    errors += 1
+            return responses
+
+        client.__delete_training_data_batch__ = timed_batch_delete
+        start_time = time.perf_counter()
+        client.delete_training_data(prefix, max_concurrency=concurrency)
+        elapsed_seconds = time.perf_counter() - start_time
+
+        return latencies, errors, elapsed_seconds
+
+    async def __run_batch_analyze__(self, concurrency: int, operations: int):
+        """Analyzes copies of the training documents with a BatchAnalysisClient, timing each analysis."""
+
+        # Each analysis gets its own copy of a document, so the results are saved to separate OCR JSON paths.
+        documents_dir = os.path.join(self.work_dir, 'batch_analyze')
+        shutil.rmtree(documents_dir, ignore_errors=True)
+        os.makedirs(documents_dir)
+        documents = []
+        for index in range(operations):
+            document_path = self.document_paths[index % len(self.document_paths)]
+            documents.append(shutil.copyfile(document_path, os.path.join(
+                documents_dir, f"{index}_{os.path.basename(document_path)}")))
+
+        latencies = []
+        errors = 0
+        async with BatchAnalysisClient(self.settings, max_concurrency=concurrency) as client:
+            begin_analyze_document = client.__begin_analyze_document__
+
+            async def timed_begin_analyze_document(model_id: str, document: bytes):
+                start_time = time.perf_counter()
+                analysis_result = await begin_analyze_document(model_id, document)
+                latencies.append(time.perf_counter() - start_time)
+                return analysis_result
+
+            client.__begin_analyze_document__ = timed_begin_analyze_document
+            start_time = time.perf_counter()
+            async for result in client.analyze_documents_iter(documents):
+                if not result.succeeded:
+                    errors += 1
+            elapsed_seconds = time.perf_counter() - start_time
+
+        return latencies, errors, elapsed_seconds
+
+    def __run_build_jobs__(self, client_factory: ServiceClientFactory | None, concurrency: int, operations: int):
+        """Starts model builds through a ModelBuildJobManager and waits for each, timing each build from start to completion."""
+
+        client = ModelTrainingClient(self.settings, client_factory=client_factory)
+        state_file_path = os.path.join(self.work_dir, f"build_jobs_{concurrency}.json")
+        manager = client.create_model_build_job_manager(state_file_path)
+        blob_container_url = client.training_data_container_client.url
+
+        def run_build(index: int):
+            model_id = f"load-test-job-{concurrency}-{index}"
+            manager.start_build(model_id, blob_container_url)
+            manager.wait(model_id)
+            return manager.jobs[model_id].elapsed_seconds
+
+        latencies = []
+        errors = 0
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(run_build, index)
+                       for index in range(operations)]
+            for future in futures:
+                try:
+                    latencies.append(future.result())
+                except Exception:
+                    errors += 1
+        elapsed_seconds = time.perf_counter() - start_time
+
+        return latencies, errors, elapsed_seconds
+
+
+def format_results(results: list[LoadTestResult]):
+    """Formats the results of a load test as a table.
+
+    :param results: The results of the scenarios.
+    :return: The table.
+    """
+
+    return '\n'.join([_format_header()] + [_format_result(result) for result in results])
+
+
+def _format_header():
+    return (f"{'scenario':<13} {'concurrency':>11} {'ops':>7} {'errors':>7} {'ops/s':>9} {'p50 ms':>10} {'p95 ms':>10} "
+            f"{'p99 ms':>10} {'throttled':>10} {'failed':>7}")
+
+
+def _format_result(result: LoadTestResult):
+    return (f"{result.scenario:<13} {result.concurrency:>11} {result.operations:>7} {result.errors:>7} "
+            f"{result.throughput:>9.2f} {result.p50_seconds * 1000:>10.2f} {result.p95_seconds * 1000:>10.2f} "
+            f"{result.p99_seconds * 1000:>10.2f} {result.throttled:>10} {result.failed:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run a load test of the ModelTrainingClient against the local service emulator.')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS,
+                        help='The scenarios to run.')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4, 16],
+                        help='The concurrency levels to run each scenario at.')
+    parser.add_argument('--operations', type=int, default=32,
+                        help='The number of analyses, builds, or batch deletes to run. Uploads send the training data folder this many times, divided by the number of files.')
+    parser.add_argument('--training-data-dir', default='model_training',
+                        help='The directory of training data to upload and analyze, which also holds the analysis fixtures.')
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='The latency added to every request, in seconds.')
+    parser.add_argument('--latency-jitter', type=float, default=0.01,
+                        help='The maximum random latency added on top of the latency, in seconds.')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='The fraction of requests to throttle at random.')
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help='The fraction of requests to fail at random.')
+    parser.add_argument('--rate-limit', type=float, default=None,
+                        help='The maximum number of requests per second to each service.')
+    parser.add_argument('--analyze-seconds', type=float, default=0.2,
+                        help='The time an analysis takes to complete, in seconds.')
+    parser.add_argument('--build-seconds', type=float, default=1.0,
+                        help='The time a model build takes to complete, in seconds.')
+    parser.add_argument('--retry-total', type=int, default=5,
+                        help='The maximum number of retries for a failed request.')
+    parser.add_argument('--retry-backoff-factor', type=float, default=0.8,
+                        help='The backoff factor for retries, in seconds.')
+    parser.add_argument('--unshared-clients', action='store_true',
+                        help='Create separate service clients for each client, rather than sharing pooled clients.')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='The seed for the random latency, throttling, and failures.')
+    parser.add_argument('--output',
+                        help='The path to save the results to as JSON.')
+    args = parser.parse_args()
+
+    file_count = len([file_name for file_name in os.listdir(args.training_data_dir)
+                      if os.path.isfile(os.path.join(args.training_data_dir, file_name))])
+    results = []
+
+    with ServiceEmulator(args.training_data_dir, args.latency, args.latency_jitter, args.throttle_rate, args.failure_rate,
+                         args.rate_limit, args.analyze_seconds, args.build_seconds, seed=args.seed) as emulator, \
+            tempfile.TemporaryDirectory() as work_dir:
+        load_test = LoadTest(emulator, args.training_data_dir, work_dir, not args.unshared_clients,
+                             args.retry_total, args.retry_backoff_factor)
+        print(_format_header(), flush=True)
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                operations = max(1, args.operations // file_count) if scenario == 'upload' else args.operations
+                result = load_test.run(scenario, concurrency, operations)
+                results.append(result)
+                print(_format_result(result), flush=True)
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump({"results": [result.to_dict() for result in results]}, file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Benchmarks DocumentIntelligenceResultFormatter.reformat_analyze_result_dict against the previous recursive implementation.
+
+The bundled model_training/*.ocr.json files are converted back into the shape produced by AnalyzeResult.to_dict() (snake case
+keys and polygons as lists of points), then reformatted by both implementations.
+
+Run from the repository root with: python -m benchmarks.reformat_analyze_result_dict
+
+The other stages of the pipeline are benchmarked, with a comparable baseline, by benchmarks.suite.
+"""
+
+import argparse
+import glob
+import json
+import os
+import timeit
+from benchmarks.fixtures import to_analyze_result_dict
+from modules.document_intelligence_result_formatter import DocumentIntelligenceResultFormatter
+
+
+def legacy_reformat_analyze_result_dict(analyze_result_dict: dict):
+    """The previous recursive implementation of reformat_analyze_result_dict, for comparison."""
+
+    result = {}
+    for key, value in analyze_result_dict.items():
+        if isinstance(value, dict):
+            value = legacy_reformat_analyze_result_dict(value)
+        elif isinstance(value, list):
+            value = [legacy_reformat_analyze_result_dict(
+                item) for item in value]
+
+        if key == "polygon":
+            value = [coord for point in value for coord in point.values()]
+
+        components = key.split('_')
+        result[components[0] + ''.join(x.title()
+                                       for x in components[1:])] = value
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark reformat_analyze_result_dict on the bundled training data.')
+    parser.add_argument('--training-data-dir', default='model_training')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    for ocr_json_path in sorted(glob.glob(os.path.join(args.training_data_dir, '*.ocr.json'))):
+        with open(ocr_json_path, 'r') as file:
+            analyze_result_dict = to_analyze_result_dict(
+                json.load(file)['analyzeResult'])
+
+        expected = legacy_reformat_analyze_result_dict(analyze_result_dict)
+        actual = DocumentIntelligenceResultFormatter.reformat_analyze_result_dict(
+            analyze_result_dict)
+        if actual != expected:
+            raise AssertionError(
+                f"Reformatted output differs from the previous implementation for {ocr_json_path}")
+
+        legacy_time = min(timeit.repeat(lambda: legacy_reformat_analyze_result_dict(
+            analyze_result_dict), repeat=args.repeat, number=args.number)) / args.number
+        current_time = min(timeit.repeat(lambda: DocumentIntelligenceResultFormatter.reformat_analyze_result_dict(
+            analyze_result_dict), repeat=args.repeat, number=args.number)) / args.number
+
+        print(f"{os.path.basename(ocr_json_path)}: legacy {legacy_time * 1000:.2f} ms, "
+              f"current {current_time * 1000:.2f} ms, speedup {legacy_time / current_time:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,630 @@
+"""A local stand-in for the Document Intelligence and Blob Storage endpoints used by the ModelTrainingClient.
+
+The emulator implements just enough of each REST API for the Azure SDK clients to run against it:
+
+- Blob Storage: creating a container, uploading, downloading, listing, and deleting blobs, singly or in batches.
+- Document Intelligence: analyzing a document, building a model, and getting and deleting models. Analysis returns the
+  bundled `.ocr.json` fixture of the PDF with the same content, or the fixtures in turn for other documents. Building a
+  model from a container without any `.labels.json` blobs fails, as it does in the service.
+
+Every request can be given a simulated latency, and can be throttled or failed at random, or throttled once a rate limit is
+exceeded. Throttling is returned the way each service does: 503 Server Busy for Blob Storage, and 429 Too Many Requests for
+Document Intelligence, both with `Retry-After` and `retry-after-ms` headers.
+
+Run a standalone emulator from the repository root with, for example:
+
+    python -m benchmarks.service_emulator --port 8123 --latency 0.05 --throttle-rate 0.1
+"""
+
+import argparse
+import base64
+import email.utils
+import glob
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import (BaseHTTPRequestHandler, ThreadingHTTPServer)
+from xml.sax.saxutils import escape
+
+# The account name and key of the emulated storage account. The key is only used by the client to sign requests.
+ACCOUNT_NAME = 'devstoreaccount1'
+ACCOUNT_KEY = base64.b64encode(b'document-intelligence-feedback-emulator').decode()
+
+API_VERSION = '2023-07-31'
+
+
+class ServiceEmulator:
+    """A local HTTP server emulating the Document Intelligence and Blob Storage endpoints."""
+
+    def __init__(self, fixtures_dir: str, latency_seconds: float = 0.02, latency_jitter_seconds: float = 0.01, throttle_rate: float = 0.0, failure_rate: float = 0.0, rate_limit: float | None = None, analyze_seconds: float = 0.2, build_seconds: float = 1.0, poll_interval_seconds: float = 0.1, seed: int | None = None, host: str = '127.0.0.1', port: int = 0):
+        """Initializes the ServiceEmulator.
+
+        :param fixtures_dir: The directory containing the PDF documents and their `.ocr.json` layout analysis results, e.g. `model_training`.
+        :param latency_seconds: The latency added to every request, in seconds.
+        :param latency_jitter_seconds: The maximum random latency added on top of the latency, in seconds.
+        :param throttle_rate: The fraction of requests to throttle at random.
+        :param failure_rate: The fraction of requests to fail at random with a 500 Internal Server Error.
+        :param rate_limit: The maximum number of requests per second to each service, above which requests are throttled. If None, requests are only throttled at random.
+        :param analyze_seconds: The time an analysis takes to complete, in seconds.
+        :param build_seconds: The time a model build takes to complete, in seconds.
+        :param poll_interval_seconds: The interval the clients are told to poll long-running operations at, in seconds.
+        :param seed: The seed for the random latency, throttling, and failures.
+        :param host: The host to listen on.
+        :param port: The port to listen on. If 0, a free port is used.
+        """
+
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.throttle_rate = throttle_rate
+        self.failure_rate = failure_rate
+        self.rate_limit = rate_limit
+        self.analyze_seconds = analyze_seconds
+        self.build_seconds = build_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.host = host
+        self.port = port
+
+        self.containers: dict[str, dict[str, dict]] = {}
+        self.models: dict[str, dict] = {}
+        self.operations: dict[str, dict] = {}
+        self.stats: dict[str, int] = {}
+
+        self._fixtures_by_md5: dict[bytes, bytes] = {}
+        self._fixtures: list[bytes] = []
+        self._next_fixture = itertools.count()
+        self._random = random.Random(seed)
+        self._rate_limit_buckets: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+        self.__load_fixtures__(fixtures_dir)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def endpoint(self):
+        """The Document Intelligence endpoint of the emulator."""
+
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def blob_connection_string(self):
+        """The Blob Storage connection string of the emulator."""
+
+        return (f"DefaultEndpointsProtocol=http;AccountName={ACCOUNT_NAME};AccountKey={ACCOUNT_KEY};"
+                f"BlobEndpoint={self.endpoint}/{ACCOUNT_NAME};")
+
+    def get_settings(self, training_data_container_name: str = 'training-data'):
+        """Gets the settings for a ModelTrainingClient to connect to the emulator, creating the training data container.
+
+        :param training_data_container_name: The name of the training data container.
+        :return: The settings.
+        """
+
+        from modules.app_settings import AppSettings
+
+        with self._lock:
+            self.containers.setdefault(training_data_container_name, {})
+
+        return AppSettings({
+            'AZURE_MANAGED_IDENTITY_CLIENT_ID': '',
+            'AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT': self.endpoint,
+            'AZURE_DOCUMENT_INTELLIGENCE_KEY': 'emulator',
+            'AZURE_STORAGE_ACCOUNT_NAME': ACCOUNT_NAME,
+            'AZURE_STORAGE_ACCOUNT_CONNECTION_STRING': self.blob_connection_string,
+            'AZURE_DOCUMENT_INTELLIGENCE_TRAINING_DATA_CONTAINER_NAME': training_data_container_name
+        })
+
+    def start(self):
+        """Starts serving requests on a background thread.
+
+        :return: The emulator.
+        """
+
+        # Each emulator serves requests with its own handler class, bound to it.
+        Handler = type('Handler', (_EmulatorRequestHandler,), {'emulator': self})
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving requests."""
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def reset_stats(self):
+        """Resets the counts of the requests served.
+
+        :return: The counts before they were reset.
+        """
+
+        with self._lock:
+            stats, self.stats = self.stats, {}
+        return stats
+
+    def count(self, key: str):
+        """Counts a request served, e.g. `formrecognizer/202` or `blob/throttled`.
+
+        :param key: The key of the count.
+        """
+
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def get_fault(self, service: str):
+        """Decides whether to delay, throttle, or fail a request to a service.
+
+        :param service: The service the request is to, `blob` or `formrecognizer`.
+        :return: The latency to add in seconds, the injected fault, `throttled`, `failed`, or None, and the delay to tell the client to retry after in seconds.
+        """
+
+        now = time.monotonic()
+        with self._lock:
+            latency = self.latency_seconds + \
+                self._random.uniform(0, self.latency_jitter_seconds)
+
+            if self.rate_limit is not None:
+                # A token bucket per service, holding up to one second of requests.
+                tokens, updated = self._rate_limit_buckets.get(
+                    service, [self.rate_limit, now])
+                tokens = min(self.rate_limit, tokens +
+                             (now - updated) * self.rate_limit)
+                if tokens < 1:
+                    self._rate_limit_buckets[service] = [tokens, now]
+                    return latency, 'throttled', (1 - tokens) / self.rate_limit
+                self._rate_limit_buckets[service] = [tokens - 1, now]
+
+            draw = self._random.random()
+
+        if draw < self.throttle_rate:
+            return latency, 'throttled', self.poll_interval_seconds
+        if draw < self.throttle_rate + self.failure_rate:
+            return latency, 'failed', self.poll_interval_seconds
+        return latency, None, None
+
+    def get_analyze_result(self, document: bytes):
+        """Gets the layout analysis fixture for a document.
+
+        :param document: The content of the document.
+        :return: The serialized analysis result.
+        """
+
+        fixture = self._fixtures_by_md5.get(hashlib.md5(document).digest())
+        if fixture is not None:
+            return fixture
+        return self._fixtures[next(self._next_fixture) % len(self._fixtures)]
+
+    def __load_fixtures__(self, fixtures_dir: str):
+        for ocr_json_path in sorted(glob.glob(os.path.join(fixtures_dir, '*.ocr.json'))):
+            with open(ocr_json_path, 'rb') as file:
+                fixture = file.read()
+            self._fixtures.append(fixture)
+
+            pdf_path = ocr_json_path[:-len('.ocr.json')]
+            if os.path.exists(pdf_path):
+                with open(pdf_path, 'rb') as file:
+                    self._fixtures_by_md5[hashlib.md5(
+                        file.read()).digest()] = fixture
+
+        if len(self._fixtures) == 0:
+            raise ValueError(
+                f"No .ocr.json fixtures found in {fixtures_dir}")
+
+
+class _EmulatorRequestHandler(BaseHTTPRequestHandler):
+    """Handles the requests to a ServiceEmulator, keeping connections alive between requests."""
+
+    protocol_version = 'HTTP/1.1'
+    emulator: ServiceEmulator = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.__handle__('GET')
+
+    def do_PUT(self):
+        self.__handle__('PUT')
+
+    def do_POST(self):
+        self.__handle__('POST')
+
+    def do_DELETE(self):
+        self.__handle__('DELETE')
+
+    def __handle__(self, method: str):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        path = urllib.parse.unquote(url.path)
+
+        if path.startswith('/formrecognizer/'):
+            service = 'formrecognizer'
+        elif path.startswith(f"/{ACCOUNT_NAME}"):
+            service = 'blob'
+        else:
+            self.__send_json__(404, {"error": {"code": "NotFound", "message": f"No route for {path}"}})
+            return
+
+        latency, fault, retry_after_seconds = self.emulator.get_fault(service)
+        if latency > 0:
+            time.sleep(latency)
+
+        if fault is not None:
+            self.emulator.count(f"{service}/{fault}")
+            self.__send_fault__(service, fault, retry_after_seconds)
+            return
+
+        if service == 'blob':
+            status = self.__handle_blob__(
+                method, path[len(ACCOUNT_NAME) + 1:], query, body)
+        else:
+            status = self.__handle_document_intelligence__(
+                method, path[len('/formrecognizer'):], body)
+        self.emulator.count(f"{service}/{status}")
+
+    def __send_fault__(self, service: str, fault: str, retry_after_seconds: float):
+        # Retry-After only allows whole seconds, so the precise delay is also sent in milliseconds.
+        headers = {
+            'Retry-After': str(max(1, math.ceil(retry_after_seconds))),
+            'retry-after-ms': str(max(1, int(retry_after_seconds * 1000)))
+        }
+        if service == 'blob':
+            status, code = (503, 'ServerBusy') if fault == 'throttled' else (500, 'InternalError')
+            self.__send_blob_error__(status, code, headers)
+        else:
+            status, code = (429, '429') if fault == 'throttled' else (500, 'InternalServerError')
+            self.__send_json__(status, {"error": {"code": code, "message": f"Emulated {fault} request"}},
+                               headers)
+
+    def __handle_blob__(self, method: str, path: str, query: dict, body: bytes):
+        parts = path.strip('/').split('/', 1)
+        container_name = parts[0]
+        blob_name = parts[1] if len(parts) > 1 else None
+        containers = self.emulator.containers
+
+        if blob_name is None and method == 'PUT' and query.get('restype') == 'container':
+            with self.emulator._lock:
+                exists = container_name in containers
+                containers.setdefault(container_name, {})
+            if exists:
+                return self.__send_blob_error__(409, 'ContainerAlreadyExists')
+            return self.__send__(201, b'', self.__get_blob_headers__())
+
+        container = containers.get(container_name)
+        if container is None:
+            return self.__send_blob_error__(404, 'ContainerNotFound')
+
+        if blob_name is not None and method == 'PUT' and 'comp' not in query:
+            blob = {
+                'content': body,
+                'size': len(body),
+                'md5': self.headers.get('x-ms-blob-content-md5') or base64.b64encode(hashlib.md5(body).digest()).decode(),
+                'etag': f'"0x{uuid.uuid4().hex[:15].upper()}"',
+                'last_modified': email.utils.formatdate(usegmt=True)
+            }
+            with self.emulator._lock:
+                container[blob_name] = blob
+            headers = self.__get_blob_headers__()
+            headers.update({'ETag': blob['etag'], 'Last-Modified': blob['last_modified'],
+                            'Content-MD5': blob['md5'], 'x-ms-request-server-encrypted': 'true'})
+            return self.__send__(201, b'', headers)
+
+        if blob_name is not None and method == 'GET':
+            with self.emulator._lock:
+                blob = container.get(blob_name)
+            if blob is None:
+                return self.__send_blob_error__(404, 'BlobNotFound')
+            return self.__send_blob_content__(blob)
+
+        if blob_name is not None and method == 'DELETE':
+            with self.emulator._lock:
+                blob = container.pop(blob_name, None)
+            if blob is None:
+                return self.__send_blob_error__(404, 'BlobNotFound')
+            return self.__send__(202, b'', self.__get_blob_headers__())
+
+        if blob_name is None and method == 'POST' and query.get('comp') == 'batch':
+            return self.__handle_blob_batch__(container_name, container, body)
+
+        if blob_name is None and method == 'GET' and query.get('comp') == 'list':
+            prefix = query.get('prefix', '')
+            with self.emulator._lock:
+                blobs = sorted((name, blob) for name, blob in container.items()
+                               if name.startswith(prefix))
+            blobs_xml = ''.join(
+                f"<Blob><Name>{escape(name)}</Name><Properties><Last-Modified>{blob['last_modified']}</Last-Modified>"
+                f"<Etag>{blob['etag']}</Etag><Content-Length>{blob['size']}</Content-Length>"
+                f"<Content-Type>application/octet-stream</Content-Type><Content-MD5>{blob['md5']}</Content-MD5>"
+                f"<BlobType>BlockBlob</BlobType></Properties></Blob>"
+                for name, blob in blobs)
+            body = (f'<?xml version="1.0" encoding="utf-8"?><EnumerationResults ServiceEndpoint="{self.emulator.endpoint}/{ACCOUNT_NAME}/" '
+                    f'ContainerName="{escape(container_name)}"><Prefix>{escape(prefix)}</Prefix><Blobs>{blobs_xml}</Blobs>'
+                    f'<NextMarker /></EnumerationResults>').encode()
+            headers = self.__get_blob_headers__()
+            headers['Content-Type'] = 'application/xml'
+            return self.__send__(200, body, headers)
+
+        return self.__send_blob_error__(501, 'NotImplemented')
+
+    def __send_blob_content__(self, blob: dict):
+        """Sends the content of a blob, or the range of it requested by the client, as the SDK downloads in chunks."""
+
+        content = blob.get('content', b'')
+        headers = self.__get_blob_headers__()
+        headers.update({'ETag': blob['etag'], 'Last-Modified': blob['last_modified'], 'x-ms-blob-content-md5': blob['md5'],
+                        'Content-Type': 'application/octet-stream', 'x-ms-blob-type': 'BlockBlob'})
+
+        byte_range = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('x-ms-range') or self.headers.get('Range') or '')
+        if byte_range is None or len(content) == 0:
+            return self.__send__(200, content, headers)
+
+        start = int(byte_range.group(1))
+        end = min(int(byte_range.group(2) or len(content) - 1), len(content) - 1)
+        headers['Content-Range'] = f"bytes {start}-{end}/{len(content)}"
+        return self.__send__(206, content[start:end + 1], headers)
+
+    def __handle_blob_batch__(self, container_name: str, container: dict, body: bytes):
+        """Handles a blob batch request, which can only delete blobs in the emulator.
+
+        Each part of the multipart request is a sub-request, and gets a part in the multipart response with its own status,
+        so deleting a blob that does not exist fails that sub-request alone.
+        """
+
+        boundary = re.search(r'boundary=([^;\s]+)', self.headers.get('Content-Type', ''))
+        if boundary is None:
+            return self.__send_blob_error__(400, 'InvalidInput')
+
+        response_boundary = f"batchresponse_{uuid.uuid4()}"
+        response_parts = []
+        for part in body.decode().split(f"--{boundary.group(1)}")[1:]:
+            if part.startswith('--'):
+                break
+
+            headers, _, sub_request = part.strip('\r\n').partition('\r\n\r\n')
+            content_id = re.search(r'Content-ID:\s*(\S+)', headers, re.IGNORECASE)
+            request_method, sub_path = sub_request.split(' ', 2)[:2]
+
+            # The sub-request path is relative to the account, e.g. `/<container>/<blob>?`.
+            blob_path = urllib.parse.unquote(urllib.parse.urlsplit(sub_path).path).strip('/')
+            blob_path = blob_path.removeprefix(f"{ACCOUNT_NAME}/").removeprefix(f"{container_name}/")
+
+            blob = None
+            if request_method == 'DELETE':
+                with self.emulator._lock:
+                    blob = container.pop(blob_path, None)
+
+            if blob is not None:
+                status_line, error_code = 'HTTP/1.1 202 Accepted', None
+            elif request_method == 'DELETE':
+                status_line, error_code = 'HTTP/1.1 404 The specified blob does not exist.', 'BlobNotFound'
+            else:
+                status_line, error_code = 'HTTP/1.1 501 Not Implemented', 'NotImplemented'
+            self.emulator.count(f"blob/batch/{status_line.split(' ')[1]}")
+
+            sub_response = [status_line, f"x-ms-request-id: {uuid.uuid4()}", 'x-ms-version: 2023-11-03']
+            if error_code is None:
+                sub_response += ['x-ms-delete-type-permanent: true', '', '']
+            else:
+                error = (f'<?xml version="1.0" encoding="utf-8"?><Error><Code>{error_code}</Code>'
+                         f'<Message>Emulated {error_code} error</Message></Error>')
+                sub_response += [f"x-ms-error-code: {error_code}", 'Content-Type: application/xml',
+                                 f"Content-Length: {len(error)}", '', error]
+            response_parts.append('\r\n'.join(
+                [f"--{response_boundary}", 'Content-Type: application/http',
+                 f"Content-ID: {content_id.group(1) if content_id else len(response_parts)}", ''] + sub_response))
+
+        response_body = '\r\n'.join(response_parts + [f"--{response_boundary}--", '']).encode()
+        headers = self.__get_blob_headers__()
+        headers['Content-Type'] = f"multipart/mixed; boundary={response_boundary}"
+        return self.__send__(202, response_body, headers)
+
+    def __handle_document_intelligence__(self, method: str, path: str, body: bytes):
+        analyze_match = re.fullmatch(r'/documentModels/([^/:]+):analyze', path)
+        analyze_result_match = re.fullmatch(r'/documentModels/([^/:]+)/analyzeResults/([^/]+)', path)
+        model_match = re.fullmatch(r'/documentModels/([^/:]+)', path)
+        operation_match = re.fullmatch(r'/operations/([^/]+)', path)
+
+        if method == 'POST' and analyze_match is not None:
+            model_id = analyze_match.group(1)
+            if not model_id.startswith('prebuilt-') and model_id not in self.emulator.models:
+                return self.__send_model_not_found__(model_id)
+            operation_id = self.__create_operation__(
+                self.emulator.analyze_seconds, result=self.emulator.get_analyze_result(body))
+            return self.__send_operation_accepted__(
+                f"/documentModels/{model_id}/analyzeResults/{operation_id}")
+
+        if method == 'GET' and analyze_result_match is not None:
+            operation = self.emulator.operations.get(analyze_result_match.group(2))
+            if operation is None:
+                return self.__send_json__(404, {"error": {"code": "NotFound", "message": "The analyze result was not found"}})
+            if time.monotonic() < operation['ready_at']:
+                return self.__send_json__(200, {"status": "running", "createdDateTime": operation['created'],
+                                                "lastUpdatedDateTime": operation['created']}, self.__get_poll_headers__())
+            return self.__send__(200, operation['result'], {'Content-Type': 'application/json'})
+
+        if method == 'POST' and path == '/documentModels:build':
+            request = json.loads(body)
+            model_id = request['modelId']
+            model = {
+                "modelId": model_id,
+                "description": request.get('description'),
+                "createdDateTime": _get_timestamp(),
+                "apiVersion": API_VERSION,
+                "tags": request.get('tags') or {},
+                "docTypes": {model_id: {"buildMode": request.get('buildMode', 'template'), "fieldSchema": {}, "fieldConfidence": {}}}
+            }
+            container_name = urllib.parse.unquote(urllib.parse.urlsplit(
+                (request.get('azureBlobSource') or {}).get('containerUrl', '')).path).rstrip('/').split('/')[-1]
+            with self.emulator._lock:
+                blob_names = list(self.emulator.containers.get(container_name, {}).keys())
+            error = None
+            if not any(blob_name.endswith('.labels.json') for blob_name in blob_names):
+                error = {"code": "InvalidRequest", "message": "Invalid request.",
+                         "innererror": {"code": "TrainingContentMissing",
+                                        "message": "Training data is missing: Could not find enough training data."}}
+            operation_id = self.__create_operation__(
+                self.emulator.build_seconds, model=model, error=error)
+            return self.__send_operation_accepted__(f"/operations/{operation_id}")
+
+        if method == 'GET' and operation_match is not None:
+            operation_id = operation_match.group(1)
+            operation = self.emulator.operations.get(operation_id)
+            if operation is None or 'model' not in operation:
+                return self.__send_json__(404, {"error": {"code": "NotFound", "message": "The operation was not found"}})
+            model = operation['model']
+            details = {
+                "operationId": operation_id,
+                "createdDateTime": operation['created'],
+                "lastUpdatedDateTime": _get_timestamp(),
+                "kind": "documentModelBuild",
+                "resourceLocation": f"{self.emulator.endpoint}/formrecognizer/documentModels/{model['modelId']}?api-version={API_VERSION}",
+                "apiVersion": API_VERSION
+            }
+            if time.monotonic() < operation['ready_at']:
+                details.update({"status": "running", "percentCompleted": 50})
+                return self.__send_json__(200, details, self.__get_poll_headers__())
+            if operation['error'] is not None:
+                details.update({"status": "failed", "percentCompleted": 0, "error": operation['error']})
+                return self.__send_json__(200, details)
+            with self.emulator._lock:
+                self.emulator.models[model['modelId']] = model
+            details.update({"status": "succeeded", "percentCompleted": 100, "result": model})
+            return self.__send_json__(200, details)
+
+        if model_match is not None and method in ('GET', 'DELETE'):
+            model_id = model_match.group(1)
+            with self.emulator._lock:
+                model = self.emulator.models.get(model_id)
+                if method == 'DELETE':
+                    self.emulator.models.pop(model_id, None)
+            if model is None:
+                return self.__send_model_not_found__(model_id)
+            if method == 'DELETE':
+                return self.__send__(204, b'', {})
+            return self.__send_json__(200, model)
+
+        return self.__send_json__(404, {"error": {"code": "NotFound", "message": f"No route for {method} {path}"}})
+
+    def __create_operation__(self, duration_seconds: float, **operation):
+        operation_id = str(uuid.uuid4())
+        operation.update({'created': _get_timestamp(),
+                          'ready_at': time.monotonic() + duration_seconds})
+        with self.emulator._lock:
+            self.emulator.operations[operation_id] = operation
+        return operation_id
+
+    def __send_operation_accepted__(self, operation_path: str):
+        headers = self.__get_poll_headers__()
+        headers['Operation-Location'] = f"{self.emulator.endpoint}/formrecognizer{operation_path}?api-version={API_VERSION}"
+        return self.__send__(202, b'', headers)
+
+    def __send_model_not_found__(self, model_id: str):
+        return self.__send_json__(404, {"error": {"code": "NotFound", "message": f"Model {model_id} was not found",
+                                                  "innererror": {"code": "ModelNotFound", "message": "The requested model was not found."}}})
+
+    def __get_poll_headers__(self):
+        return {'retry-after-ms': str(int(self.emulator.poll_interval_seconds * 1000))}
+
+    def __get_blob_headers__(self):
+        return {'x-ms-request-id': str(uuid.uuid4()), 'x-ms-version': self.headers.get('x-ms-version', '2021-12-02'),
+                'Date': email.utils.formatdate(usegmt=True)}
+
+    def __send_blob_error__(self, status: int, code: str, headers: dict | None = None):
+        body = (f'<?xml version="1.0" encoding="utf-8"?><Error><Code>{code}</Code>'
+                f'<Message>Emulated {code} error</Message></Error>').encode()
+        response_headers = self.__get_blob_headers__()
+        response_headers.update({'Content-Type': 'application/xml', 'x-ms-error-code': code})
+        response_headers.update(headers or {})
+        return self.__send__(status, body, response_headers)
+
+    def __send_json__(self, status: int, value: dict, headers: dict | None = None):
+        response_headers = {'Content-Type': 'application/json'}
+        response_headers.update(headers or {})
+        return self.__send__(status, json.dumps(value).encode(), response_headers)
+
+    def __send__(self, status: int, body: bytes, headers: dict):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if len(body) > 0:
+            self.wfile.write(body)
+        return status
+
+
+def _get_timestamp():
+    """Gets the current time in the ISO 8601 format of the Document Intelligence API."""
+
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run a local stand-in for the Document Intelligence and Blob Storage endpoints.')
+    parser.add_argument('--fixtures-dir', default='model_training',
+                        help='The directory containing the PDF documents and their .ocr.json layout analysis results.')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='The host to listen on.')
+    parser.add_argument('--port', type=int, default=8123,
+                        help='The port to listen on.')
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='The latency added to every request, in seconds.')
+    parser.add_argument('--latency-jitter', type=float, default=0.01,
+                        help='The maximum random latency added on top of the latency, in seconds.')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='The fraction of requests to throttle at random.')
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help='The fraction of requests to fail at random.')
+    parser.add_argument('--rate-limit', type=float, default=None,
+                        help='The maximum number of requests per second to each service.')
+    parser.add_argument('--analyze-seconds', type=float, default=0.2,
+                        help='The time an analysis takes to complete, in seconds.')
+    parser.add_argument('--build-seconds', type=float, default=1.0,
+                        help='The time a model build takes to complete, in seconds.')
+    parser.add_argument('--container', default='training-data',
+                        help='The name of the training data container to create.')
+    args = parser.parse_args()
+
+    emulator = ServiceEmulator(args.fixtures_dir, args.latency, args.latency_jitter, args.throttle_rate, args.failure_rate,
+                               args.rate_limit, args.analyze_seconds, args.build_seconds, host=args.host, port=args.port)
+    emulator.containers[args.container] = {}
+    emulator.start()
+
+    print(f"AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT={emulator.endpoint}")
+    print(f"AZURE_DOCUMENT_INTELLIGENCE_KEY=emulator")
+    print(f"AZURE_STORAGE_ACCOUNT_NAME={ACCOUNT_NAME}")
+    print(f"AZURE_STORAGE_ACCOUNT_CONNECTION_STRING={emulator.blob_connection_string}")
+    print(f"AZURE_DOCUMENT_INTELLIGENCE_TRAINING_DATA_CONTAINER_NAME={args.container}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        emulator.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""Runs the offline benchmark suite over the bundled fixtures and synthetic scaled-up documents.
+
+Each benchmark is timed with timeit, and the results can be saved as a baseline JSON file and compared against on later runs,
+reporting any benchmark that has slowed down by more than a threshold. No network access is needed. PDF rasterization is
+skipped if Poppler is not installed.
+
+Run from the repository root with, for example:
+
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json
+"""
+
+import argparse
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import timeit
+from azure.ai.formrecognizer import (AnalyzeResult)
+from benchmarks.fixtures import (generate_document, generate_pdf, load_analyze_result, scale_pages, to_analyze_result_dict)
+from modules.document_intelligence_result_formatter import DocumentIntelligenceResultFormatter
+from modules.document_label import (DocumentLabel, DocumentLabelStore)
+from modules.feedback_label import FeedbackLabel
+from modules.feedback_labels_pipeline import build_labels
+from modules.field_region_index import FieldRegionIndex
+from modules.pdf_page_renderer import PdfPageRenderer
+
+# The number of pages and table rows of the synthetic scaled-up documents.
+SCALED_PAGE_COUNT = 100
+SCALED_ROW_COUNT = 1000
+
+
+class Benchmark:
+    """A class representing a single benchmark."""
+
+    def __init__(self, name: str, func, items: int, teardown=None):
+        """Initializes the Benchmark.
+
+        :param name: The name of the benchmark, e.g. `reformat_analyze_result_dict/100_pages`.
+        :param func: The function to time.
+        :param items: The number of items, e.g. pages or labels, processed by each call of the function.
+        :param teardown: The function to call after each call of the function is timed, e.g. to clear a cache.
+        """
+
+        self.name = name
+        self.func = func
+        self.items = items
+        self.teardown = teardown
+
+
+def create_benchmarks(repository_dir: str, work_dir: str):
+    """Creates the benchmarks from the fixtures bundled in the repository.
+
+    :param repository_dir: The root directory of the repository.
+    :param work_dir: The directory to write output files to.
+    :return: The benchmarks.
+    """
+
+    training_data_dir = os.path.join(repository_dir, 'model_training')
+    with open(os.path.join(training_data_dir, 'fields.json'), 'r') as file:
+        fields = json.load(file)
+
+    layout_result = load_analyze_result(
+        os.path.join(training_data_dir, 'Invoice_1.pdf.ocr.json'))
+    model_result = load_analyze_result(
+        os.path.join(repository_dir, 'pdfs', 'Invoice_6.pdf.ocr_1.0.0.json'))
+
+    documents = {
+        'fixture': model_result,
+        f"{SCALED_PAGE_COUNT}_pages_{SCALED_ROW_COUNT}_rows": generate_document(model_result, SCALED_PAGE_COUNT, SCALED_ROW_COUNT)
+    }
+    layout_documents = {
+        'fixture': layout_result,
+        f"{SCALED_PAGE_COUNT}_pages": scale_pages(layout_result, SCALED_PAGE_COUNT)
+    }
+
+    benchmarks = []
+
+    for size, analyze_result in layout_documents.items():
+        analyze_result_dict = to_analyze_result_dict(analyze_result)
+        page_count = len(analyze_result['pages'])
+        result = AnalyzeResult.from_dict(analyze_result_dict)
+        ocr_json_path = os.path.join(work_dir, f"{size}.ocr.json")
+
+        benchmarks.append(Benchmark(
+            f"reformat_analyze_result_dict/{size}",
+            lambda analyze_result_dict=analyze_result_dict: DocumentIntelligenceResultFormatter.reformat_analyze_result_dict(
+                analyze_result_dict),
+            page_count))
+        benchmarks.append(Benchmark(
+            f"save_to_ocr_json/{size}",
+            lambda result=result, ocr_json_path=ocr_json_path: DocumentIntelligenceResultFormatter.save_to_ocr_json(
+                result, ocr_json_path),
+            page_count))
+
+    for size, analyze_result in documents.items():
+        document_fields = analyze_result['documents'][0]['fields']
+        pages = analyze_result['pages']
+        field_region_index = FieldRegionIndex(document_fields)
+        bboxes = [(page['pageNumber'], field_region_index.get_bboxes(page['pageNumber'], 1700 / page['width'], 2200 / page['height']))
+                  for page in pages]
+        label_count = sum(len(page_bboxes) for _, page_bboxes in bboxes)
+        labels = build_labels(analyze_result, fields)
+        labels_json_path = os.path.join(work_dir, f"{size}.labels.json")
+
+        benchmarks.append(Benchmark(
+            f"get_bboxes/{size}",
+            lambda field_region_index=field_region_index, pages=pages: [field_region_index.get_bboxes(
+                page['pageNumber'], 1700 / page['width'], 2200 / page['height']) for page in pages],
+            label_count))
+        benchmarks.append(Benchmark(
+            f"field_region_index/{size}",
+            lambda document_fields=document_fields: FieldRegionIndex(
+                document_fields),
+            label_count))
+        benchmarks.append(Benchmark(
+            f"document_label_normalize/{size}",
+            lambda bboxes=bboxes: [DocumentLabel('page.jpg', page_number, bbox).normalize(1700, 2200)
+                                   for page_number, page_bboxes in bboxes for bbox in page_bboxes],
+            label_count))
+        benchmarks.append(Benchmark(
+            f"label_store_normalize/{size}",
+            lambda bboxes=bboxes: _build_label_store(
+                bboxes).get_normalized_bounding_boxes(),
+            label_count))
+        benchmarks.append(Benchmark(
+            f"feedback_label/{size}",
+            lambda bboxes=bboxes: [_build_feedback_label(page_number, bbox, fields)
+                                   for page_number, page_bboxes in bboxes for bbox in page_bboxes],
+            label_count))
+        benchmarks.append(Benchmark(
+            f"build_labels/{size}",
+            lambda analyze_result=analyze_result: build_labels(
+                analyze_result, fields),
+            len(labels)))
+        benchmarks.append(Benchmark(
+            f"save_to_labels_json/{size}",
+            lambda labels=labels, labels_json_path=labels_json_path: DocumentIntelligenceResultFormatter.save_to_labels_json(
+                labels, 'Invoice_6.pdf', labels_json_path),
+            len(labels)))
+
+    if shutil.which('pdftoppm') is not None:
+        pdf_file_path = os.path.join(training_data_dir, 'Invoice_1.pdf')
+        pdfs = {'fixture': (pdf_file_path, 1)}
+        scaled_pdf_path = generate_pdf(pdf_file_path, SCALED_PAGE_COUNT, os.path.join(
+            work_dir, f"{SCALED_PAGE_COUNT}_pages.pdf"))
+        if scaled_pdf_path is not None:
+            pdfs[f"{SCALED_PAGE_COUNT}_pages"] = (
+                scaled_pdf_path, SCALED_PAGE_COUNT)
+
+        cache_dir = os.path.join(work_dir, 'cache')
+        for size, (path, page_count) in pdfs.items():
+            benchmarks.append(Benchmark(
+                f"rasterize/{size}",
+                lambda path=path: PdfPageRenderer(
+                    path, cache_dir, thread_count=os.cpu_count() or 1).get_page_paths(),
+                page_count,
+                teardown=lambda: shutil.rmtree(cache_dir, ignore_errors=True)))
+
+    return benchmarks
+
+
+def _build_label_store(bboxes: list):
+    label_store = DocumentLabelStore()
+    for page_number, page_bboxes in bboxes:
+        label_store.extend('page.jpg', page_number, page_bboxes, 1700, 2200)
+    return label_store
+
+
+def _build_feedback_label(page_number: int, bbox: dict, fields: dict):
+    document_label = DocumentLabel('page.jpg', page_number, bbox)
+    document_label.normalize(1700, 2200)
+    label = FeedbackLabel(document_label, fields)
+    label.apply_field()
+    return label.as_label()
+
+
+def run_benchmark(benchmark: Benchmark, repeat: int, min_time: float):
+    """Times a benchmark.
+
+    Benchmarks with a teardown are timed one call at a time. Otherwise the number of calls per repeat is calibrated so each
+    repeat takes at least the minimum time.
+
+    :param benchmark: The benchmark to time.
+    :param repeat: The number of times to repeat the timing.
+    :param min_time: The minimum number of seconds each repeat should take.
+    :return: The result of the benchmark.
+    """
+
+    timings = []
+    if benchmark.teardown is not None:
+        number = 1
+        for _ in range(repeat):
+            benchmark.teardown()
+            timings.append(timeit.timeit(benchmark.func, number=1))
+        benchmark.teardown()
+    else:
+        timer = timeit.Timer(benchmark.func)
+        number = 1
+        while True:
+            elapsed = timer.timeit(number)
+            if elapsed >= min_time:
+                break
+            number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+        timings = [elapsed / number for elapsed in timer.repeat(repeat, number)]
+
+    return {
+        "items": benchmark.items,
+        "number": number,
+        "repeat": repeat,
+        "min_seconds": min(timings),
+        "median_seconds": statistics.median(timings)
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """Compares benchmark results against a baseline.
+
+    :param results: The benchmark results, keyed by benchmark name.
+    :param baseline: The baseline results, keyed by benchmark name.
+    :param threshold: The ratio of the current to the baseline minimum time above which a benchmark has regressed.
+    :return: The ratio of each benchmark in both the results and baseline, and the names of the benchmarks that regressed.
+    """
+
+    ratios = {name: result['min_seconds'] / baseline[name]['min_seconds']
+              for name, result in results.items() if name in baseline}
+    regressions = [name for name, ratio in ratios.items() if ratio > threshold]
+    return ratios, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run the offline benchmark suite on the bundled fixtures.')
+    parser.add_argument('--filter', default='*',
+                        help='A glob pattern to select the benchmarks to run, e.g. "save_to_*".')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='The minimum number of seconds each repeat should take.')
+    parser.add_argument('--save-baseline',
+                        help='The path to save the results to as a baseline.')
+    parser.add_argument('--compare',
+                        help='The path to a baseline to compare the results against.')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='The slowdown relative to the baseline above which a benchmark has regressed.')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)['results']
+
+    repository_dir = os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for benchmark in create_benchmarks(repository_dir, work_dir):
+            if not fnmatch.fnmatch(benchmark.name, args.filter):
+                continue
+
+            result = run_benchmark(benchmark, args.repeat, args.min_time)
+            results[benchmark.name] = result
+
+            line = (f"{benchmark.name:<48} {result['min_seconds'] * 1000:>10.3f} ms "
+                    f"{result['median_seconds'] * 1000:>10.3f} ms (median) {result['items']:>7} items")
+            if baseline is not None and benchmark.name in baseline:
+                line += f"  {result['min_seconds'] / baseline[benchmark.name]['min_seconds']:.2f}x baseline"
+            print(line, flush=True)
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, 'w') as file:
+            json.dump({
+                "createdDateTime": datetime.datetime.now(datetime.UTC).__format__('%Y-%m-%dT%H:%M:%SZ'),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "processor": platform.processor(),
+                "results": results
+            }, file, indent=4)
+
+    if baseline is not None:
+        _, regressions = compare(results, baseline, args.threshold)
+        if len(regressions) > 0:
+            print(
+                f"Regressed by more than {args.threshold:.2f}x: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""The modules for processing user feedback on Document Intelligence analysis results.
+
+The core modules depend on the standard library, NumPy, and ijson, so headless workers can format results and build labels
+without installing or importing the heavier layers. `analysis_result_loader` parses large analysis results incrementally with
+ijson, and it and `document_intelligence_result_formatter` use orjson for faster JSON, if installed. Both fall back to the
+standard library if they are missing:
+
+- Core: `analysis_result_loader`, `document_deduplication`, `document_intelligence_result_formatter`, `document_label`,
+  `feedback_label`, `feedback_labels_pipeline`, `field_definition_index`, `field_region_index`, `labels_index`,
+  `model_evaluation`, `word_spatial_index`, and `instrumentation`.
+- Azure SDK: `model_training_client`, `batch_analysis_client`, `model_build_job_manager`, `service_client_factory`, and
+  `analysis_result_cache`.
+- Rendering and UI: `pdf_page_renderer` (pdf2image and Pillow), `document_canvas` (jupyter_bbox_widget), and
+  `document_intelligence_label` and `label_review_panel` (ipywidgets).
+
+The classes are also available from the package itself, e.g. `from modules import FeedbackLabel`, and each is only imported
+when first accessed.
+"""
+
+import importlib
+
+_exports = {
+    'AnalysisResultCache': 'modules.analysis_result_cache',
+    'AnalysisResultLoader': 'modules.analysis_result_loader',
+    'AppSettings': 'modules.app_settings',
+    'BatchAnalysisClient': 'modules.batch_analysis_client',
+    'DocumentCanvas': 'modules.document_canvas',
+    'DocumentFingerprint': 'modules.document_deduplication',
+    'DocumentIntelligenceLabel': 'modules.document_intelligence_label',
+    'DocumentIntelligenceResultFormatter': 'modules.document_intelligence_result_formatter',
+    'DocumentLabel': 'modules.document_label',
+    'DocumentLabelStore': 'modules.document_label',
+    'EvaluationReport': 'modules.model_evaluation',
+    'FeedbackLabel': 'modules.feedback_label',
+    'FieldDefinitionIndex': 'modules.field_definition_index',
+    'FieldRegionIndex': 'modules.field_region_index',
+    'LabelReviewPanel': 'modules.label_review_panel',
+    'LabelsIndex': 'modules.labels_index',
+    'ModelBuildJobManager': 'modules.model_build_job_manager',
+    'ModelTrainingClient': 'modules.model_training_client',
+    'NearDuplicateIndex': 'modules.document_deduplication',
+    'PdfPageRenderer': 'modules.pdf_page_renderer',
+    'ServiceClientFactory': 'modules.service_client_factory',
+    'WordSpatialIndex': 'modules.word_spatial_index',
+}
+
+__all__ = list(_exports.keys())
+
+
+def __getattr__(name: str):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_exports[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
@@ -0,0 +1,209 @@
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from azure.ai.formrecognizer import (AnalyzeResult)
+from azure.core.serialization import (AzureJSONEncoder)
+
+
+class AnalysisResultCache:
+    """A persistent, content-addressed cache for the results of Document Intelligence analysis.
+
+    Results are keyed by the SHA-256 hash of the document content, the model ID, the model version, and the API version used
+    for the analysis, so the same document analyzed by the same model is only sent to the service once. Custom models can be
+    rebuilt under the same ID, so their version, e.g. the time the model was created, must be part of the key.
+
+    Results are stored as JSON, so a corrupt or incompatible entry is only ever a cache miss. The modification time of an
+    entry is the time it was cached, which its age is measured from, and its access time is the time it was last read, which
+    eviction by size is ordered by.
+    """
+
+    def __init__(self, cache_dir: str, max_size_bytes: int | None = 512 * 1024 * 1024, max_age_seconds: float | None = None):
+        """Initializes the AnalysisResultCache.
+
+        :param cache_dir: The directory to store the cached results in.
+        :param max_size_bytes: The maximum total size of the cached results. The least recently used results are evicted when exceeded.
+        :param max_age_seconds: The maximum age of a cached result before it is evicted.
+        """
+
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    @staticmethod
+    def get_key(document: bytes, model_id: str, api_version: str, model_version: str | None = None):
+        """Gets the cache key for the analysis of a document.
+
+        :param document: The content of the document.
+        :param model_id: The ID of the model used for the analysis.
+        :param api_version: The API version used for the analysis.
+        :param model_version: The version of a custom model, e.g. the time it was created. Prebuilt models are versioned by the API version.
+        :return: The cache key.
+        """
+
+        document_hash = hashlib.sha256(document).hexdigest()
+        return hashlib.sha256(f"{document_hash}:{model_id}:{model_version or ''}:{api_version}".encode()).hexdigest()
+
+    @staticmethod
+    def is_prebuilt_model(model_id: str):
+        """Gets whether a model is a prebuilt model, whose results only change with the API version.
+
+        :param model_id: The ID of the model.
+        :return: True if the model is a prebuilt model, otherwise False.
+        """
+
+        return model_id.startswith('prebuilt-')
+
+    def get(self, key: str):
+        """Gets a cached analysis result.
+
+        :param key: The cache key of the result.
+        :return: The cached analysis result, or None if it is not cached or has expired.
+        """
+
+        path = self.__get_path__(key)
+
+        try:
+            created_time = os.path.getmtime(path)
+            if self.max_age_seconds is not None and time.time() - created_time > self.max_age_seconds:
+                self.__remove__(path)
+                self.__record__(hit=False)
+                return None
+
+            with open(path, 'rb') as file:
+                result_dict = json.load(file)
+            AnalysisResultCache.__restore_field_values__(result_dict)
+            result = AnalyzeResult.from_dict(result_dict)
+        except FileNotFoundError:
+            self.__record__(hit=False)
+            return None
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # The entry is corrupt, or was written by an incompatible version, so it is removed and analyzed again.
+            self.__remove__(path)
+            self.__record__(hit=False)
+            return None
+
+        # Mark the entry as used, keeping the time it was cached, so eviction by size removes the least recently used results
+        # first without extending their age. The entry may have been evicted by another process since it was read.
+        try:
+            os.utime(path, (time.time(), created_time))
+        except FileNotFoundError:
+            pass
+
+        self.__record__(hit=True)
+        return result
+
+    def set(self, key: str, result: AnalyzeResult):
+        """Caches an analysis result, evicting older results if the cache exceeds its maximum size.
+
+        :param key: The cache key of the result.
+        :param result: The analysis result to cache.
+        """
+
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'w') as file:
+                json.dump(result.to_dict(), file, cls=AzureJSONEncoder)
+            os.replace(temp_path, self.__get_path__(key))
+        except BaseException:
+            self.__remove__(temp_path)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """Evicts any expired results, and the least recently used results until the cache is within its maximum size."""
+
+        entries = []
+        now = time.time()
+        for file in os.listdir(self.cache_dir):
+            if not file.endswith('.json'):
+                continue
+
+            path = os.path.join(self.cache_dir, file)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            if self.max_age_seconds is not None and now - stat.st_mtime > self.max_age_seconds:
+                self.__remove__(path)
+                continue
+
+            entries.append((stat.st_atime, stat.st_size, path))
+
+        if self.max_size_bytes is None:
+            return
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+
+            self.__remove__(path)
+            total_size -= size
+
+    def clear(self):
+        """Removes all cached results."""
+
+        for file in os.listdir(self.cache_dir):
+            if file.endswith('.json'):
+                self.__remove__(os.path.join(self.cache_dir, file))
+
+    @staticmethod
+    def __restore_field_values__(result_dict: dict):
+        """Restores the date and time values of the document fields in a result, which are stored as ISO 8601 strings."""
+
+        def restore(field: dict | None):
+            if not isinstance(field, dict):
+                return
+
+            value = field.get('value')
+            if field.get('value_type') == 'date' and isinstance(value, str):
+                field['value'] = datetime.date.fromisoformat(value)
+            elif field.get('value_type') == 'time' and isinstance(value, str):
+                field['value'] = datetime.time.fromisoformat(value)
+            elif field.get('value_type') == 'dictionary' and isinstance(value, dict):
+                for item in value.values():
+                    restore(item)
+            elif field.get('value_type') == 'list' and isinstance(value, list):
+                for item in value:
+                    restore(item)
+
+        for document in result_dict.get('documents') or []:
+            for field in (document.get('fields') or {}).values():
+                restore(field)
+
+    def __get_path__(self, key: str):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def __remove__(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+
+        if path.endswith('.json'):
+            with self._lock:
+                self.evictions += 1
+
+    def __record__(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def __repr__(self):
+        return f"AnalysisResultCache(hits={self.hits}, misses={self.misses}, evictions={self.evictions})"
@@ -0,0 +1,124 @@
+import collections
+import json
+import os
+import threading
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class AnalysisResultLoader:
+    """A loader for the sections of Document Intelligence analysis result files, e.g. `<document>.ocr.json`.
+
+    Large files are parsed incrementally with ijson, if installed. Only the requested sections of `analyzeResult` are built,
+    with pages streamed one at a time and trimmed to the requested keys, so the words, spans, and styles of the result are
+    never held in memory at once. Smaller files are parsed whole, with orjson if installed, and the sections are selected
+    from them.
+
+    Parsing a file whole is 2 to 5 times faster at every size, but its peak memory is around 6 times the size of the file,
+    while parsing incrementally only holds the requested sections. The threshold trades the two, as measured by
+    benchmarks.analysis_result_loader: an 8 MiB file, around 300 pages, peaks at about 50 MiB when parsed whole.
+
+    Loaded sections are kept in a small least recently used cache, which is invalidated when the file is modified.
+    """
+
+    def __init__(self, max_entries: int = 16, stream_min_bytes: int = 8 * 1024 * 1024):
+        """Initializes the AnalysisResultLoader.
+
+        :param max_entries: The maximum number of loaded results to cache.
+        :param stream_min_bytes: The minimum size of a file to parse incrementally, rather than parsing it whole.
+        """
+
+        self.max_entries = max_entries
+        self.stream_min_bytes = stream_min_bytes
+        self.hits = 0
+        self.misses = 0
+        self._cache: collections.OrderedDict[tuple, tuple] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, analysis_result_path: str, sections: tuple[str, ...] = ('pages', 'documents'), page_keys: tuple[str, ...] | None = None):
+        """Loads sections of the `analyzeResult` of an analysis result file.
+
+        :param analysis_result_path: The path to the analysis result file.
+        :param sections: The top-level sections of the `analyzeResult` to load, e.g. `pages` or `documents`.
+        :param page_keys: The keys to keep from each page, e.g. `('pageNumber', 'width', 'height')`. If None, pages are loaded in full.
+        :return: The `analyzeResult` containing only the requested sections. It is shared with the cache, so must not be modified.
+        """
+
+        stat = os.stat(analysis_result_path)
+        key = (os.path.abspath(analysis_result_path), tuple(sections),
+               None if page_keys is None else tuple(page_keys))
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == version:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        if ijson is not None and stat.st_size >= self.stream_min_bytes:
+            analysis_result = AnalysisResultLoader.__parse_sections__(
+                analysis_result_path, sections, page_keys)
+        else:
+            analysis_result = AnalysisResultLoader.__select_sections__(
+                analysis_result_path, sections, page_keys)
+
+        with self._lock:
+            self._cache[key] = (version, analysis_result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        return analysis_result
+
+    def clear(self):
+        """Removes every loaded result from the cache."""
+
+        with self._lock:
+            self._cache.clear()
+
+    @staticmethod
+    def __parse_sections__(analysis_result_path: str, sections: tuple[str, ...], page_keys: tuple[str, ...] | None):
+        """Parses the requested sections of an analysis result file incrementally, one pass over the file per section."""
+
+        analysis_result = {}
+        with open(analysis_result_path, 'rb') as file:
+            for section in sections:
+                file.seek(0)
+                if section == 'pages' and page_keys is not None:
+                    analysis_result[section] = [{key: page[key] for key in page_keys if key in page}
+                                                for page in ijson.items(file, 'analyzeResult.pages.item', use_float=True)]
+                else:
+                    for value in ijson.items(file, f"analyzeResult.{section}", use_float=True):
+                        analysis_result[section] = value
+                        break
+
+        return analysis_result
+
+    @staticmethod
+    def __select_sections__(analysis_result_path: str, sections: tuple[str, ...], page_keys: tuple[str, ...] | None):
+        """Parses a whole analysis result file and selects the requested sections from it."""
+
+        if orjson is not None:
+            with open(analysis_result_path, 'rb') as file:
+                full_result = orjson.loads(file.read())['analyzeResult']
+        else:
+            with open(analysis_result_path, 'r') as file:
+                full_result = json.load(file)['analyzeResult']
+
+        analysis_result = {section: full_result[section]
+                           for section in sections if section in full_result}
+        if 'pages' in analysis_result and page_keys is not None:
+            analysis_result['pages'] = [{key: page[key] for key in page_keys if key in page}
+                                        for page in analysis_result['pages']]
+
+        return analysis_result
@@ -0,0 +1,254 @@
+import asyncio
+import os
+from azure.ai.formrecognizer import (DocumentAnalysisApiVersion)
+from azure.ai.formrecognizer.aio import (DocumentAnalysisClient, DocumentModelAdministrationClient)
+from azure.core.credentials import (AzureKeyCredential)
+from azure.core.credentials_async import (AsyncTokenCredential)
+from azure.core.exceptions import (HttpResponseError)
+from modules.analysis_result_cache import AnalysisResultCache
+from modules.document_intelligence_result_formatter import DocumentIntelligenceResultFormatter
+from modules.app_settings import AppSettings
+
+
+class BatchAnalysisClient:
+    """A client for running Document Intelligence analysis over many documents concurrently using the asynchronous clients."""
+
+    def __init__(self, settings: AppSettings, use_azure_credential: bool = False, azure_credential: AsyncTokenCredential | None = None, max_concurrency: int = 8, max_throttle_retries: int = 5, analysis_result_cache: AnalysisResultCache | None = None):
+        """Initializes the BatchAnalysisClient.
+
+        :param settings: The configuration settings for the client.
+        :param use_azure_credential: Whether to authenticate using the provided Azure credential instead of the Document Intelligence key.
+        :param azure_credential: The asynchronous Azure credential to use for authentication.
+        :param max_concurrency: The maximum number of analysis operations in flight at once.
+        :param max_throttle_retries: The maximum number of times to retry an analysis that has been throttled by the service.
+        :param analysis_result_cache: The cache to serve repeated analysis of the same document and model from.
+        """
+
+        if not use_azure_credential:
+            azure_credential = AzureKeyCredential(
+                settings.document_intelligence_key)
+
+        self.api_version = DocumentAnalysisApiVersion.V2023_07_31
+        self.document_analysis_client = DocumentAnalysisClient(
+            endpoint=settings.document_intelligence_endpoint, credential=azure_credential, api_version=self.api_version)
+        self.document_model_admin_client = DocumentModelAdministrationClient(
+            endpoint=settings.document_intelligence_endpoint, credential=azure_credential, api_version=self.api_version)
+        self.analysis_result_cache = analysis_result_cache
+        self.max_concurrency = max_concurrency
+        self.max_throttle_retries = max_throttle_retries
+
+    async def __aenter__(self):
+        await self.document_analysis_client.__aenter__()
+        await self.document_model_admin_client.__aenter__()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.document_model_admin_client.__aexit__(*args)
+        await self.document_analysis_client.__aexit__(*args)
+
+    async def close(self):
+        """Closes the underlying Document Intelligence clients."""
+
+        await self.document_model_admin_client.close()
+        await self.document_analysis_client.close()
+
+    async def analyze_documents(self, documents: list[str] | str, model_ids: list[str] | str = 'prebuilt-layout', output_dir: str | None = None):
+        """Runs analysis on a set of documents with one or more models, saving each result as it completes.
+
+        :param documents: The paths to the documents to analyze, or the path to a directory of PDF documents.
+        :param model_ids: The IDs of the models to analyze each document with.
+        :param output_dir: The directory to save the OCR JSON outputs to. Defaults to the directory of each document.
+        :return: The results of each analysis, in the order they completed.
+        """
+
+        return [result async for result in self.analyze_documents_iter(documents, model_ids, output_dir)]
+
+    async def analyze_documents_iter(self, documents: list[str] | str, model_ids: list[str] | str = 'prebuilt-layout', output_dir: str | None = None):
+        """Runs analysis on a set of documents with one or more models, yielding each result as it completes.
+
+        Each result is saved to its OCR JSON path before it is yielded, so results are streamed to disk as they finish rather than held in memory.
+
+        :param documents: The paths to the documents to analyze, or the path to a directory of PDF documents.
+        :param model_ids: The IDs of the models to analyze each document with.
+        :param output_dir: The directory to save the OCR JSON outputs to. Defaults to the directory of each document.
+        :return: An asynchronous iterator of the results of each analysis.
+        """
+
+        if isinstance(documents, str):
+            documents = BatchAnalysisClient.get_documents(documents)
+        if isinstance(model_ids, str):
+            model_ids = [model_ids]
+
+        model_versions = {}
+        if self.analysis_result_cache is not None:
+            model_versions = {model_id: await self.__get_model_version__(model_id) for model_id in model_ids}
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [asyncio.create_task(self.__analyze_document__(semaphore, document_path, model_id, model_versions.get(model_id), output_dir))
+                 for document_path in documents for model_id in model_ids]
+
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def __analyze_document__(self, semaphore: asyncio.Semaphore, document_path: str, model_id: str, model_version: str | None, output_dir: str | None):
+        """Analyzes a single document, retrying when throttled, and saves the result to its OCR JSON path.
+
+        :param semaphore: The semaphore limiting the number of analysis operations in flight.
+        :param document_path: The path to the document to analyze.
+        :param model_id: The ID of the model to analyze the document with.
+        :param model_version: The version of the model for the analysis cache key.
+        :param output_dir: The directory to save the OCR JSON output to.
+        :return: The result of the analysis.
+        """
+
+        output_path = BatchAnalysisClient.get_ocr_json_path(
+            document_path, model_id, output_dir)
+
+        async with semaphore:
+            try:
+                document = await asyncio.to_thread(BatchAnalysisClient.__read_document__, document_path)
+                analysis_result = await self.__get_cached_analysis_result__(model_id, model_version, document)
+                await asyncio.to_thread(DocumentIntelligenceResultFormatter.save_to_ocr_json, analysis_result, output_path)
+            except Exception as e:
+                return BatchAnalysisResult(document_path, model_id, output_path, e)
+
+        return BatchAnalysisResult(document_path, model_id, output_path)
+
+    async def __get_model_version__(self, model_id: str):
+        """Gets the version of a model for the analysis cache key.
+
+        Custom models can be rebuilt under the same ID, so their version is the time they were created.
+
+        :param model_id: The ID of the model.
+        :return: The time the model was created, or None for prebuilt models.
+        """
+
+        if AnalysisResultCache.is_prebuilt_model(model_id):
+            return None
+
+        model = await self.document_model_admin_client.get_document_model(model_id)
+        return model.created_on.isoformat()
+
+    async def __get_cached_analysis_result__(self, model_id: str, model_version: str | None, document: bytes):
+        """Gets the analysis result for a document from the cache, analyzing and caching it on a miss.
+
+        :param model_id: The ID of the model to analyze the document with.
+        :param model_version: The version of the model for the analysis cache key.
+        :param document: The content of the document to analyze.
+        :return: The result of the analysis.
+        """
+
+        if self.analysis_result_cache is None:
+            return await self.__begin_analyze_document__(model_id, document)
+
+        cache_key = AnalysisResultCache.get_key(
+            document, model_id, self.api_version.value, model_version)
+        analysis_result = await asyncio.to_thread(self.analysis_result_cache.get, cache_key)
+        if analysis_result is None:
+            analysis_result = await self.__begin_analyze_document__(model_id, document)
+            await asyncio.to_thread(self.analysis_result_cache.set, cache_key, analysis_result)
+
+        return analysis_result
+
+    async def __begin_analyze_document__(self, model_id: str, document: bytes):
+        """Starts an analysis and waits for its result, backing off when the service responds with 429 Too Many Requests.
+
+        The client's retry policy already honours Retry-After for individual requests. This handles the case where those
+        retries are exhausted while the service is still throttling.
+
+        :param model_id: The ID of the model to analyze the document with.
+        :param document: The content of the document to analyze.
+        :return: The result of the analysis.
+        """
+
+        attempt = 0
+        while True:
+            try:
+                poller = await self.document_analysis_client.begin_analyze_document(
+                    model_id=model_id, document=document)
+                return await poller.result()
+            except HttpResponseError as e:
+                if e.status_code != 429 or attempt >= self.max_throttle_retries:
+                    raise
+
+                await asyncio.sleep(BatchAnalysisClient.__get_retry_after__(e, attempt))
+                attempt += 1
+
+    @staticmethod
+    def __get_retry_after__(error: HttpResponseError, attempt: int):
+        retry_after = None
+        if error.response is not None:
+            retry_after = error.response.headers.get('Retry-After')
+
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return min(2 ** attempt, 60)
+
+    @staticmethod
+    def __read_document__(document_path: str):
+        with open(document_path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def get_documents(documents_dir: str):
+        """Gets the paths to the PDF documents in a directory.
+
+        :param documents_dir: The path to the directory containing the documents.
+        :return: The sorted paths to the PDF documents.
+        """
+
+        return sorted(os.path.join(documents_dir, file) for file in os.listdir(documents_dir)
+                      if file.lower().endswith('.pdf'))
+
+    @staticmethod
+    def get_ocr_json_path(document_path: str, model_id: str, output_dir: str | None = None):
+        """Gets the path to save the OCR JSON output of an analysis to.
+
+        The prebuilt-layout model result is saved to `<document>.ocr.json`, as required for training. Any other model result
+        is saved to `<document>.ocr_<version>.json`, where the version is taken from a model ID in the `<name>-<version>` format.
+
+        :param document_path: The path to the analyzed document.
+        :param model_id: The ID of the model used for the analysis.
+        :param output_dir: The directory to save the output to. Defaults to the directory of the document.
+        :return: The path to save the OCR JSON output to.
+        """
+
+        document_dir, document_file_name = os.path.split(document_path)
+        if output_dir is not None:
+            document_dir = output_dir
+
+        if model_id == 'prebuilt-layout':
+            return os.path.join(document_dir, f"{document_file_name}.ocr.json")
+
+        model_version = model_id.rsplit('-', 1)[-1]
+        return os.path.join(document_dir, f"{document_file_name}.ocr_{model_version}.json")
+
+
+class BatchAnalysisResult:
+    """A class representing the outcome of analyzing a single document in a batch."""
+
+    def __init__(self, document_path: str, model_id: str, output_path: str, error: Exception | None = None):
+        """Initializes the BatchAnalysisResult.
+
+        :param document_path: The path to the analyzed document.
+        :param model_id: The ID of the model used for the analysis.
+        :param output_path: The path the OCR JSON output was saved to.
+        :param error: The error raised by the analysis, if it failed.
+        """
+
+        self.document_path = document_path
+        self.model_id = model_id
+        self.output_path = output_path
+        self.error = error
+
+    @property
+    def succeeded(self):
+        return self.error is None
+
+    def __repr__(self):
+        return f"BatchAnalysisResult(document_path={self.document_path!r}, model_id={self.model_id!r}, succeeded={self.succeeded})"
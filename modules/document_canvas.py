@@ -1,8 +1,16 @@
-from pdf2image import convert_from_path
 import os
-import json
-from azure.ai.formrecognizer import (AnalyzeResult)
-from jupyter_bbox_widget import BBoxWidget
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+from modules import instrumentation
+from modules.analysis_result_loader import AnalysisResultLoader
+from modules.document_label import (DocumentLabel, DocumentLabelStore)
+from modules.field_definition_index import FieldDefinitionIndex
+from modules.field_region_index import FieldRegionIndex
+from modules.pdf_page_renderer import PdfPageRenderer
+from modules.word_spatial_index import WordSpatialIndex
+
+if TYPE_CHECKING:
+    from jupyter_bbox_widget import BBoxWidget
 
 
 class DocumentCanvas:
@@ -14,62 +22,120 @@ class DocumentCanvas:
         :param working_dir: The current working directory for storing files processed by the DocumentCanvas.
         """
 
-        self.canvases: list[BBoxWidget] = []
+        self.canvases: list['BBoxWidget'] = []
         self.images_dir = os.path.join(working_dir, 'images')
+        self.cache_dir = os.path.join(self.images_dir, '.cache')
+        self.analysis_result_loader = AnalysisResultLoader()
+        self._field_region_index_cache = None
         if not os.path.exists(self.images_dir):
             os.makedirs(self.images_dir)
 
-    def load_pdf(self, pdf_file_path: str, fields_file_path: str, analysis_result_path: str | None = None) -> list[BBoxWidget]:
+    def load_pdf(self, pdf_file_path: str, fields_file_path: str, analysis_result_path: str | None = None, lazy: bool = False, dpi: int = 200, thread_count: int = 1, layout_result_path: str | None = None, preview_max_dimension: int | None = None, preview_fmt: str = 'webp', preview_quality: int = 80) -> list['BBoxWidget']:
         """Loads a PDF file, converts it to images, and creates canvases for each page of the PDF file.
 
+        Rendered pages are cached on disk by the PDF content, DPI, and format, so reloading a document does not rasterize it again.
+        Only the sections of the analysis results needed by the canvases are loaded, and are cached until the files change.
+
+        When a preview size is given, the canvases show downscaled previews of the pages rather than the full-resolution
+        images, reducing the data sent to the browser. Regions are drawn in the preview's pixel space and normalized to the
+        preview's size, so the labels are unaffected.
+
         :param pdf_file_path: The path to the PDF file to load.
         :param analysis_result_path: The path to the analysis result file to load if available.
+        :param lazy: Whether to render each page only when its canvas is first accessed, rather than rendering every page up front.
+        :param dpi: The resolution to render the pages at.
+        :param thread_count: The number of Poppler processes to use when rendering every page up front.
+        :param layout_result_path: The path to the layout analysis result file, e.g. `<document>.ocr.json`, used to fill in the text of drawn regions.
+        :param preview_max_dimension: The maximum width or height of the page images shown on the canvases. If None, the full-resolution images are shown.
+        :param preview_fmt: The image format of the previews, e.g. `webp` or `jpeg`.
+        :param preview_quality: The quality of the previews, from 1 to 100.
         :return: A list of canvases representing the pages of the PDF file.
         """
 
-        pdf_file_name = os.path.basename(pdf_file_path)
-        pages = convert_from_path(pdf_file_path, fmt='jpeg')
+        renderer = PdfPageRenderer(
+            pdf_file_path, self.cache_dir, dpi=dpi, fmt='jpeg', thread_count=thread_count)
 
-        with open(fields_file_path, 'r') as file:
-            self.fields: dict = json.load(file)
-            # Set the initial canvas fields, excluding any fieldType that is 'array'
-            self.field_options = [
-                field['fieldKey'] for field in self.fields['fields'] if field['fieldType'] != 'array']
+        # The fields are indexed once per fields.json file, and the index is shared with the labels created from them.
+        self.field_index = FieldDefinitionIndex.from_file(fields_file_path)
+        self.fields: dict = self.field_index.fields
+        # Set the initial canvas fields, excluding any fieldType that is 'array'
+        self.field_options = self.field_index.canvas_field_keys
 
         analysis_result = None
+        field_region_index = None
         if analysis_result_path is not None:
-            with open(analysis_result_path, 'r') as file:
-                analysis_result = json.load(file)['analyzeResult']
+            analysis_result = self.analysis_result_loader.load(
+                analysis_result_path, ('pages', 'documents'), page_keys=('pageNumber', 'width', 'height'))
+            field_region_index = FieldRegionIndex.from_analysis_result(
+                analysis_result)
+
+        word_spatial_index = None
+        if layout_result_path is not None:
+            word_spatial_index = WordSpatialIndex(self.analysis_result_loader.load(
+                layout_result_path, ('pages',), page_keys=('pageNumber', 'width', 'height', 'words', 'lines')))
+
+        # The widget is only imported when creating canvases, so the labels can be read without loading Jupyter.
+        from jupyter_bbox_widget import BBoxWidget
 
-        for i, page in enumerate(pages):
-            page_ref = i + 1
-            image_path_ref = os.path.join(
-                self.images_dir, f'{pdf_file_name}.page_{page_ref}.jpg')
-            page.save(image_path_ref, 'JPEG')
+        def create_canvas(page_ref: int, image_path_ref: str):
+            display_path = image_path_ref
+            if preview_max_dimension is not None:
+                display_path = renderer.get_preview_path(
+                    page_ref, preview_max_dimension, preview_fmt, preview_quality)
 
             canvas = BBoxWidget(
-                image=image_path_ref,
+                image=display_path,
                 classes=self.field_options)
 
             canvas.image_path_ref = image_path_ref
             canvas.page_ref = page_ref
-            canvas.width = page.width
-            canvas.height = page.height
+            canvas.word_spatial_index = word_spatial_index
 
-            if analysis_result_path is not None:
+            # The canvas size is the size of the displayed image, which the drawn regions are in the pixel space of.
+            canvas.width, canvas.height = PdfPageRenderer.get_image_size(
+                display_path)
+
+            if analysis_result is not None:
                 self.render_label_regions(
-                    canvas, page_ref, analysis_result)
+                    canvas, page_ref, analysis_result, field_region_index)
+
+            return canvas
+
+        if lazy:
+            pages = {} if analysis_result is None else {
+                page['pageNumber']: page for page in analysis_result['pages']}
+
+            def get_page_regions(page_ref: int):
+                # Regions are taken in page coordinates normalized to a unit page, so the page is never rendered.
+                page = pages.get(page_ref)
+                bboxes = [] if field_region_index is None or page is None else field_region_index.get_bboxes(
+                    page_ref, 1 / page['width'], 1 / page['height'])
+                return renderer.get_cached_page_path(page_ref), page_ref, bboxes, 1, 1
 
-            self.canvases.append(canvas)
+            self.canvases = LazyCanvasList(
+                list(self.canvases), renderer.page_count,
+                lambda page_ref: create_canvas(page_ref, renderer.get_page_path(page_ref)),
+                get_page_regions)
+            return self.canvases
+
+        if isinstance(self.canvases, LazyCanvasList):
+            self.canvases = list(self.canvases)
+
+        with instrumentation.span('load_pdf', dpi=dpi) as span:
+            page_paths = renderer.get_page_paths()
+            for i, image_path_ref in enumerate(page_paths):
+                self.canvases.append(create_canvas(i + 1, image_path_ref))
+            span.set(items=len(page_paths))
 
         return self.canvases
 
-    def render_label_regions(self, canvas: BBoxWidget, page_number: int, analysis_result: dict):
+    def render_label_regions(self, canvas: 'BBoxWidget', page_number: int, analysis_result: dict, field_region_index: FieldRegionIndex | None = None):
         """Renders the label regions on the canvas for the specified page number.
 
         :param canvas: The canvas to render the label regions on.
         :param page_number: The page number to render the label regions on.
         :param analysis_result: The analysis result containing the label regions to render.
+        :param field_region_index: The index of the field regions in the analysis result. Built from the analysis result if not provided.
         """
 
         canvas_width = canvas.width
@@ -79,129 +145,217 @@ class DocumentCanvas:
         width = canvas_width / page_width
         height = canvas_height / page_height
 
-        if len(analysis_result['documents']) == 0:
+        if field_region_index is None:
+            field_region_index = FieldRegionIndex.from_analysis_result(
+                analysis_result)
+
+        if field_region_index is None:
             print('No documents found in the analysis result')
             return
 
-        document_fields: dict = analysis_result['documents'][0]['fields']
-        bboxes = self._get_bboxes__(
-            document_fields, page_number, width, height)
-
-        canvas.bboxes = bboxes
+        with instrumentation.span('extract_bboxes') as span:
+            canvas.bboxes = field_region_index.get_bboxes(
+                page_number, width, height)
+            # The regions as extracted, so regions that are moved or resized later can have their text taken again.
+            canvas.extracted_regions = {DocumentCanvas.__get_region_key__(bbox) for bbox in canvas.bboxes}
+            span.set(items=len(canvas.bboxes))
 
     def _get_bboxes__(self, fields_result: dict, page_number: int, width: int, height: int, parent_field: str | None = None, row_number: int | None = None):
-        bboxes = []
-
-        for fieldKey in fields_result.keys():
-            field_value: dict = fields_result[fieldKey]
+        # The index of the last fields is kept, so getting the regions of each page in turn only walks the fields once.
+        cache = self._field_region_index_cache
+        if cache is None or cache[0] is not fields_result or cache[1:3] != (parent_field, row_number):
+            cache = (fields_result, parent_field, row_number,
+                     FieldRegionIndex(fields_result, parent_field, row_number))
+            self._field_region_index_cache = cache
 
-            if (field_value['valueType'] == 'list'):
-                field_value_list: list = field_value['value']
-                for field_value_item in field_value_list:
-                    bboxes.extend(self._get_bboxes__(
-                        field_value_item['value'], page_number, width, height, fieldKey, field_value_list.index(field_value_item)))
+        return cache[3].get_bboxes(page_number, width, height)
 
-            if len(field_value['boundingRegions']) == 0:
-                continue
-
-            bboxes.append(self.__get_bbox__(
-                fieldKey, field_value, page_number, width, height, parent_field, row_number))
-
-        return bboxes
-
-    def __get_bbox__(self, fieldKey: str, fieldValue: dict, page_number: int, width: int, height: int, parent_field: str | None = None, row_number: int | None = None):
-        field_bounding_region: dict = fieldValue['boundingRegions'][0]
-        if field_bounding_region['pageNumber'] == page_number:
-            field_bounding_region_polygon: list = field_bounding_region['polygon']
-
-            field_bounding_region_x = field_bounding_region_polygon[0] * width
-            field_bounding_region_y = field_bounding_region_polygon[1] * height
-            field_bounding_region_width = (
-                field_bounding_region_polygon[2] - field_bounding_region_polygon[0]) * width
-            field_bounding_region_height = (
-                field_bounding_region_polygon[5] - field_bounding_region_polygon[1]) * height
-
-            return {
-                "x": field_bounding_region_x,
-                "y": field_bounding_region_y,
-                "width": field_bounding_region_width,
-                "height": field_bounding_region_height,
-                "label": fieldKey,
-                "content": fieldValue['content'],
-                "field": fieldKey if parent_field is None else parent_field,
-                "row_field": fieldKey,
-                "row_number": row_number
-            }
-
-    def get_document_labels(self):
+    def get_document_labels(self, snap_to_words: bool = False, retake_text: bool = False):
         """Gets the document labels from the canvases.
 
+        When a layout analysis result was loaded, regions that were drawn, moved, or resized have their text taken from the
+        words within them. When the pages were loaded lazily, the pages that have not been viewed are labelled with the
+        regions from the analysis result.
+
+        :param snap_to_words: Whether to snap drawn regions to the bounding box of the words within them.
+        :param retake_text: Whether to also replace the text of unchanged regions from the analysis result with the words within them.
         :return: The document labels.
         """
 
         document_labels = []
-        for canvas in self.canvases:
-            for bbox in canvas.bboxes:
-                document_label = DocumentLabel(
-                    canvas.image_path_ref,
-                    canvas.page_ref, 
-                    bbox)
-                document_label.normalize(canvas.width, canvas.height)
-                document_labels.append(document_label)
+        with instrumentation.span('get_document_labels') as span:
+            for image_path_ref, page_ref, bboxes, render_width, render_height in self.__get_page_regions__(snap_to_words, retake_text):
+                for bbox in bboxes:
+                    document_label = DocumentLabel(
+                        image_path_ref, page_ref, bbox)
+                    document_label.normalize(render_width, render_height)
+                    document_labels.append(document_label)
+            span.set(items=len(document_labels))
         return document_labels
 
+    def get_document_label_store(self, snap_to_words: bool = False, retake_text: bool = False):
+        """Gets the document labels from the canvases as a columnar store, normalized to the canvas sizes.
+
+        When the pages were loaded lazily, the pages that have not been viewed are labelled with the regions from the analysis result.
 
-class DocumentLabel:
-    """ A class to represent a bordered region in which a user can draw over a document to provide feedback with a label.
+        :param snap_to_words: Whether to snap drawn regions to the bounding box of the words within them.
+        :param retake_text: Whether to also replace the text of unchanged regions from the analysis result with the words within them.
+        :return: The store of document labels.
+        """
 
-    A label region tracks the start and end points drawn by the user.
+        label_store = DocumentLabelStore()
+        with instrumentation.span('get_document_labels') as span:
+            for image_path_ref, page_ref, bboxes, render_width, render_height in self.__get_page_regions__(snap_to_words, retake_text):
+                label_store.extend(image_path_ref, page_ref,
+                                   bboxes, render_width, render_height)
+            span.set(items=len(label_store))
+        return label_store
 
-    It also provides the necessary logic for normalizing the region coordinates to the canvas size, and extracting text from the region using OCR.
-    """
+    def __get_page_regions__(self, snap_to_words: bool, retake_text: bool):
+        """Gets the regions of each page, without rendering the pages of a lazily loaded document that have not been viewed.
 
-    def __init__(self, image_path_ref: str, page_ref: int, data: dict):
-        """Initializes the DocumentLabel.
+        Pages with a canvas have the regions drawn on it. Pages that have not been viewed have the regions predicted by the
+        analysis result, in page coordinates normalized to a unit page.
 
-        :param image_path_ref: The path to the image file that the region is drawn on.
-        :param page_ref: The page number that the region is drawn on.
-        :param data: The data for the region.
+        :param snap_to_words: Whether to snap drawn regions to the bounding box of the words within them.
+        :param retake_text: Whether to replace the text of unchanged regions from the analysis result with the words within them.
+        :return: The image path, page number, regions, and render size of each page, in page order.
         """
 
-        self.image_path_ref = image_path_ref
-        self.page_ref = page_ref
-        self.label = data['label']
-        self.content = data['content']
-        self.field = data['field']
-        self.row_field = data['row_field']
-        self.row_number = str(data['row_number'])
-        self.start_x = data['x']
-        self.start_y = data['y']
-        self.end_x = data['x'] + data['width']
-        self.end_y = data['y'] + data['height']
-
-    def normalize(self, render_width: int, render_height: int):
-        """Normalizes the region coordinates to the canvas size.
-
-        : param canvas: The canvas that the region is drawn on.
+        canvases = self.canvases
+        for index in range(len(canvases)):
+            if isinstance(canvases, LazyCanvasList) and not canvases.is_loaded(index):
+                yield canvases.get_page_regions(index)
+                continue
+
+            canvas = canvases[index]
+            yield (canvas.image_path_ref, canvas.page_ref,
+                   [self.__complete_bbox__(canvas, bbox, snap_to_words, retake_text) for bbox in canvas.bboxes],
+                   canvas.width, canvas.height)
+
+    def __complete_bbox__(self, canvas: 'BBoxWidget', bbox: dict, snap_to_words: bool, retake_text: bool = False):
+        """Fills in the details of a region on a canvas.
+
+        Regions drawn by the user only have a position and label, and have their content taken from the words within them.
+        Regions extracted from an analysis result keep the content predicted by the model, unless they have been moved or
+        resized since, or the text is taken again on request.
+
+        :param canvas: The canvas the region is drawn on.
+        :param bbox: The region drawn on the canvas.
+        :param snap_to_words: Whether to snap the region to the bounding box of the words within it.
+        :param retake_text: Whether to take the content of an unchanged region from the words within it.
+        :return: The region with its content, field, and row details.
+        """
+
+        word_spatial_index: WordSpatialIndex | None = getattr(
+            canvas, 'word_spatial_index', None)
+        if word_spatial_index is None and 'content' in bbox:
+            return bbox
+
+        completed_bbox = {
+            "content": None,
+            "field": bbox['label'],
+            "row_field": bbox['label'],
+            "row_number": None,
+            **bbox
+        }
+
+        if word_spatial_index is None:
+            return completed_bbox
+
+        box = (bbox['x'] / canvas.width, bbox['y'] / canvas.height,
+               (bbox['x'] + bbox['width']) / canvas.width, (bbox['y'] + bbox['height']) / canvas.height)
+
+        # Regions drawn by the user have no content, while the content predicted for an extracted region may be None, e.g. for a signature.
+        is_unchanged = 'content' in bbox and DocumentCanvas.__get_region_key__(
+            bbox) in getattr(canvas, 'extracted_regions', ())
+        if retake_text or not is_unchanged:
+            completed_bbox['content'] = word_spatial_index.get_text(
+                canvas.page_ref, box)
+
+        if snap_to_words:
+            snapped_box = word_spatial_index.snap(canvas.page_ref, box)
+            if snapped_box is not None:
+                completed_bbox['x'] = snapped_box[0] * canvas.width
+                completed_bbox['y'] = snapped_box[1] * canvas.height
+                completed_bbox['width'] = (
+                    snapped_box[2] - snapped_box[0]) * canvas.width
+                completed_bbox['height'] = (
+                    snapped_box[3] - snapped_box[1]) * canvas.height
+
+        return completed_bbox
+
+    @staticmethod
+    def __get_region_key__(bbox: dict):
+        # The position is rounded, as the canvas may round the coordinates of regions it syncs back.
+        return (round(bbox['x'], 1), round(bbox['y'], 1), round(bbox['width'], 1), round(bbox['height'], 1))
+
+
+class LazyCanvasList(Sequence):
+    """A sequence of canvases that creates the canvas for each page of a document only when it is first accessed."""
+
+    def __init__(self, canvases: list['BBoxWidget'], page_count: int, create_canvas, get_page_regions=None):
+        """Initializes the LazyCanvasList.
+
+        :param canvases: The canvases already loaded, which precede the pages of the document.
+        :param page_count: The number of pages in the document.
+        :param create_canvas: The function to create the canvas for a 1-based page number.
+        :param get_page_regions: The function to get the image path, page number, regions, and render size of a 1-based page number without creating its canvas.
         """
 
-        self.start_x_normalized = self.start_x / render_width
-        self.start_y_normalized = self.start_y / render_height
-        self.end_x_normalized = self.end_x / render_width
-        self.end_y_normalized = self.end_y / render_height
+        self._canvases: list['BBoxWidget | None'] = canvases + [None] * page_count
+        self._offset = len(canvases)
+        self._create_canvas = create_canvas
+        self._get_page_regions = get_page_regions
+
+    def __len__(self):
+        return len(self._canvases)
 
-    def get_bounding_box(self):
-        """Gets the bounding box of the region.
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
 
-        : return: The coordinates of the bounding box.
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('canvas index out of range')
+
+        canvas = self._canvases[index]
+        if canvas is None:
+            canvas = self._create_canvas(index - self._offset + 1)
+            self._canvases[index] = canvas
+
+        return canvas
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def loaded_canvases(self):
+        """The canvases that have been created so far."""
+
+        return [canvas for canvas in self._canvases if canvas is not None]
+
+    def is_loaded(self, index: int):
+        """Checks whether the canvas at an index has been created.
+
+        :param index: The index of the canvas.
+        :return: True if the canvas has been created, otherwise False.
         """
 
-        return [(self.start_x, self.start_y), (self.end_x, self.end_y)]
+        return self._canvases[index] is not None
 
-    def get_normalized_bounding_box(self):
-        """Gets the normalized bounding box of the region.
+    def get_page_regions(self, index: int):
+        """Gets the regions of the page at an index without creating its canvas.
 
-        : return: The normalized coordinates of the bounding box.
+        :param index: The index of the canvas of the page.
+        :return: The image path, page number, regions, and render size of the page.
         """
 
-        return [self.start_x_normalized, self.start_y_normalized, self.end_x_normalized, self.start_y_normalized, self.end_x_normalized, self.end_y_normalized, self.start_x_normalized, self.end_y_normalized]
+        page_ref = index - self._offset + 1
+        if self._get_page_regions is None:
+            return None, page_ref, [], 1, 1
+
+        return self._get_page_regions(page_ref)
+
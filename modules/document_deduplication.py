@@ -0,0 +1,350 @@
+"""Finds near-duplicate documents in a training data set from their layout analysis results.
+
+Each document is fingerprinted from its `<document>.ocr.json`:
+
+- A MinHash signature of the shingles of its words, estimating how much of its content it shares with another document.
+- A coarse layout signature of the grid cells of each page its words fall in, measuring how similar its layout is.
+
+Fingerprints are indexed with locality-sensitive hashing over bands of the MinHash signature, so each document is only
+compared with the few documents likely to be similar to it. A document is a near duplicate of an earlier one when both its
+content and layout similarity are at or above the thresholds. As a template model learns from the variation between its
+training documents, near duplicates add little but slow every build.
+
+Run from the repository root with, for example:
+
+    python -m modules.document_deduplication model_training --threshold 0.7
+"""
+
+import argparse
+import json
+import os
+import zlib
+import numpy as np
+from modules.analysis_result_loader import AnalysisResultLoader
+
+# The Mersenne prime modulus of the MinHash hash functions, small enough for their products to fit in 64 bits.
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+
+# The number of shingles hashed at once, bounding the memory used for long documents.
+_SHINGLE_CHUNK_SIZE = 4096
+
+_hash_parameters: dict[tuple[int, int], tuple[np.ndarray, np.ndarray]] = {}
+
+
+def _get_hash_parameters(num_perm: int, seed: int):
+    """Gets the coefficients of the MinHash hash functions, which must be the same for fingerprints to be compared."""
+
+    key = (num_perm, seed)
+    if key not in _hash_parameters:
+        rng = np.random.default_rng(seed)
+        _hash_parameters[key] = (
+            rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64),
+            rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64))
+    return _hash_parameters[key]
+
+
+class DocumentFingerprint:
+    """A class representing the content and layout signatures of a document."""
+
+    def __init__(self, name: str, minhash: np.ndarray, layout_cells: np.ndarray, page_count: int, shingle_count: int):
+        """Initializes the DocumentFingerprint.
+
+        :param name: The name of the document, e.g. `Invoice_1.pdf`.
+        :param minhash: The MinHash signature of the shingles of the document's words.
+        :param layout_cells: The sorted, unique grid cells of the pages that the document's words fall in.
+        :param page_count: The number of pages of the document.
+        :param shingle_count: The number of distinct shingles of the document's words.
+        """
+
+        self.name = name
+        self.minhash = minhash
+        self.layout_cells = layout_cells
+        self.page_count = page_count
+        self.shingle_count = shingle_count
+
+    @staticmethod
+    def from_analysis_result(name: str, analysis_result: dict, num_perm: int = 128, shingle_size: int = 2, grid_size: int = 16, seed: int = 1):
+        """Fingerprints a document from its layout analysis result.
+
+        :param name: The name of the document, e.g. `Invoice_1.pdf`.
+        :param analysis_result: The `analyzeResult` of the layout analysis of the document, with the words of each page.
+        :param num_perm: The number of hash functions of the MinHash signature.
+        :param shingle_size: The number of consecutive words in each shingle.
+        :param grid_size: The number of rows and columns of the grid each page is divided into for the layout signature.
+        :param seed: The seed of the MinHash hash functions.
+        :return: The fingerprint of the document.
+        """
+
+        words = []
+        cells = []
+        pages = analysis_result.get('pages') or []
+        for page_index, page in enumerate(pages):
+            page_words = page.get('words') or []
+            words.extend(word['content'].casefold() for word in page_words)
+
+            polygons = [word['polygon'] for word in page_words if len(word.get('polygon') or []) >= 8]
+            if len(polygons) == 0 or not page.get('width') or not page.get('height'):
+                continue
+            polygons = np.asarray(polygons, dtype=np.float64)[:, :8]
+            columns = np.clip((polygons[:, 0::2].mean(axis=1) / page['width'] * grid_size).astype(np.int64),
+                              0, grid_size - 1)
+            rows = np.clip((polygons[:, 1::2].mean(axis=1) / page['height'] * grid_size).astype(np.int64),
+                           0, grid_size - 1)
+            cells.append(page_index * grid_size * grid_size + rows * grid_size + columns)
+
+        layout_cells = np.unique(np.concatenate(cells)) if len(cells) > 0 else np.empty(0, dtype=np.int64)
+
+        shingles = {' '.join(words[i:i + shingle_size])
+                    for i in range(max(1, len(words) - shingle_size + 1))} if len(words) > 0 else set()
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles)) % _MERSENNE_PRIME
+
+        a, b = _get_hash_parameters(num_perm, seed)
+        minhash = np.full(num_perm, _MERSENNE_PRIME, dtype=np.uint64)
+        for start in range(0, len(hashes), _SHINGLE_CHUNK_SIZE):
+            chunk = hashes[start:start + _SHINGLE_CHUNK_SIZE]
+            minhash = np.minimum(minhash, ((a[:, None] * chunk[None, :] + b[:, None]) % _MERSENNE_PRIME).min(axis=1))
+
+        return DocumentFingerprint(name, minhash, layout_cells, len(pages), len(shingles))
+
+    @staticmethod
+    def from_file(analysis_result_path: str, name: str | None = None, loader: AnalysisResultLoader | None = None, **kwargs):
+        """Fingerprints a document from its layout analysis result file.
+
+        :param analysis_result_path: The path to the `<document>.ocr.json` layout analysis result.
+        :param name: The name of the document. If None, the file name without the `.ocr.json` extension is used.
+        :param loader: The loader to load the pages of the analysis result with.
+        :param kwargs: The options of the fingerprint, as for `from_analysis_result`.
+        :return: The fingerprint of the document.
+        """
+
+        if name is None:
+            name = os.path.basename(analysis_result_path).removesuffix('.ocr.json')
+
+        loader = loader or AnalysisResultLoader()
+        analysis_result = loader.load(
+            analysis_result_path, ('pages',), page_keys=('pageNumber', 'width', 'height', 'words'))
+        return DocumentFingerprint.from_analysis_result(name, analysis_result, **kwargs)
+
+    @property
+    def is_empty(self):
+        """Whether the document has no words to compare."""
+
+        return self.shingle_count == 0
+
+    def content_similarity(self, other: 'DocumentFingerprint'):
+        """Estimates the Jaccard similarity of the shingles of two documents.
+
+        :param other: The fingerprint of the other document.
+        :return: The estimated similarity, between 0 and 1.
+        """
+
+        if self.is_empty or other.is_empty:
+            return 0.0
+        return float(np.count_nonzero(self.minhash == other.minhash)) / len(self.minhash)
+
+    def layout_similarity(self, other: 'DocumentFingerprint'):
+        """Computes the Jaccard similarity of the grid cells of the pages that the words of two documents fall in.
+
+        :param other: The fingerprint of the other document.
+        :return: The similarity, between 0 and 1.
+        """
+
+        union = len(np.union1d(self.layout_cells, other.layout_cells))
+        if union == 0:
+            return 0.0
+        return len(np.intersect1d(self.layout_cells, other.layout_cells, assume_unique=True)) / union
+
+    def __repr__(self):
+        return f"DocumentFingerprint(name={self.name!r}, page_count={self.page_count}, shingle_count={self.shingle_count})"
+
+
+class NearDuplicateIndex:
+    """An index of document fingerprints for finding near-duplicate documents.
+
+    The MinHash signature of each fingerprint is split into bands, and documents sharing any band are candidates, which are
+    then compared by their estimated content similarity and their layout similarity. With more bands, documents with lower
+    similarity become candidates.
+    """
+
+    def __init__(self, threshold: float = 0.7, layout_threshold: float = 0.8, bands: int = 32):
+        """Initializes the NearDuplicateIndex.
+
+        :param threshold: The content similarity at or above which documents are near duplicates.
+        :param layout_threshold: The layout similarity at or above which documents are near duplicates.
+        :param bands: The number of bands to split the MinHash signatures into. It must divide the number of hash functions.
+        """
+
+        self.threshold = threshold
+        self.layout_threshold = layout_threshold
+        self.bands = bands
+        self.fingerprints: dict[str, DocumentFingerprint] = {}
+        self._buckets: dict[tuple[int, bytes], list[str]] = {}
+
+    def add(self, fingerprint: DocumentFingerprint):
+        """Adds a fingerprint to the index. Documents without words are not indexed.
+
+        :param fingerprint: The fingerprint of the document.
+        """
+
+        if fingerprint.is_empty:
+            return
+
+        self.fingerprints[fingerprint.name] = fingerprint
+        for key in self.__get_band_keys__(fingerprint):
+            self._buckets.setdefault(key, []).append(fingerprint.name)
+
+    def query(self, fingerprint: DocumentFingerprint):
+        """Finds the indexed documents that a document is a near duplicate of.
+
+        :param fingerprint: The fingerprint of the document.
+        :return: The name, content similarity, and layout similarity of each near-duplicate document, most similar first.
+        """
+
+        if fingerprint.is_empty:
+            return []
+
+        candidates = set()
+        for key in self.__get_band_keys__(fingerprint):
+            candidates.update(self._buckets.get(key, []))
+        candidates.discard(fingerprint.name)
+
+        matches = []
+        for name in candidates:
+            other = self.fingerprints[name]
+            content_similarity = fingerprint.content_similarity(other)
+            if content_similarity < self.threshold:
+                continue
+            layout_similarity = fingerprint.layout_similarity(other)
+            if layout_similarity < self.layout_threshold:
+                continue
+            matches.append((name, content_similarity, layout_similarity))
+
+        return sorted(matches, key=lambda match: (-match[1], -match[2], match[0]))
+
+    def __get_band_keys__(self, fingerprint: DocumentFingerprint):
+        if len(fingerprint.minhash) % self.bands != 0:
+            raise ValueError(
+                f"The {len(fingerprint.minhash)} hash functions of the fingerprint cannot be split into {self.bands} bands")
+
+        rows = len(fingerprint.minhash) // self.bands
+        return [(band, fingerprint.minhash[band * rows:(band + 1) * rows].tobytes()) for band in range(self.bands)]
+
+
+class DeduplicationResult:
+    """A class representing the near-duplicate documents found in a set of documents."""
+
+    def __init__(self):
+        """Initializes the DeduplicationResult."""
+
+        self.unique: list[str] = []
+        self.duplicates: dict[str, dict] = {}
+
+    def to_dict(self):
+        return {
+            "unique": self.unique,
+            "duplicates": self.duplicates
+        }
+
+    def __repr__(self):
+        return f"DeduplicationResult(unique={len(self.unique)}, duplicates={len(self.duplicates)})"
+
+
+def find_near_duplicates(analysis_result_paths: list[str], threshold: float = 0.7, layout_threshold: float = 0.8, bands: int = 32, num_perm: int = 128, shingle_size: int = 2, kept_names: set[str] | None = None, kept_fingerprints: list[DocumentFingerprint] | None = None):
+    """Finds the documents that are near duplicates of others, from their layout analysis results.
+
+    The documents to keep, e.g. those already uploaded, are compared first and are never near duplicates. The other documents
+    are compared from the earliest added, by the modification time of the document or else its analysis result, and each near
+    duplicate is attributed to the most similar earlier document that is kept, so of a group of near duplicates only the
+    first is kept.
+
+    :param analysis_result_paths: The paths to the `<document>.ocr.json` layout analysis results of the documents.
+    :param threshold: The content similarity at or above which documents are near duplicates.
+    :param layout_threshold: The layout similarity at or above which documents are near duplicates.
+    :param bands: The number of bands to split the MinHash signatures into.
+    :param num_perm: The number of hash functions of the MinHash signatures.
+    :param shingle_size: The number of consecutive words in each shingle.
+    :param kept_names: The names of the documents to keep, e.g. `Invoice_1.pdf`.
+    :param kept_fingerprints: The fingerprints of other documents to keep, whose analysis results are not among the paths, e.g. those of uploaded documents fingerprinted from their blobs. They must be made with the same `num_perm` and `shingle_size`.
+    :return: The unique documents, and the document each near duplicate duplicates, with its similarities.
+    """
+
+    kept_names = kept_names or set()
+    index = NearDuplicateIndex(threshold, layout_threshold, bands)
+    loader = AnalysisResultLoader()
+    result = DeduplicationResult()
+
+    fingerprints = [(False, 0.0, fingerprint.name, fingerprint) for fingerprint in kept_fingerprints or []]
+    for path in analysis_result_paths:
+        fingerprint = DocumentFingerprint.from_file(
+            path, loader=loader, num_perm=num_perm, shingle_size=shingle_size)
+        fingerprints.append(
+            (fingerprint.name not in kept_names, _get_added_time(path), fingerprint.name, fingerprint))
+
+    for is_new, _, _, fingerprint in sorted(fingerprints, key=lambda item: item[:3]):
+        matches = index.query(fingerprint) if is_new else []
+        if len(matches) > 0:
+            name, content_similarity, layout_similarity = matches[0]
+            result.duplicates[fingerprint.name] = {
+                "duplicateOf": name,
+                "contentSimilarity": content_similarity,
+                "layoutSimilarity": layout_similarity
+            }
+            continue
+
+        index.add(fingerprint)
+        result.unique.append(fingerprint.name)
+
+    return result
+
+
+def _get_added_time(analysis_result_path: str):
+    document_path = analysis_result_path.removesuffix('.ocr.json')
+    if os.path.exists(document_path):
+        return os.path.getmtime(document_path)
+    return os.path.getmtime(analysis_result_path)
+
+
+def find_near_duplicates_in_directory(documents_dir: str, **kwargs):
+    """Finds the near-duplicate documents in a directory, from the `<document>.ocr.json` layout analysis results in it.
+
+    :param documents_dir: The directory containing the documents and their layout analysis results, e.g. `model_training`.
+    :param kwargs: The options of the search, as for `find_near_duplicates`.
+    :return: The unique documents, and the document each near duplicate duplicates, with its similarities.
+    """
+
+    analysis_result_paths = [os.path.join(documents_dir, file_name) for file_name in sorted(os.listdir(documents_dir))
+                             if file_name.endswith('.ocr.json')]
+    return find_near_duplicates(analysis_result_paths, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Find near-duplicate documents in a training data set from their layout analysis results.')
+    parser.add_argument('documents_dir',
+                        help='The directory containing the documents and their <document>.ocr.json layout analysis results.')
+    parser.add_argument('--threshold', type=float, default=0.7,
+                        help='The content similarity at or above which documents are near duplicates.')
+    parser.add_argument('--layout-threshold', type=float, default=0.8,
+                        help='The layout similarity at or above which documents are near duplicates.')
+    parser.add_argument('--bands', type=int, default=32,
+                        help='The number of bands to split the MinHash signatures into.')
+    parser.add_argument('--output',
+                        help='The path to save the result to as JSON.')
+    args = parser.parse_args()
+
+    result = find_near_duplicates_in_directory(
+        args.documents_dir, threshold=args.threshold, layout_threshold=args.layout_threshold, bands=args.bands)
+
+    for name, duplicate in result.duplicates.items():
+        print(f"{name} duplicates {duplicate['duplicateOf']} "
+              f"(content {duplicate['contentSimilarity']:.2f}, layout {duplicate['layoutSimilarity']:.2f})")
+    print(f"{len(result.unique)} unique, {len(result.duplicates)} near duplicates")
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(result.to_dict(), file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
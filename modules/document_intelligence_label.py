@@ -1,28 +1,23 @@
-from modules.document_canvas import (DocumentLabel)
+from modules.document_label import (DocumentLabel)
+from modules.feedback_label import (FeedbackLabel)
+from modules.field_definition_index import (FieldDefinitionIndex)
 from ipywidgets import (Dropdown, Text, VBox, Label)
 
 
-class DocumentIntelligenceLabel:
+class DocumentIntelligenceLabel(FeedbackLabel):
     """A class representing a label for a document intelligence model.
 
     This class is used to create a visual object that allows users to label regions in a document.
     """
 
-    def __init__(self, label: DocumentLabel, fields: dict):
+    def __init__(self, label: DocumentLabel, fields: 'dict | FieldDefinitionIndex'):
         """Initializes the DocumentIntelligenceLabel.
 
         :param border: The object representing the region to label.
-        :param fields: The fields to choose from when labeling the region.
+        :param fields: The fields to choose from when labeling the region, or their index.
         """
 
-        self.label = label.label
-        self.field = label.field
-        self.item_row_number = label.row_number
-        self.item_row_field = label.row_field
-        self.label_type = None
-        self.text = label.content
-        self.border = label
-        self.fields = fields
+        super().__init__(label, fields)
 
         self.ui_field = None
         self.ui_text = None
@@ -38,12 +33,11 @@ class DocumentIntelligenceLabel:
         :return: The UI container for the label.
         """
 
-        field_options = ['']
-        for field in self.fields['fields']:
-            field_options.append(field['fieldKey'])
+        # The widgets of a previous render are replaced, e.g. when a LabelReviewPanel shows the label's page again.
+        self.close()
 
         self.ui_field = Dropdown(
-            options=field_options,
+            options=self.field_index.field_options,
             description='Field:',
             continuous_update=True,
             value=self.field
@@ -76,14 +70,34 @@ class DocumentIntelligenceLabel:
         self.field = change.new
         self.__setup_field_ui__()
 
+    def close(self):
+        """Closes the label UI, releasing its widgets. The label keeps its values, and can be rendered again."""
+
+        for widget in [self.ui_field, self.ui_text, self.ui_bounding_box, self.ui_row_number, self.ui_row_field,
+                       self.ui_row_container, self.ui_container]:
+            if widget is not None:
+                widget.close()
+
+        self.ui_field = None
+        self.ui_text = None
+        self.ui_bounding_box = None
+        self.ui_row_number = None
+        self.ui_row_field = None
+        self.ui_row_container = None
+        self.ui_container = None
+
     def __setup_field_ui__(self):
-        field_option = next(
-            (x for x in self.fields['fields'] if x['fieldKey'] == self.field), None)
+        field_option = self.__get_field_option__()
         if field_option:
-            if field_option['fieldType'] == "array":
-                itemType = field_option['itemType']
-                definition = self.fields['definitions'][itemType]
+            if self.ui_row_container is not None:
+                self.ui_container.children = self.ui_container.children[:-1]
+                for widget in [self.ui_row_number, self.ui_row_field, self.ui_row_container]:
+                    widget.close()
+                self.ui_row_number = None
+                self.ui_row_field = None
+                self.ui_row_container = None
 
+            if field_option['fieldType'] == "array":
                 # Add a text box to the existing vbox for the row number
                 self.ui_row_number = Text(
                     value=self.item_row_number,
@@ -93,9 +107,10 @@ class DocumentIntelligenceLabel:
                 self.ui_row_number.observe(
                     self.__handle_row_number_change__, names='value')
 
-                row_field_options = ['']
-                for row_field in definition['fields']:
-                    row_field_options.append(row_field['fieldKey'])
+                row_field_options = self.field_index.get_row_field_options(
+                    self.field)
+                if self.item_row_field not in row_field_options:
+                    self.item_row_field = ''
 
                 self.ui_row_field = Dropdown(
                     options=row_field_options,
@@ -113,17 +128,7 @@ class DocumentIntelligenceLabel:
                 
                 self.__set_row_label__()
             else:
-                self.label = self.field
-
-                if field_option['fieldType'] == "signature":
-                    self.text = ""
-                    self.label_type = "region"
-                else:
-                    self.label_type = None
-
-                if self.ui_row_container is not None:
-                    self.ui_container.children = self.ui_container.children[:-1]
-                    self.ui_row_container = None
+                self.__apply_field_option__(field_option)
 
     def __handle_text_change__(self, change):
         """Handles the change for a text box.
@@ -150,32 +155,3 @@ class DocumentIntelligenceLabel:
 
         self.item_row_field = change.new
         self.__set_row_label__()
-
-    def __set_row_label__(self):
-        """Sets the label for a row in a table."""
-
-        self.label = f"{
-            self.field}/{self.item_row_number}/{self.item_row_field}"
-        self.label_type = None
-
-    def as_label(self):
-        """Returns the label in the desired Document Intelligence format.
-
-        :return: The JSON object representing the label.
-        """
-
-        label_json = {
-            "label": self.label,
-            "value": [
-                {
-                    "page": self.border.page_ref,
-                    "text": self.text,
-                    "boundingBoxes": [self.border.get_normalized_bounding_box()]
-                }
-            ],
-        }
-
-        if self.label_type is not None:
-            label_json['labelType'] = self.label_type
-
-        return label_json
@@ -1,42 +1,79 @@
 import datetime
+import functools
 import json
-from typing import Dict
-from azure.ai.formrecognizer import (AnalyzeResult)
-from azure.core.serialization import AzureJSONEncoder
-from modules.document_intelligence_label import DocumentIntelligenceLabel
+import os
+import uuid
+from typing import (Dict, TYPE_CHECKING)
+from modules import instrumentation
+from modules.labels_index import LabelsIndex
+
+if TYPE_CHECKING:
+    from azure.ai.formrecognizer import (AnalyzeResult)
+    from modules.feedback_label import FeedbackLabel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 class DocumentIntelligenceResultFormatter:
     @staticmethod
-    def save_to_labels_json(result: list[DocumentIntelligenceLabel], pdf_file_name: str, json_file_path: str):
+    def save_to_labels_json(result: list['FeedbackLabel'], pdf_file_name: str, json_file_path: str, compact: bool = False, atomic: bool = True):
         """Save the results of document labeling to a JSON file in the expected format for Azure AI Document Intelligence.
 
+        Labels are saved in label order. Labels that share a label, such as a field with several bounding regions, are saved
+        as one label with a value for each region.
+
         :param results: The results of the document labeling.
         :param json_file_path: The path to the JSON file where the result will be saved.
+        :param compact: Whether to write the JSON without indentation.
+        :param atomic: Whether to write to a temporary file and rename it into place, so the file is never left partially written.
         :return: The reformatted result of the Document Intelligence labels as a dictionary.
         """
 
-        ordered_labels = sorted(result, key=lambda x: x.label)
-    
-        labels_result = {
-            "$schema": "https://schema.cognitiveservices.azure.com/formrecognizer/2021-03-01/labels.json",
-            "document": pdf_file_name,
-            "labels": [label.as_label() for label in ordered_labels]
-        }
+        labels_index = LabelsIndex(pdf_file_name)
+        labels_index.apply(result)
+        labels_result = labels_index.to_dict()
 
-        r = json.dumps(labels_result)
-
-        with open(json_file_path, 'w') as json_file:
-            json.dump(json.loads(r), json_file, indent=4, cls=AzureJSONEncoder)
+        DocumentIntelligenceResultFormatter.__write_json__(
+            labels_result, json_file_path, compact, atomic)
 
         return labels_result
 
     @staticmethod
-    def save_to_ocr_json(result: AnalyzeResult, json_file_path: str):
+    def merge_to_labels_json(result: list['FeedbackLabel'], pdf_file_name: str, json_file_path: str, removed_labels: list[str | tuple[str, int]] | None = None, compact: bool = False, atomic: bool = True):
+        """Merge the results of document labeling into an existing labels JSON file, writing it only if the labels changed.
+
+        Each label replaces the existing values of that label on the same page, and any other existing labels are kept. If the
+        file does not exist, it is created with the same content as `save_to_labels_json`.
+
+        :param result: The new or corrected labels.
+        :param pdf_file_name: The file name of the labeled PDF document.
+        :param json_file_path: The path to the labels JSON file to merge into.
+        :param removed_labels: The labels to remove, as a label, a `(label, page)` tuple, or a table field.
+        :param compact: Whether to write the JSON without indentation.
+        :param atomic: Whether to write to a temporary file and rename it into place, so the file is never left partially written.
+        :return: The diff of the labels that were added, changed, and removed.
+        """
+
+        labels_index = LabelsIndex.from_file(json_file_path, pdf_file_name)
+        diff = labels_index.apply(result, removed_labels)
+
+        if diff.has_changes or not os.path.exists(json_file_path):
+            DocumentIntelligenceResultFormatter.__write_json__(
+                labels_index.to_dict(), json_file_path, compact, atomic)
+
+        return diff
+
+    @staticmethod
+    def save_to_ocr_json(result: 'AnalyzeResult', json_file_path: str, compact: bool = False, atomic: bool = True):
         """Save the result of a Document Intelligence analysis to a JSON file.
 
         :param result: The result of the Document Intelligence analysis.
         :param json_file_path: The path to the JSON file where the result will be saved.
+        :param compact: Whether to write the JSON without indentation.
+        :param atomic: Whether to write to a temporary file and rename it into place, so the file is never left partially written.
         :return: The reformatted result of the Document Intelligence analysis as a dictionary.
         """
 
@@ -49,45 +86,108 @@ class DocumentIntelligenceResultFormatter:
             "status": "succeeded",
             "createdDateTime": date,
             "lastUpdatedDateTime": date,
-            "analyzeResult": DocumentIntelligenceResultFormatter.reformat_analyze_result_dict(analyzeResult),
         }
 
-        r = json.dumps(ocr_result)
+        with instrumentation.span('reformat_analyze_result_dict', items=len(analyzeResult.get('pages') or [])):
+            ocr_result["analyzeResult"] = DocumentIntelligenceResultFormatter.reformat_analyze_result_dict(
+                analyzeResult)
 
-        with open(json_file_path, 'w') as json_file:
-            json.dump(json.loads(r), json_file, indent=4, cls=AzureJSONEncoder)
+        DocumentIntelligenceResultFormatter.__write_json__(
+            ocr_result, json_file_path, compact, atomic)
 
         return ocr_result
 
+    @staticmethod
+    def __write_json__(data: Dict, json_file_path: str, compact: bool, atomic: bool):
+        """Writes a dictionary to a JSON file in a single pass.
+
+        Indented output is streamed to the file by the standard library encoder. Compact output uses orjson, if installed.
+
+        :param data: The dictionary to write.
+        :param json_file_path: The path to the JSON file to write to.
+        :param compact: Whether to write the JSON without indentation.
+        :param atomic: Whether to write to a temporary file in the same directory and rename it into place.
+        """
+
+        target_path = json_file_path
+        if atomic:
+            target_path = f"{json_file_path}.{uuid.uuid4().hex}.tmp"
+
+        try:
+            with instrumentation.span('write_json', compact=compact) as span:
+                DocumentIntelligenceResultFormatter.__write_json_file__(
+                    data, target_path, compact)
+                span.set(bytes=os.path.getsize(target_path))
+
+            if atomic:
+                os.replace(target_path, json_file_path)
+        except BaseException:
+            if atomic and os.path.exists(target_path):
+                os.remove(target_path)
+            raise
+
+    @staticmethod
+    def __write_json_file__(data: Dict, json_file_path: str, compact: bool):
+        # The Azure SDK is only imported when writing, so formatting does not pay its import cost.
+        from azure.core.serialization import AzureJSONEncoder
+
+        if compact and orjson is not None:
+            with open(json_file_path, 'wb') as json_file:
+                json_file.write(orjson.dumps(
+                    data, default=AzureJSONEncoder().default, option=orjson.OPT_PASSTHROUGH_DATETIME))
+        else:
+            with open(json_file_path, 'w') as json_file:
+                json.dump(data, json_file, indent=None if compact else 4,
+                          separators=(',', ':') if compact else None, cls=AzureJSONEncoder)
+
     @staticmethod
     def reformat_analyze_result_dict(analyze_result_dict: Dict):
         """Reformats the AnalyzeResult dictionary output into the expected format for Azure AI Document Intelligence.
 
-        Converts the keys of the dictionary, recursively through all nested dictionaries or array of dictionaries, to camel case (e.g., from my_property to myProperty).
+        Converts the keys of the dictionary, through all nested dictionaries or arrays, to camel case (e.g., from my_property to myProperty).
         Updates any "polygon" key values from [{'x': 0, 'y': 0}] to [x, y, x, y, ...].
 
+        The dictionary is walked iteratively with an explicit stack, so deeply nested results do not hit the recursion limit.
+        Key conversions are cached, and "polygon" and "spans" arrays, which make up most of a result, are copied without
+        walking each of their items.
+
         :param dictionary: The dictionary to convert.
         :return: The dictionary with the keys converted to camel case.
         """
 
-        result = {}
-        for key, value in analyze_result_dict.items():
-            if isinstance(value, dict):
-                value = DocumentIntelligenceResultFormatter.reformat_analyze_result_dict(
-                    value)
-            elif isinstance(value, list):
-                value = [DocumentIntelligenceResultFormatter.reformat_analyze_result_dict(
-                    item) for item in value]
-
-            if key == "polygon":
-                value = [coord for point in value for coord in point.values()]
+        to_camel_case = DocumentIntelligenceResultFormatter.__to_camel_case__
 
-            result[DocumentIntelligenceResultFormatter.__to_camel_case__(
-                key)] = value
+        result = {}
+        stack = [(analyze_result_dict, result)]
+        while stack:
+            source, target = stack.pop()
+
+            if isinstance(source, dict):
+                for key, value in source.items():
+                    if key == "polygon" and isinstance(value, list):
+                        value = [coord for point in value for coord in (
+                            point.values() if isinstance(point, dict) else (point,))]
+                    elif key == "spans" and isinstance(value, list):
+                        value = [dict(span) if isinstance(span, dict) else span for span in value]
+                    elif isinstance(value, (dict, list)):
+                        value_target = {} if isinstance(value, dict) else []
+                        stack.append((value, value_target))
+                        value = value_target
+
+                    target[to_camel_case(key)] = value
+            else:
+                for item in source:
+                    if isinstance(item, (dict, list)):
+                        item_target = {} if isinstance(item, dict) else []
+                        stack.append((item, item_target))
+                        item = item_target
+
+                    target.append(item)
 
         return result
 
     @staticmethod
+    @functools.cache
     def __to_camel_case__(snake_str: str):
         components = snake_str.split('_')
         return components[0] + ''.join(x.title() for x in components[1:])
@@ -0,0 +1,340 @@
+import itertools
+import operator
+import sys
+import numpy as np
+
+
+class DocumentLabel:
+    """ A class to represent a bordered region in which a user can draw over a document to provide feedback with a label.
+
+    A label region tracks the start and end points drawn by the user.
+
+    It also provides the necessary logic for normalizing the region coordinates to the canvas size, and extracting text from the region using OCR.
+    """
+
+    def __init__(self, image_path_ref: str, page_ref: int, data: dict):
+        """Initializes the DocumentLabel.
+
+        :param image_path_ref: The path to the image file that the region is drawn on.
+        :param page_ref: The page number that the region is drawn on.
+        :param data: The data for the region.
+        """
+
+        self.image_path_ref = image_path_ref
+        self.page_ref = page_ref
+        self.label = data['label']
+        self.content = data['content']
+        self.field = data['field']
+        self.row_field = data['row_field']
+        self.row_number = str(data['row_number'])
+        self.start_x = data['x']
+        self.start_y = data['y']
+        self.end_x = data['x'] + data['width']
+        self.end_y = data['y'] + data['height']
+
+    def normalize(self, render_width: int, render_height: int):
+        """Normalizes the region coordinates to the canvas size.
+
+        : param canvas: The canvas that the region is drawn on.
+        """
+
+        self.start_x_normalized = self.start_x / render_width
+        self.start_y_normalized = self.start_y / render_height
+        self.end_x_normalized = self.end_x / render_width
+        self.end_y_normalized = self.end_y / render_height
+
+    def get_bounding_box(self):
+        """Gets the bounding box of the region.
+
+        : return: The coordinates of the bounding box.
+        """
+
+        return [(self.start_x, self.start_y), (self.end_x, self.end_y)]
+
+    def get_normalized_bounding_box(self):
+        """Gets the normalized bounding box of the region.
+
+        : return: The normalized coordinates of the bounding box.
+        """
+
+        return [self.start_x_normalized, self.start_y_normalized, self.end_x_normalized, self.start_y_normalized, self.end_x_normalized, self.end_y_normalized, self.start_x_normalized, self.end_y_normalized]
+
+
+class DocumentLabelStore:
+    """A columnar store for a collection of document labels.
+
+    Coordinates, page numbers, and render sizes are kept in NumPy arrays, and the string fields of each label in an interned
+    tuple, so a large number of labels can be created, normalized, and converted to bounding polygons without the overhead of
+    an object per label. Labels are added a page at a time, and the arrays are only built once, when they are first needed.
+    Indexing or iterating the store yields DocumentLabelView objects that can be used anywhere a DocumentLabel is expected,
+    which read from lists converted from the arrays in one pass rather than indexing the arrays for each label.
+    """
+
+    # The string fields and the geometry of a region drawn on the canvas.
+    __get_bbox_attributes__ = operator.itemgetter(
+        'label', 'content', 'field', 'row_field', 'row_number')
+    __get_bbox_geometry__ = operator.itemgetter('x', 'y', 'width', 'height')
+
+    def __init__(self):
+        """Initializes the DocumentLabelStore."""
+
+        self.attributes: list[tuple] = []
+
+        # The geometry of the labels added since the arrays were last built, and a run of (image_path_ref, page_ref,
+        # render_width, render_height, count) for each call to extend.
+        self._pending_geometry: list[float] = []
+        self._pending_runs: list[tuple] = []
+        self._image_path_refs: list[str] = []
+        self._page_refs_array = np.empty(0, dtype=np.int32)
+        self._coords_array = np.empty((0, 4), dtype=np.float64)
+        self._render_sizes_array = np.empty((0, 2), dtype=np.float64)
+        self._rows = None
+
+    def __len__(self):
+        return len(self.attributes)
+
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('label index out of range')
+
+        return DocumentLabelView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield DocumentLabelView(self, index)
+
+    def extend(self, image_path_ref: str, page_ref: int, bboxes: list[dict], render_width: float, render_height: float):
+        """Adds the labels for the bounding boxes drawn on a page.
+
+        :param image_path_ref: The path to the image file that the regions are drawn on.
+        :param page_ref: The page number that the regions are drawn on.
+        :param bboxes: The bounding boxes of the regions, as drawn on the canvas.
+        :param render_width: The width of the canvas that the regions are drawn on.
+        :param render_height: The height of the canvas that the regions are drawn on.
+        """
+
+        count = len(bboxes)
+        if count == 0:
+            return
+
+        self.attributes.extend(map(DocumentLabelStore.__intern_attributes__, map(
+            DocumentLabelStore.__get_bbox_attributes__, bboxes)))
+        self._pending_geometry.extend(itertools.chain.from_iterable(
+            map(DocumentLabelStore.__get_bbox_geometry__, bboxes)))
+        self._pending_runs.append(
+            (sys.intern(image_path_ref), page_ref, render_width, render_height, count))
+
+    @property
+    def image_path_refs(self):
+        """The paths to the image files that the labels are drawn on."""
+
+        self.__consolidate__()
+        return self._image_path_refs
+
+    @property
+    def page_refs(self):
+        """The page numbers of the labels."""
+
+        self.__consolidate__()
+        return self._page_refs_array
+
+    @property
+    def coords(self):
+        """The start and end coordinates of the labels, as rows of [start_x, start_y, end_x, end_y]."""
+
+        self.__consolidate__()
+        return self._coords_array
+
+    @property
+    def render_sizes(self):
+        """The sizes the labels are normalized to, as rows of [width, height]."""
+
+        self.__consolidate__()
+        return self._render_sizes_array
+
+    def normalize(self, index: int | None = None, render_width: float | None = None, render_height: float | None = None):
+        """Sets the sizes the labels are normalized to.
+
+        The labels added by `extend` are normalized to the canvas they were drawn on. This can be used to normalize to a different size.
+
+        :param index: The index of the label to normalize, or None to normalize all labels.
+        :param render_width: The width to normalize to.
+        :param render_height: The height to normalize to.
+        """
+
+        if render_width is None or render_height is None or render_width <= 0 or render_height <= 0:
+            raise ValueError(
+                f"The render size must be positive, but was {render_width}x{render_height}")
+
+        render_sizes = self.render_sizes
+        if index is None:
+            render_sizes[:] = [render_width, render_height]
+        else:
+            render_sizes[index] = [render_width, render_height]
+        self._rows = None
+
+    def get_normalized_coords(self):
+        """Gets the coordinates of the labels normalized to their render sizes.
+
+        :return: The normalized coordinates, as rows of [start_x, start_y, end_x, end_y].
+        """
+
+        render_sizes = self.render_sizes
+        return self.coords / np.hstack((render_sizes, render_sizes))
+
+    def get_normalized_bounding_boxes(self):
+        """Gets the normalized bounding boxes of the labels as 8-point polygons.
+
+        :return: The normalized bounding boxes, as rows of [x1, y1, x2, y2, x3, y3, x4, y4] in clockwise order from the top left.
+        """
+
+        normalized = self.get_normalized_coords()
+        return normalized[:, [0, 1, 2, 1, 2, 3, 0, 3]]
+
+    def get_rows(self):
+        """Gets the page number, coordinates, and normalized bounding box of each label as Python values.
+
+        The arrays are converted in one pass, and the rows are kept until labels are added or normalized.
+
+        :return: The page numbers, the [start_x, start_y, end_x, end_y] coordinates, and the normalized bounding boxes of the labels.
+        """
+
+        self.__consolidate__()
+        if self._rows is None:
+            self._rows = (self._page_refs_array.tolist(), self._coords_array.tolist(),
+                          self.get_normalized_bounding_boxes().tolist())
+        return self._rows
+
+    @staticmethod
+    def __intern_attributes__(attributes: tuple):
+        label, content, field, row_field, row_number = attributes
+        intern = DocumentLabelStore.__intern__
+        return (intern(label), content, intern(field), intern(row_field), sys.intern(str(row_number)))
+
+    @staticmethod
+    def __intern__(value: str | None):
+        return sys.intern(value) if isinstance(value, str) else value
+
+    def __consolidate__(self):
+        if len(self._pending_runs) == 0:
+            return
+
+        coords = np.fromiter(self._pending_geometry, dtype=np.float64,
+                             count=len(self._pending_geometry)).reshape(-1, 4)
+        coords[:, 2:] += coords[:, :2]
+
+        image_path_refs, page_refs, render_widths, render_heights, counts = zip(
+            *self._pending_runs)
+        for image_path_ref, count in zip(image_path_refs, counts):
+            self._image_path_refs.extend([image_path_ref] * count)
+
+        self._page_refs_array = np.concatenate((self._page_refs_array, np.repeat(
+            np.array(page_refs, dtype=np.int32), counts)))
+        self._coords_array = np.concatenate((self._coords_array, coords))
+        self._render_sizes_array = np.concatenate((self._render_sizes_array, np.repeat(
+            np.array((render_widths, render_heights), dtype=np.float64).T, counts, axis=0)))
+        self._pending_geometry = []
+        self._pending_runs = []
+        self._rows = None
+
+
+class DocumentLabelView:
+    """A view of a single label in a DocumentLabelStore that is compatible with DocumentLabel."""
+
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store: DocumentLabelStore, index: int):
+        """Initializes the DocumentLabelView.
+
+        :param store: The store containing the label.
+        :param index: The index of the label in the store.
+        """
+
+        self._store = store
+        self._index = index
+
+    @property
+    def image_path_ref(self):
+        return self._store.image_path_refs[self._index]
+
+    @property
+    def page_ref(self):
+        return self._store.get_rows()[0][self._index]
+
+    @property
+    def label(self):
+        return self._store.attributes[self._index][0]
+
+    @property
+    def content(self):
+        return self._store.attributes[self._index][1]
+
+    @property
+    def field(self):
+        return self._store.attributes[self._index][2]
+
+    @property
+    def row_field(self):
+        return self._store.attributes[self._index][3]
+
+    @property
+    def row_number(self):
+        return self._store.attributes[self._index][4]
+
+    @property
+    def start_x(self):
+        return self._store.get_rows()[1][self._index][0]
+
+    @property
+    def start_y(self):
+        return self._store.get_rows()[1][self._index][1]
+
+    @property
+    def end_x(self):
+        return self._store.get_rows()[1][self._index][2]
+
+    @property
+    def end_y(self):
+        return self._store.get_rows()[1][self._index][3]
+
+    @property
+    def start_x_normalized(self):
+        return self._store.get_rows()[2][self._index][0]
+
+    @property
+    def start_y_normalized(self):
+        return self._store.get_rows()[2][self._index][1]
+
+    @property
+    def end_x_normalized(self):
+        return self._store.get_rows()[2][self._index][4]
+
+    @property
+    def end_y_normalized(self):
+        return self._store.get_rows()[2][self._index][5]
+
+    def normalize(self, render_width: int, render_height: int):
+        """Normalizes the region coordinates to the canvas size.
+
+        : param canvas: The canvas that the region is drawn on.
+        """
+
+        self._store.normalize(self._index, render_width, render_height)
+
+    def get_bounding_box(self):
+        """Gets the bounding box of the region.
+
+        : return: The coordinates of the bounding box.
+        """
+
+        return [(self.start_x, self.start_y), (self.end_x, self.end_y)]
+
+    def get_normalized_bounding_box(self):
+        """Gets the normalized bounding box of the region.
+
+        : return: The normalized coordinates of the bounding box.
+        """
+
+        return list(self._store.get_rows()[2][self._index])
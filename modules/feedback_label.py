@@ -0,0 +1,83 @@
+from modules.document_label import (DocumentLabel)
+from modules.field_definition_index import (FieldDefinitionIndex)
+
+
+class FeedbackLabel:
+    """A class representing a label for a document intelligence model, without any UI.
+
+    This class holds the rules for turning a labeled region into a Document Intelligence label, so labels can be built headlessly
+    as well as through the DocumentIntelligenceLabel UI.
+    """
+
+    def __init__(self, label: DocumentLabel, fields: 'dict | FieldDefinitionIndex'):
+        """Initializes the FeedbackLabel.
+
+        :param label: The object representing the region to label.
+        :param fields: The fields defined for the model, as loaded from the fields.json file, or their index. Labels created with the same fields share one index.
+        """
+
+        self.label = label.label
+        self.field = label.field
+        self.item_row_number = label.row_number
+        self.item_row_field = label.row_field
+        self.label_type = None
+        self.text = label.content
+        self.border = label
+        self.field_index = FieldDefinitionIndex.get(fields)
+        self.fields = self.field_index.fields
+
+    def apply_field(self):
+        """Updates the label and label type based on the type of the selected field."""
+
+        field_option = self.__get_field_option__()
+        if field_option:
+            if field_option['fieldType'] == "array":
+                self.__set_row_label__()
+            else:
+                self.__apply_field_option__(field_option)
+
+    def __get_field_option__(self):
+        return self.field_index.get_field(self.field)
+
+    def __apply_field_option__(self, field_option: dict):
+        """Sets the label for a field that is not a table.
+
+        :param field_option: The field definition of the selected field.
+        """
+
+        self.label = self.field
+
+        if field_option['fieldType'] == "signature":
+            self.text = ""
+            self.label_type = "region"
+        else:
+            self.label_type = None
+
+    def __set_row_label__(self):
+        """Sets the label for a row in a table."""
+
+        self.label = f"{
+            self.field}/{self.item_row_number}/{self.item_row_field}"
+        self.label_type = None
+
+    def as_label(self):
+        """Returns the label in the desired Document Intelligence format.
+
+        :return: The JSON object representing the label.
+        """
+
+        label_json = {
+            "label": self.label,
+            "value": [
+                {
+                    "page": self.border.page_ref,
+                    "text": self.text,
+                    "boundingBoxes": [self.border.get_normalized_bounding_box()]
+                }
+            ],
+        }
+
+        if self.label_type is not None:
+            label_json['labelType'] = self.label_type
+
+        return label_json
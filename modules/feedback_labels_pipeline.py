@@ -0,0 +1,206 @@
+"""Builds Document Intelligence labels from analysis results without any UI.
+
+Run from the repository root with, for example:
+
+    python -m modules.feedback_labels_pipeline pdfs --fields model_training/fields.json --model-version 1.0.0
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from modules import instrumentation
+from modules.document_intelligence_result_formatter import DocumentIntelligenceResultFormatter
+from modules.document_label import DocumentLabel
+from modules.feedback_label import FeedbackLabel
+from modules.field_region_index import FieldRegionIndex
+
+
+def build_labels(analysis_result: dict, fields: dict, corrections: dict | None = None):
+    """Builds the labels for a document from the fields predicted in its analysis result.
+
+    Corrections are keyed by label, e.g. `InvoiceNumber` or `Items/0/Description`. A correction of null removes the label.
+    Otherwise, any of `text`, `labelType`, `page`, and `boundingBox` (an 8-point normalized polygon) replace the predicted
+    values. A correction for a label that was not predicted adds it, and must include `page` and `boundingBox`.
+
+    :param analysis_result: The `analyzeResult` of a Document Intelligence analysis using the custom model.
+    :param fields: The fields defined for the model, as loaded from the fields.json file.
+    :param corrections: The corrections to apply to the predicted labels.
+    :return: The labels for the document, one for each bounding region of a field. `save_to_labels_json` saves the labels of a field with several regions as one label with several values.
+    """
+
+    labels: dict[str, list[FeedbackLabel]] = {}
+
+    field_region_index = FieldRegionIndex.from_analysis_result(analysis_result)
+    if field_region_index is not None:
+        pages = {page['pageNumber']: page for page in analysis_result['pages']}
+
+        # Scaling by the page size gives boxes that are already normalized, so the labels are normalized to a 1x1 render size.
+        # Every label becomes a FeedbackLabel, so plain DocumentLabel objects are cheaper here than views of a DocumentLabelStore.
+        document_labels: list[DocumentLabel] = []
+        with instrumentation.span('extract_bboxes') as span:
+            for page_number in field_region_index.page_numbers:
+                page = pages[page_number]
+                for bbox in field_region_index.get_bboxes(page_number, 1 / page['width'], 1 / page['height']):
+                    document_label = DocumentLabel('', page_number, bbox)
+                    document_label.normalize(1, 1)
+                    document_labels.append(document_label)
+            span.set(items=len(document_labels))
+
+        for document_label in document_labels:
+            label = FeedbackLabel(document_label, fields)
+            label.apply_field()
+            labels.setdefault(label.label, []).append(label)
+
+    for label_key, correction in (corrections or {}).items():
+        if correction is None:
+            labels.pop(label_key, None)
+            continue
+
+        predicted_labels = labels.get(label_key, [])
+        if 'boundingBox' in correction or len(predicted_labels) == 0:
+            predicted_labels = [_create_corrected_label(
+                label_key, correction, predicted_labels[0] if predicted_labels else None, fields)]
+            labels[label_key] = predicted_labels
+
+        for label in predicted_labels:
+            if 'text' in correction:
+                label.text = correction['text']
+            if 'labelType' in correction:
+                label.label_type = correction['labelType']
+
+    return [label for label_group in labels.values() for label in label_group]
+
+
+def _create_corrected_label(label_key: str, correction: dict, label: FeedbackLabel | None, fields: dict):
+    """Creates a label for a corrected bounding box, or for a label that was not predicted.
+
+    :param label_key: The key of the label, e.g. `InvoiceNumber` or `Items/0/Description`.
+    :param correction: The correction for the label.
+    :param label: The predicted label, if any.
+    :param fields: The fields defined for the model.
+    :return: The corrected label.
+    """
+
+    if 'boundingBox' not in correction or ('page' not in correction and label is None):
+        raise ValueError(
+            f"The correction for {label_key} must include a page and boundingBox as it was not predicted")
+
+    polygon = correction['boundingBox']
+    xs = polygon[0::2]
+    ys = polygon[1::2]
+
+    label_parts = label_key.split('/')
+    field = label_parts[0]
+    row_number = label_parts[1] if len(label_parts) == 3 else None
+    row_field = label_parts[2] if len(label_parts) == 3 else field
+
+    document_label = DocumentLabel('', correction.get('page', label.border.page_ref if label else None), {
+        "x": min(xs),
+        "y": min(ys),
+        "width": max(xs) - min(xs),
+        "height": max(ys) - min(ys),
+        "label": row_field,
+        "content": correction.get('text', label.text if label else ''),
+        "field": field,
+        "row_field": row_field,
+        "row_number": row_number
+    })
+    document_label.normalize(1, 1)
+
+    corrected_label = FeedbackLabel(document_label, fields)
+    corrected_label.apply_field()
+    corrected_label.label = label_key
+    if label is not None:
+        corrected_label.label_type = label.label_type
+    return corrected_label
+
+
+def process_document(analysis_result_path: str, pdf_file_name: str, fields: dict, labels_json_path: str, corrections: dict | None = None):
+    """Builds the labels for a document from its analysis result and saves them to a labels JSON file.
+
+    :param analysis_result_path: The path to the analysis result of the document using the custom model.
+    :param pdf_file_name: The file name of the analyzed PDF document.
+    :param fields: The fields defined for the model.
+    :param labels_json_path: The path to save the labels JSON file to.
+    :param corrections: The corrections to apply to the predicted labels.
+    :return: The path to the labels JSON file and the number of labels saved.
+    """
+
+    with open(analysis_result_path, 'r') as file:
+        analysis_result = json.load(file)['analyzeResult']
+
+    labels = build_labels(analysis_result, fields, corrections)
+    labels_result = DocumentIntelligenceResultFormatter.save_to_labels_json(
+        labels, pdf_file_name, labels_json_path)
+
+    return labels_json_path, len(labels_result['labels'])
+
+
+def process_directory(documents_dir: str, fields_file_path: str, model_version: str, corrections_file_path: str | None = None, output_dir: str | None = None, max_workers: int | None = None):
+    """Builds the labels for every document in a directory with an analysis result for a model version, in a process pool.
+
+    :param documents_dir: The directory containing the `<document>.ocr_<version>.json` analysis results.
+    :param fields_file_path: The path to the fields.json file for the model.
+    :param model_version: The version of the model used for the analysis, e.g. `1.0.0`.
+    :param corrections_file_path: The path to a JSON file of corrections, keyed by document file name and then by label.
+    :param output_dir: The directory to save the labels JSON files to. Defaults to the documents directory.
+    :param max_workers: The maximum number of worker processes.
+    :return: The paths to the labels JSON files and the number of labels saved to each.
+    """
+
+    with open(fields_file_path, 'r') as file:
+        fields = json.load(file)
+
+    corrections = {}
+    if corrections_file_path is not None:
+        with open(corrections_file_path, 'r') as file:
+            corrections = json.load(file)
+
+    output_dir = output_dir or documents_dir
+    os.makedirs(output_dir, exist_ok=True)
+    analysis_result_suffix = f".ocr_{model_version}.json"
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for file in sorted(os.listdir(documents_dir)):
+            if not file.endswith(analysis_result_suffix):
+                continue
+
+            pdf_file_name = file[:-len(analysis_result_suffix)]
+            futures.append(executor.submit(
+                process_document,
+                os.path.join(documents_dir, file),
+                pdf_file_name,
+                fields,
+                os.path.join(output_dir, f"{pdf_file_name}.labels.json"),
+                corrections.get(pdf_file_name)))
+
+        return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build Document Intelligence labels.json files from model analysis results.')
+    parser.add_argument('documents_dir',
+                        help='The directory containing the <document>.ocr_<version>.json analysis results.')
+    parser.add_argument('--fields', required=True,
+                        help='The path to the fields.json file for the model.')
+    parser.add_argument('--model-version', required=True,
+                        help='The version of the model used for the analysis, e.g. 1.0.0.')
+    parser.add_argument('--corrections',
+                        help='The path to a JSON file of corrections, keyed by document file name and then by label.')
+    parser.add_argument('--output-dir',
+                        help='The directory to save the labels.json files to. Defaults to the documents directory.')
+    parser.add_argument('--max-workers', type=int,
+                        help='The maximum number of worker processes.')
+    args = parser.parse_args()
+
+    results = process_directory(args.documents_dir, args.fields, args.model_version,
+                                args.corrections, args.output_dir, args.max_workers)
+    for labels_json_path, label_count in results:
+        print(f"{labels_json_path}: {label_count} labels")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import collections
+import json
+import os
+import threading
+
+
+class FieldDefinitionIndex:
+    """An index over the fields and definitions of a model, as loaded from a fields.json file.
+
+    The field options, the field definitions by key, and the row field options of each table field are computed once, so
+    labels can look up their field and build their UI without scanning the fields each time. Indexes are shared between the
+    labels of a document through `get`, and between the documents using the same fields.json file through `from_file`.
+    """
+
+    _shared: collections.OrderedDict[int | str, tuple] = collections.OrderedDict()
+    _shared_max_entries = 8
+    _shared_lock = threading.Lock()
+
+    def __init__(self, fields: dict):
+        """Initializes the FieldDefinitionIndex.
+
+        :param fields: The fields defined for the model, as loaded from the fields.json file.
+        """
+
+        self.fields = fields
+        self._fields_by_key: dict[str, dict] = {}
+        self._row_fields_by_key: dict[str, dict[str, dict]] = {}
+        self._row_field_options: dict[str, tuple[str, ...]] = {}
+
+        definitions = fields.get('definitions') or {}
+        for field in fields['fields']:
+            # The first definition of a field key wins, as with a scan over the fields.
+            self._fields_by_key.setdefault(field['fieldKey'], field)
+            if field['fieldType'] == 'array' and field['fieldKey'] not in self._row_fields_by_key:
+                definition = definitions.get(field.get('itemType'), {})
+                row_fields = definition.get('fields') or []
+                self._row_fields_by_key[field['fieldKey']] = {
+                    row_field['fieldKey']: row_field for row_field in row_fields}
+                self._row_field_options[field['fieldKey']] = tuple(
+                    [''] + [row_field['fieldKey'] for row_field in row_fields])
+
+        self.field_options: tuple[str, ...] = tuple(
+            [''] + [field['fieldKey'] for field in fields['fields']])
+        self.canvas_field_keys: list[str] = [
+            field['fieldKey'] for field in fields['fields'] if field['fieldType'] != 'array']
+
+    @staticmethod
+    def get(fields: 'dict | FieldDefinitionIndex'):
+        """Gets the shared index of the fields, building it on first use.
+
+        :param fields: The fields defined for the model, as loaded from the fields.json file, or an existing index.
+        :return: The index of the fields.
+        """
+
+        if isinstance(fields, FieldDefinitionIndex):
+            return fields
+
+        # The index holds a reference to the fields, so the id is not reused while the index is cached.
+        index = FieldDefinitionIndex.__get_shared__(id(fields), None)
+        if index is not None and index.fields is fields:
+            return index
+
+        index = FieldDefinitionIndex(fields)
+        FieldDefinitionIndex.__set_shared__(id(fields), None, index)
+        return index
+
+    @staticmethod
+    def from_file(fields_file_path: str):
+        """Loads a fields.json file and gets its index.
+
+        :param fields_file_path: The path to the fields.json file.
+        :return: The index of the fields, shared until the file is modified.
+        """
+
+        stat = os.stat(fields_file_path)
+        key = os.path.abspath(fields_file_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        index = FieldDefinitionIndex.__get_shared__(key, version)
+        if index is not None:
+            return index
+
+        with open(fields_file_path, 'r') as file:
+            index = FieldDefinitionIndex(json.load(file))
+        FieldDefinitionIndex.__set_shared__(key, version, index)
+        FieldDefinitionIndex.__set_shared__(id(index.fields), None, index)
+        return index
+
+    def get_field(self, field_key: str | None):
+        """Gets the definition of a field.
+
+        :param field_key: The key of the field, e.g. `InvoiceNumber` or `Items`.
+        :return: The field, or None if the model has no such field.
+        """
+
+        return self._fields_by_key.get(field_key)
+
+    def get_row_field(self, field_key: str, row_field_key: str):
+        """Gets the definition of a row field of a table field.
+
+        :param field_key: The key of the table field, e.g. `Items`.
+        :param row_field_key: The key of the row field, e.g. `Description`.
+        :return: The row field, or None if the table has no such row field.
+        """
+
+        return self._row_fields_by_key.get(field_key, {}).get(row_field_key)
+
+    def get_row_field_options(self, field_key: str):
+        """Gets the row field options of a table field, as shown in the row field dropdown.
+
+        :param field_key: The key of the table field, e.g. `Items`.
+        :return: The row field keys, after an empty option, or only the empty option if the field is not a table.
+        """
+
+        return self._row_field_options.get(field_key, ('',))
+
+    def is_table(self, field_key: str | None):
+        """Whether a field is a table field.
+
+        :param field_key: The key of the field.
+        :return: True if the field is an array of rows.
+        """
+
+        return field_key in self._row_fields_by_key
+
+    def __len__(self):
+        return len(self._fields_by_key)
+
+    def __contains__(self, field_key: str):
+        return field_key in self._fields_by_key
+
+    @staticmethod
+    def __get_shared__(key: int | str, version: tuple | None):
+        with FieldDefinitionIndex._shared_lock:
+            cached = FieldDefinitionIndex._shared.get(key)
+            if cached is None or cached[0] != version:
+                return None
+            FieldDefinitionIndex._shared.move_to_end(key)
+            return cached[1]
+
+    @staticmethod
+    def __set_shared__(key: int | str, version: tuple | None, index: 'FieldDefinitionIndex'):
+        with FieldDefinitionIndex._shared_lock:
+            FieldDefinitionIndex._shared[key] = (version, index)
+            FieldDefinitionIndex._shared.move_to_end(key)
+            while len(FieldDefinitionIndex._shared) > FieldDefinitionIndex._shared_max_entries:
+                FieldDefinitionIndex._shared.popitem(last=False)
@@ -0,0 +1,89 @@
+import numpy as np
+
+
+class FieldRegionIndex:
+    """An index of the bounding regions of the fields in a Document Intelligence analysis result, bucketed by page number.
+
+    The fields are walked once, including the rows of table fields and every bounding region of fields that span several
+    regions or pages. The bounding boxes for a page can then be scaled in a single vectorized operation.
+    """
+
+    def __init__(self, document_fields: dict, parent_field: str | None = None, row_number: int | None = None):
+        """Initializes the FieldRegionIndex.
+
+        :param document_fields: The fields of the analyzed document, e.g. `analyzeResult.documents[0].fields`.
+        :param parent_field: The field the document fields are rows of, if indexing the fields of a table row.
+        :param row_number: The row number of the document fields, if indexing the fields of a table row.
+        """
+
+        page_regions: dict[int, tuple[list[list[float]], list[dict]]] = {}
+        FieldRegionIndex.__index_fields__(
+            page_regions, document_fields, parent_field, row_number)
+
+        self._pages = {page_number: (np.asarray(coords, dtype=np.float64), regions)
+                       for page_number, (coords, regions) in page_regions.items()}
+
+    @staticmethod
+    def __index_fields__(page_regions: dict, fields_result: dict, parent_field: str | None, row_number: int | None):
+        for field_key, field_value in fields_result.items():
+            if field_value.get('valueType') == 'list':
+                for item_row_number, field_value_item in enumerate(field_value.get('value') or []):
+                    FieldRegionIndex.__index_fields__(
+                        page_regions, field_value_item.get('value') or {}, field_key, item_row_number)
+
+            for bounding_region in field_value.get('boundingRegions') or []:
+                polygon = bounding_region.get('polygon') or []
+                if len(polygon) < 6:
+                    continue
+
+                coords, regions = page_regions.setdefault(
+                    bounding_region['pageNumber'], ([], []))
+                coords.append([polygon[0], polygon[1], polygon[2], polygon[5]])
+                regions.append({
+                    "label": field_key,
+                    "content": field_value.get('content'),
+                    "field": field_key if parent_field is None else parent_field,
+                    "row_field": field_key,
+                    "row_number": row_number
+                })
+
+    @staticmethod
+    def from_analysis_result(analysis_result: dict):
+        """Creates a FieldRegionIndex from the fields of the first document in an analysis result.
+
+        :param analysis_result: The `analyzeResult` of a Document Intelligence analysis.
+        :return: The index of the field regions, or None if the analysis result contains no documents.
+        """
+
+        documents = analysis_result.get('documents') or []
+        if len(documents) == 0:
+            return None
+
+        return FieldRegionIndex(documents[0]['fields'])
+
+    @property
+    def page_numbers(self):
+        """The page numbers that have field regions."""
+
+        return sorted(self._pages.keys())
+
+    def get_bboxes(self, page_number: int, width: float, height: float):
+        """Gets the bounding boxes of the field regions on a page, scaled to the rendered page size.
+
+        :param page_number: The page number to get the bounding boxes for.
+        :param width: The scale from the page width in the analysis result to the rendered page width.
+        :param height: The scale from the page height in the analysis result to the rendered page height.
+        :return: The bounding boxes of the field regions on the page.
+        """
+
+        if page_number not in self._pages:
+            return []
+
+        coords, regions = self._pages[page_number]
+        xs = (coords[:, 0] * width).tolist()
+        ys = (coords[:, 1] * height).tolist()
+        widths = ((coords[:, 2] - coords[:, 0]) * width).tolist()
+        heights = ((coords[:, 3] - coords[:, 1]) * height).tolist()
+
+        return [{"x": x, "y": y, "width": w, "height": h, **region}
+                for x, y, w, h, region in zip(xs, ys, widths, heights, regions)]
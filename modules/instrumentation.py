@@ -0,0 +1,293 @@
+"""Opt-in timing and metrics instrumentation for the stages of the feedback pipeline.
+
+Instrumentation is disabled until a sink is enabled, and each instrumented stage then records a span with its duration and
+any byte and item counts. For example:
+
+    from modules import instrumentation
+
+    sink = instrumentation.InMemorySink()
+    instrumentation.enable(sink)
+    ...
+    print(instrumentation.format_summary(sink.summary()))
+"""
+
+import json
+import threading
+import time
+
+
+_sinks: list = []
+
+
+def enable(*sinks):
+    """Enables instrumentation, recording the spans of every instrumented stage to the sinks.
+
+    :param sinks: The sinks to record the spans to, e.g. an InMemorySink, JsonLinesSink, or OpenTelemetrySink.
+    """
+
+    global _sinks
+    _sinks = list(_sinks) + list(sinks)
+
+
+def disable():
+    """Disables instrumentation, closing any sinks that hold resources."""
+
+    global _sinks
+    sinks, _sinks = _sinks, []
+    for sink in sinks:
+        if hasattr(sink, 'close'):
+            sink.close()
+
+
+def is_enabled():
+    """Whether instrumentation is enabled."""
+
+    return len(_sinks) > 0
+
+
+def span(stage: str, **attributes):
+    """Times a stage of the pipeline.
+
+    Used as a context manager, the returned span records the duration of the block and any attributes set on it. When
+    instrumentation is disabled, a shared span that records nothing is returned.
+
+    :param stage: The name of the stage, e.g. `upload_training_data`.
+    :param attributes: The initial attributes of the span, e.g. `bytes` or `items`.
+    :return: The span.
+    """
+
+    if not _sinks:
+        return _NULL_SPAN
+
+    return Span(stage, _sinks, attributes)
+
+
+class Span:
+    """A timed stage of the pipeline, recorded to the enabled sinks when it ends."""
+
+    def __init__(self, stage: str, sinks: list, attributes: dict):
+        """Initializes the Span.
+
+        :param stage: The name of the stage.
+        :param sinks: The sinks to record the span to.
+        :param attributes: The initial attributes of the span.
+        """
+
+        self.stage = stage
+        self.sinks = sinks
+        self.attributes = attributes
+        self.start_time = None
+        self._start_counter = None
+
+    def __enter__(self):
+        self.start_time = time.time()
+        self._start_counter = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record = SpanRecord(self.stage, self.start_time, time.perf_counter() - self._start_counter,
+                            self.attributes, exc_type.__name__ if exc_type is not None else None)
+        for sink in self.sinks:
+            sink.record(record)
+
+    def set(self, **attributes):
+        """Sets attributes of the span, e.g. the number of `bytes` or `items` processed by the stage."""
+
+        self.attributes.update(attributes)
+
+
+class NullSpan:
+    """A span that records nothing, used when instrumentation is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def set(self, **attributes):
+        pass
+
+
+_NULL_SPAN = NullSpan()
+
+
+class SpanRecord:
+    """A class representing a completed span."""
+
+    def __init__(self, stage: str, start_time: float, duration_seconds: float, attributes: dict, error: str | None = None):
+        """Initializes the SpanRecord.
+
+        :param stage: The name of the stage.
+        :param start_time: The time the span started, in seconds since the epoch.
+        :param duration_seconds: The duration of the span, in seconds.
+        :param attributes: The attributes of the span, e.g. `bytes` or `items`.
+        :param error: The type of the exception raised within the span, if any.
+        """
+
+        self.stage = stage
+        self.start_time = start_time
+        self.duration_seconds = duration_seconds
+        self.attributes = attributes
+        self.error = error
+
+    def to_dict(self):
+        return {
+            "stage": self.stage,
+            "startTime": self.start_time,
+            "durationSeconds": self.duration_seconds,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+    @staticmethod
+    def from_dict(record: dict):
+        return SpanRecord(
+            record['stage'],
+            record['startTime'],
+            record['durationSeconds'],
+            record.get('attributes') or {},
+            record.get('error'))
+
+    def __repr__(self):
+        return f"SpanRecord(stage={self.stage!r}, duration_seconds={self.duration_seconds:.6f}, attributes={self.attributes!r})"
+
+
+class InMemorySink:
+    """A sink that keeps the spans in memory."""
+
+    def __init__(self):
+        """Initializes the InMemorySink."""
+
+        self.records: list[SpanRecord] = []
+        self._lock = threading.Lock()
+
+    def record(self, record: SpanRecord):
+        with self._lock:
+            self.records.append(record)
+
+    def clear(self):
+        """Removes the recorded spans."""
+
+        with self._lock:
+            self.records = []
+
+    def summary(self):
+        """Summarizes the recorded spans by stage.
+
+        :return: The summary of each stage, as returned by `summarize`.
+        """
+
+        with self._lock:
+            records = list(self.records)
+        return summarize(records)
+
+
+class JsonLinesSink:
+    """A sink that appends each span to a JSON-lines file."""
+
+    def __init__(self, file_path: str):
+        """Initializes the JsonLinesSink.
+
+        :param file_path: The path to the JSON-lines file to append the spans to.
+        """
+
+        self.file_path = file_path
+        self._file = open(file_path, 'a', buffering=1)
+        self._lock = threading.Lock()
+
+    def record(self, record: SpanRecord):
+        line = json.dumps(record.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    @staticmethod
+    def load(file_path: str):
+        """Loads the spans from a JSON-lines file, e.g. to summarize them with `summarize`.
+
+        :param file_path: The path to the JSON-lines file.
+        :return: The spans in the file.
+        """
+
+        with open(file_path, 'r') as file:
+            return [SpanRecord.from_dict(json.loads(line)) for line in file if line.strip()]
+
+
+class OpenTelemetrySink:
+    """A sink that exports each span through the OpenTelemetry tracer provider, if the opentelemetry-api package is installed."""
+
+    def __init__(self, tracer_name: str = 'document-intelligence-feedback'):
+        """Initializes the OpenTelemetrySink.
+
+        :param tracer_name: The name of the tracer to create the spans with.
+        """
+
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError(
+                'The opentelemetry-api package is required to export spans to OpenTelemetry')
+
+        self.trace = trace
+        self.tracer = trace.get_tracer(tracer_name)
+
+    def record(self, record: SpanRecord):
+        start_time = int(record.start_time * 1e9)
+        otel_span = self.tracer.start_span(
+            record.stage,
+            start_time=start_time,
+            attributes={key: value for key, value in record.attributes.items()
+                        if isinstance(value, (str, bool, int, float))})
+        if record.error is not None:
+            otel_span.set_status(self.trace.Status(
+                self.trace.StatusCode.ERROR, record.error))
+        otel_span.end(end_time=start_time + int(record.duration_seconds * 1e9))
+
+
+def summarize(records: list[SpanRecord]):
+    """Summarizes spans by stage.
+
+    :param records: The spans to summarize.
+    :return: The count, error count, p50, p95, and total latency in seconds, and total bytes and items of each stage.
+    """
+
+    import numpy as np
+
+    stages: dict[str, list[SpanRecord]] = {}
+    for record in records:
+        stages.setdefault(record.stage, []).append(record)
+
+    summary = {}
+    for stage, stage_records in stages.items():
+        durations = np.fromiter((record.duration_seconds for record in stage_records),
+                                dtype=np.float64, count=len(stage_records))
+        summary[stage] = {
+            "count": len(stage_records),
+            "errors": sum(1 for record in stage_records if record.error is not None),
+            "p50_seconds": float(np.percentile(durations, 50)),
+            "p95_seconds": float(np.percentile(durations, 95)),
+            "total_seconds": float(durations.sum()),
+            "bytes": sum(record.attributes.get('bytes', 0) for record in stage_records),
+            "items": sum(record.attributes.get('items', 0) for record in stage_records)
+        }
+
+    return summary
+
+
+def format_summary(summary: dict):
+    """Formats a summary of spans as a table, ordered by the total time spent in each stage.
+
+    :param summary: The summary, as returned by `summarize`.
+    :return: The table.
+    """
+
+    lines = [f"{'stage':<32} {'count':>7} {'errors':>7} {'p50 ms':>10} {'p95 ms':>10} {'total s':>10} {'bytes':>14} {'items':>10}"]
+    for stage, stats in sorted(summary.items(), key=lambda item: item[1]['total_seconds'], reverse=True):
+        lines.append(f"{stage:<32} {stats['count']:>7} {stats['errors']:>7} {stats['p50_seconds'] * 1000:>10.2f} "
+                     f"{stats['p95_seconds'] * 1000:>10.2f} {stats['total_seconds']:>10.3f} {stats['bytes']:>14} {stats['items']:>10}")
+
+    return '\n'.join(lines)
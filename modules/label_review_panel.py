@@ -0,0 +1,145 @@
+from modules.document_intelligence_label import (DocumentIntelligenceLabel)
+from modules.document_label import (DocumentLabel)
+from modules.field_definition_index import (FieldDefinitionIndex)
+from ipywidgets import (Button, Dropdown, HBox, Label, VBox)
+
+
+class LabelReviewPanel:
+    """A paginated panel for reviewing the labels of a document.
+
+    Only the labels on the current page of the panel have widgets. The widgets of the other labels are closed, and each label
+    keeps its edits, so the panel's labels can be saved with `save_to_labels_json` whichever page is shown.
+    """
+
+    def __init__(self, labels: list[DocumentIntelligenceLabel], page_size: int = 10):
+        """Initializes the LabelReviewPanel.
+
+        :param labels: The labels to review.
+        :param page_size: The number of labels to show at once.
+        """
+
+        if page_size < 1:
+            raise ValueError('The page size must be at least 1')
+
+        self.labels = labels
+        self.page_size = page_size
+        self.page_number = 0
+        self.field_filter = ''
+        self._visible_labels: list[DocumentIntelligenceLabel] = []
+        self._filtered_labels: list[DocumentIntelligenceLabel] = list(labels)
+
+        self.ui_previous = None
+        self.ui_next = None
+        self.ui_page = None
+        self.ui_field_filter = None
+        self.ui_labels = None
+        self.ui_container = None
+
+    @staticmethod
+    def from_document_labels(document_labels: list[DocumentLabel], fields: 'dict | FieldDefinitionIndex', page_size: int = 10):
+        """Creates a LabelReviewPanel for the labels of a document, sharing one index of the fields between them.
+
+        :param document_labels: The labels of the document, e.g. from `DocumentCanvas.get_document_labels`.
+        :param fields: The fields defined for the model, as loaded from the fields.json file, or their index.
+        :param page_size: The number of labels to show at once.
+        :return: The panel.
+        """
+
+        field_index = FieldDefinitionIndex.get(fields)
+        return LabelReviewPanel(
+            [DocumentIntelligenceLabel(document_label, field_index)
+             for document_label in document_labels],
+            page_size)
+
+    @property
+    def page_count(self):
+        """The number of pages of labels, after filtering."""
+
+        return max(1, -(-len(self._filtered_labels) // self.page_size))
+
+    def render(self):
+        """Renders the panel UI, showing the first page of labels.
+
+        :return: The UI container for the panel.
+        """
+
+        self.close()
+
+        field_index = self.labels[0].field_index if len(self.labels) > 0 else None
+        self.ui_field_filter = Dropdown(
+            options=field_index.field_options if field_index is not None else ('',),
+            description='Filter:',
+            value=self.field_filter
+        )
+        self.ui_field_filter.observe(
+            self.__handle_field_filter_change__, names='value')
+
+        self.ui_previous = Button(description='Previous')
+        self.ui_previous.on_click(
+            lambda _: self.show_page(self.page_number - 1))
+        self.ui_next = Button(description='Next')
+        self.ui_next.on_click(lambda _: self.show_page(self.page_number + 1))
+        self.ui_page = Label()
+
+        self.ui_labels = VBox([])
+        self.ui_container = VBox([
+            HBox([self.ui_previous, self.ui_page,
+                 self.ui_next, self.ui_field_filter]),
+            self.ui_labels])
+
+        self.show_page(self.page_number)
+
+        return self.ui_container
+
+    def show_page(self, page_number: int):
+        """Shows a page of labels, closing the widgets of the labels on the previous page.
+
+        :param page_number: The zero-based page number, which is clamped to the pages of labels.
+        """
+
+        self.page_number = min(max(page_number, 0), self.page_count - 1)
+        if self.ui_container is None:
+            return
+
+        for label in self._visible_labels:
+            label.close()
+
+        start = self.page_number * self.page_size
+        self._visible_labels = self._filtered_labels[start:start +
+                                                     self.page_size]
+        self.ui_labels.children = tuple(label.render()
+                                        for label in self._visible_labels)
+
+        self.ui_page.value = (f"Page {self.page_number + 1} of {self.page_count} "
+                              f"({len(self._filtered_labels)} labels)")
+        self.ui_previous.disabled = self.page_number == 0
+        self.ui_next.disabled = self.page_number >= self.page_count - 1
+
+    def close(self):
+        """Closes the panel UI and the widgets of the visible labels. The labels keep their values."""
+
+        for label in self._visible_labels:
+            label.close()
+        self._visible_labels = []
+
+        for widget in [self.ui_previous, self.ui_next, self.ui_page, self.ui_field_filter, self.ui_labels, self.ui_container]:
+            if widget is not None:
+                widget.close()
+
+        self.ui_previous = None
+        self.ui_next = None
+        self.ui_page = None
+        self.ui_field_filter = None
+        self.ui_labels = None
+        self.ui_container = None
+
+    def __handle_field_filter_change__(self, change):
+        """Handles the change for the field filter dropdown.
+
+        :param change: The change event.
+        """
+
+        self.field_filter = change.new
+        self._filtered_labels = [label for label in self.labels
+                                 if not self.field_filter or label.field == self.field_filter]
+        self.show_page(0)
@@ -0,0 +1,223 @@
+import json
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from modules.feedback_label import FeedbackLabel
+
+
+LABELS_SCHEMA = "https://schema.cognitiveservices.azure.com/formrecognizer/2021-03-01/labels.json"
+
+
+class LabelsIndex:
+    """An index over the labels of a document in the Document Intelligence labels.json format, keyed by label and page.
+
+    Table labels are keyed by their full `field/row/rowField` label, and are also indexed by their field so a whole table can
+    be removed at once. Applying new feedback only touches the labels and pages it contains, and returns a diff of the changes,
+    so only documents whose labels actually changed need to be rewritten and uploaded again.
+    """
+
+    def __init__(self, pdf_file_name: str, labels_result: dict | None = None):
+        """Initializes the LabelsIndex.
+
+        :param pdf_file_name: The file name of the labeled PDF document.
+        :param labels_result: The existing labels of the document, as loaded from a labels.json file.
+        """
+
+        self.pdf_file_name = pdf_file_name
+        self.schema = LABELS_SCHEMA
+        self._labels: dict[str, dict] = {}
+        self._field_labels: dict[str, set[str]] = {}
+
+        if labels_result is not None:
+            self.pdf_file_name = labels_result.get('document', pdf_file_name)
+            self.schema = labels_result.get('$schema', LABELS_SCHEMA)
+            for label_json in labels_result.get('labels') or []:
+                entry = self.__get_or_add_entry__(label_json['label'])
+                if 'labelType' in label_json:
+                    entry['labelType'] = label_json['labelType']
+                for value in label_json.get('value') or []:
+                    entry['pages'].setdefault(value['page'], []).append(value)
+
+    @staticmethod
+    def from_file(labels_json_path: str, pdf_file_name: str):
+        """Creates a LabelsIndex from a labels.json file, or an empty index if the file does not exist.
+
+        :param labels_json_path: The path to the labels.json file.
+        :param pdf_file_name: The file name of the labeled PDF document.
+        :return: The index of the labels.
+        """
+
+        if not os.path.exists(labels_json_path):
+            return LabelsIndex(pdf_file_name)
+
+        with open(labels_json_path, 'r') as file:
+            return LabelsIndex(pdf_file_name, json.load(file))
+
+    @staticmethod
+    def parse_label_key(label: str):
+        """Parses a label into its field, row number, and row field.
+
+        :param label: The label, e.g. `InvoiceNumber` or `Items/0/Description`.
+        :return: The field, row number, and row field of the label. The row number is None for labels that are not table rows.
+        """
+
+        label_parts = label.split('/')
+        if len(label_parts) == 3 and label_parts[1].isdigit():
+            return label_parts[0], int(label_parts[1]), label_parts[2]
+        return label, None, label
+
+    @property
+    def labels(self):
+        """The labels in the index."""
+
+        return list(self._labels.keys())
+
+    def get(self, label: str, page: int | None = None):
+        """Gets the values of a label.
+
+        :param label: The label, e.g. `InvoiceNumber` or `Items/0/Description`.
+        :param page: The page to get the values on. If None, the values on every page are returned.
+        :return: The values of the label, or an empty list if it has none.
+        """
+
+        entry = self._labels.get(label)
+        if entry is None:
+            return []
+        if page is not None:
+            return list(entry['pages'].get(page, []))
+        return [value for values in entry['pages'].values() for value in values]
+
+    def get_table_labels(self, field: str):
+        """Gets the labels of the rows of a table field.
+
+        :param field: The table field.
+        :return: The `field/row/rowField` labels of the table.
+        """
+
+        return sorted(self._field_labels.get(field, set()) - {field})
+
+    def apply(self, labels: list['FeedbackLabel | dict'], removed_labels: list[str | tuple[str, int]] | None = None):
+        """Applies new feedback to the index.
+
+        Each label's values replace the existing values of that label on the same page. Labels and pages not in the feedback
+        are left as they are.
+
+        :param labels: The new or corrected labels, as FeedbackLabel objects or labels.json label dictionaries.
+        :param removed_labels: The labels to remove, as a label to remove it from every page, a `(label, page)` tuple to remove it from one page, or a table field to remove every row of the table.
+        :return: The diff of the labels that were added, changed, and removed.
+        """
+
+        diff = LabelsDiff()
+
+        for removed_label in removed_labels or []:
+            if isinstance(removed_label, tuple):
+                self.__remove__(removed_label[0], removed_label[1], diff)
+            else:
+                for label in [removed_label, *self.get_table_labels(removed_label)]:
+                    self.__remove__(label, None, diff)
+
+        updates: dict[str, dict] = {}
+        for label in labels:
+            label_json = label if isinstance(label, dict) else label.as_label()
+            update = updates.setdefault(
+                label_json['label'], {'labelType': label_json.get('labelType'), 'pages': {}})
+            for value in label_json['value']:
+                update['pages'].setdefault(value['page'], []).append(value)
+
+        # New labels are added in label order, so merging into an empty index gives the same file as save_to_labels_json.
+        for label in sorted(updates.keys()):
+            update = updates[label]
+            is_new_label = label not in self._labels
+            entry = self.__get_or_add_entry__(label)
+
+            label_type_changed = entry.get('labelType') != update['labelType']
+            if update['labelType'] is None:
+                entry.pop('labelType', None)
+            else:
+                entry['labelType'] = update['labelType']
+
+            for page, values in update['pages'].items():
+                existing_values = entry['pages'].get(page)
+                if existing_values is None:
+                    diff.added.append((label, page))
+                elif existing_values != values or (label_type_changed and not is_new_label):
+                    diff.changed.append((label, page))
+                else:
+                    continue
+                entry['pages'][page] = values
+
+        return diff
+
+    def to_dict(self):
+        """Gets the labels in the Document Intelligence labels.json format.
+
+        :return: The labels as a dictionary.
+        """
+
+        labels_json = []
+        for label, entry in self._labels.items():
+            label_json = {
+                "label": label,
+                "value": [value for values in entry['pages'].values() for value in values]
+            }
+            if 'labelType' in entry:
+                label_json['labelType'] = entry['labelType']
+            labels_json.append(label_json)
+
+        return {
+            "$schema": self.schema,
+            "document": self.pdf_file_name,
+            "labels": labels_json
+        }
+
+    def __get_or_add_entry__(self, label: str):
+        entry = self._labels.get(label)
+        if entry is None:
+            entry = {'pages': {}}
+            self._labels[label] = entry
+            field, _, _ = LabelsIndex.parse_label_key(label)
+            self._field_labels.setdefault(field, set()).add(label)
+        return entry
+
+    def __remove__(self, label: str, page: int | None, diff: 'LabelsDiff'):
+        entry = self._labels.get(label)
+        if entry is None:
+            return
+
+        pages = list(entry['pages'].keys()) if page is None else [page]
+        for removed_page in pages:
+            if entry['pages'].pop(removed_page, None) is not None:
+                diff.removed.append((label, removed_page))
+
+        if len(entry['pages']) == 0:
+            del self._labels[label]
+            field, _, _ = LabelsIndex.parse_label_key(label)
+            self._field_labels[field].discard(label)
+
+
+class LabelsDiff:
+    """A class representing the changes made to the labels of a document, as `(label, page)` keys."""
+
+    def __init__(self):
+        """Initializes the LabelsDiff."""
+
+        self.added: list[tuple[str, int]] = []
+        self.changed: list[tuple[str, int]] = []
+        self.removed: list[tuple[str, int]] = []
+
+    @property
+    def has_changes(self):
+        """Whether any labels were added, changed, or removed."""
+
+        return len(self.added) > 0 or len(self.changed) > 0 or len(self.removed) > 0
+
+    def to_dict(self):
+        return {
+            "added": [{"label": label, "page": page} for label, page in self.added],
+            "changed": [{"label": label, "page": page} for label, page in self.changed],
+            "removed": [{"label": label, "page": page} for label, page in self.removed]
+        }
+
+    def __repr__(self):
+        return f"LabelsDiff(added={len(self.added)}, changed={len(self.changed)}, removed={len(self.removed)})"
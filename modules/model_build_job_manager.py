@@ -0,0 +1,307 @@
+import json
+import os
+import threading
+import time
+from azure.ai.formrecognizer import (DocumentModelAdministrationClient,
+                                     DocumentModelDetails,
+                                     ModelBuildMode)
+from azure.core.exceptions import (AzureError, ResourceNotFoundError)
+
+
+# The statuses of a model build that will not change.
+TERMINAL_STATUSES = ('succeeded', 'failed', 'canceled')
+
+
+class ModelBuildJobManager:
+    """A manager for building Document Intelligence models without blocking the calling thread.
+
+    Each build is polled in the background. Its continuation token and state are persisted to disk, so polling can be
+    resumed after a process restart.
+    """
+
+    def __init__(self, document_model_admin_client: DocumentModelAdministrationClient, state_file_path: str):
+        """Initializes the ModelBuildJobManager.
+
+        :param document_model_admin_client: The client to build the models with.
+        :param state_file_path: The path to the JSON file to persist the state of the build jobs to.
+        """
+
+        self.document_model_admin_client = document_model_admin_client
+        self.state_file_path = state_file_path
+        self.jobs: dict[str, ModelBuildJob] = {}
+        self.models: dict[str, DocumentModelDetails] = {}
+        self._pollers = {}
+        self._lock = threading.RLock()
+
+        if os.path.exists(state_file_path):
+            with open(state_file_path, 'r') as file:
+                for job_state in json.load(file)['jobs']:
+                    job = ModelBuildJob.from_dict(job_state)
+                    self.jobs[job.model_id] = job
+
+    def start_build(self, model_id: str, blob_container_url: str, replace_existing: bool = True):
+        """Starts building a model from the training data in a blob container, returning without waiting for the build.
+
+        :param model_id: The ID of the model to build.
+        :param blob_container_url: The URL of the blob container containing the training data.
+        :param replace_existing: Whether to delete an existing model with the same ID before building.
+        :return: The build job.
+        """
+
+        if replace_existing:
+            try:
+                self.document_model_admin_client.delete_document_model(
+                    model_id)
+            except ResourceNotFoundError:
+                pass
+
+        poller = self.document_model_admin_client.begin_build_document_model(
+            build_mode=ModelBuildMode.TEMPLATE,
+            blob_container_url=blob_container_url,
+            model_id=model_id
+        )
+
+        job = ModelBuildJob(model_id, blob_container_url,
+                            poller.continuation_token(), 'running', time.time())
+        with self._lock:
+            self.jobs[model_id] = job
+            self.__save__()
+
+        self.__track__(job, poller)
+        return job
+
+    def resume(self):
+        """Resumes polling for every persisted build job that had not completed.
+
+        :return: The build jobs that were resumed.
+        """
+
+        resumed_jobs = []
+        for job in list(self.jobs.values()):
+            if job.status in TERMINAL_STATUSES or job.model_id in self._pollers:
+                continue
+
+            poller = self.document_model_admin_client.begin_build_document_model(
+                build_mode=ModelBuildMode.TEMPLATE,
+                blob_container_url=job.blob_container_url,
+                model_id=job.model_id,
+                continuation_token=job.continuation_token
+            )
+            self.__track__(job, poller)
+            resumed_jobs.append(job)
+
+        return resumed_jobs
+
+    def get_progress(self, model_id: str):
+        """Gets the progress of a build job.
+
+        :param model_id: The ID of the model being built.
+        :return: The status, percentage completed, and elapsed time in seconds of the build.
+        """
+
+        job = self.jobs[model_id]
+        percent_completed = 100 if job.status == 'succeeded' else 0
+
+        poller = self._pollers.get(model_id)
+        if poller is not None and job.status not in TERMINAL_STATUSES:
+            try:
+                percent_completed = poller.details['percent_completed']
+            except (KeyError, AttributeError):
+                # The poller has no details until the service reports the progress of the operation.
+                pass
+
+        return {
+            "model_id": model_id,
+            "status": job.status,
+            "percent_completed": percent_completed,
+            "elapsed_seconds": job.elapsed_seconds,
+            "error": job.error,
+            "error_code": job.error_code
+        }
+
+    def get_all_progress(self):
+        """Gets the progress of every build job.
+
+        :return: The progress of each build job.
+        """
+
+        return [self.get_progress(model_id) for model_id in self.jobs.keys()]
+
+    def wait(self, model_id: str, timeout: float | None = None):
+        """Waits for a build job to complete, persisting its state before returning.
+
+        A build that completed before the process restarted can no longer be polled, so its persisted state is returned.
+
+        :param model_id: The ID of the model being built.
+        :param timeout: The maximum number of seconds to wait.
+        :return: The details of the built model. For a build that completed before the process restarted, the details of
+            the model if it succeeded, otherwise its progress, including the status and error.
+        """
+
+        if model_id in self.models:
+            return self.models[model_id]
+
+        job = self.jobs[model_id]
+        poller = self._pollers.get(model_id)
+        if poller is None:
+            if job.status == 'succeeded':
+                model = self.document_model_admin_client.get_document_model(
+                    model_id)
+                self.models[model_id] = model
+                return model
+            if job.status in TERMINAL_STATUSES:
+                return self.get_progress(model_id)
+            raise ValueError(
+                f"The build for {model_id} is not being polled. Call resume() to resume polling for persisted builds.")
+
+        return self.__wait_for__(job, poller, timeout)
+
+    def __track__(self, job: 'ModelBuildJob', poller):
+        """Tracks the poller of a build job, updating and persisting its state in the background when the build completes.
+
+        :param job: The build job.
+        :param poller: The poller for the build operation.
+        """
+
+        with self._lock:
+            self._pollers[job.model_id] = poller
+
+        def watch():
+            try:
+                self.__wait_for__(job, poller)
+            except AzureError:
+                # The error is recorded on the job, and raised again to any caller of wait().
+                pass
+
+        threading.Thread(target=watch, daemon=True).start()
+
+    def __wait_for__(self, job: 'ModelBuildJob', poller, timeout: float | None = None):
+        """Waits for the poller of a build job, recording the outcome once the build completes.
+
+        :param job: The build job.
+        :param poller: The poller for the build operation.
+        :param timeout: The maximum number of seconds to wait.
+        :return: The details of the built model, or None if the build had not completed within the timeout.
+        """
+
+        try:
+            model = poller.result(timeout=timeout)
+        except AzureError as error:
+            self.__complete__(job, poller, error=error)
+            raise
+
+        if poller.done():
+            self.__complete__(job, poller, model=model)
+        return model
+
+    def __complete__(self, job: 'ModelBuildJob', poller, model: DocumentModelDetails | None = None, error: AzureError | None = None):
+        """Updates and persists the state of a build job whose poller has completed.
+
+        Both the background watcher and wait() record the outcome, so whichever finishes first persists it.
+
+        :param job: The build job.
+        :param poller: The poller for the build operation.
+        :param model: The details of the built model, if the build succeeded.
+        :param error: The error the poller raised, if any.
+        """
+
+        status = str(poller.status()).lower()
+        with self._lock:
+            if job.status in TERMINAL_STATUSES:
+                return
+
+            job.error = None if error is None else str(error)
+            job.error_code = None if error is None else ModelBuildJobManager.__get_error_code__(error)
+            if status in TERMINAL_STATUSES:
+                job.status = status
+                job.completed_on = time.time()
+                if model is not None:
+                    self.models[job.model_id] = model
+                elif error is None and status != 'succeeded':
+                    job.error = f"The model build finished with status '{status}'"
+            else:
+                # Polling stopped before the build completed, e.g. due to a connection error, so it can be resumed.
+                self._pollers.pop(job.model_id, None)
+            self.__save__()
+
+    @staticmethod
+    def __get_error_code__(error: AzureError):
+        """Gets the code of the error returned by the service, preferring the more specific inner error.
+
+        :param error: The error the poller raised.
+        :return: The error code, or None if the service did not return one.
+        """
+
+        odata_error = getattr(error, 'error', None)
+        if odata_error is None:
+            return None
+
+        inner_error = getattr(odata_error, 'innererror', None) or {}
+        return inner_error.get('code') or odata_error.code
+
+    def __save__(self):
+        """Persists the state of the build jobs, writing to a temporary file and renaming it into place."""
+
+        temp_path = f"{self.state_file_path}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump({"jobs": [job.to_dict() for job in self.jobs.values()]}, file, indent=4)
+        os.replace(temp_path, self.state_file_path)
+
+
+class ModelBuildJob:
+    """A class representing the persisted state of a model build."""
+
+    def __init__(self, model_id: str, blob_container_url: str, continuation_token: str, status: str, started_on: float, completed_on: float | None = None, error: str | None = None, error_code: str | None = None):
+        """Initializes the ModelBuildJob.
+
+        :param model_id: The ID of the model being built.
+        :param blob_container_url: The URL of the blob container containing the training data.
+        :param continuation_token: The token to resume polling the build operation with.
+        :param status: The status of the build.
+        :param started_on: The time the build started, in seconds since the epoch.
+        :param completed_on: The time the build completed, in seconds since the epoch.
+        :param error: The reason the build failed, if it did.
+        :param error_code: The code of the error returned by the service, if the build failed.
+        """
+
+        self.model_id = model_id
+        self.blob_container_url = blob_container_url
+        self.continuation_token = continuation_token
+        self.status = status
+        self.started_on = started_on
+        self.completed_on = completed_on
+        self.error = error
+        self.error_code = error_code
+
+    @property
+    def elapsed_seconds(self):
+        """The number of seconds the build has been running, or ran for if it has completed."""
+
+        return (self.completed_on or time.time()) - self.started_on
+
+    def to_dict(self):
+        return {
+            "modelId": self.model_id,
+            "blobContainerUrl": self.blob_container_url,
+            "continuationToken": self.continuation_token,
+            "status": self.status,
+            "startedOn": self.started_on,
+            "completedOn": self.completed_on,
+            "error": self.error,
+            "errorCode": self.error_code
+        }
+
+    @staticmethod
+    def from_dict(job_state: dict):
+        return ModelBuildJob(
+            job_state['modelId'],
+            job_state['blobContainerUrl'],
+            job_state['continuationToken'],
+            job_state['status'],
+            job_state['startedOn'],
+            job_state.get('completedOn'),
+            job_state.get('error'),
+            job_state.get('errorCode'))
+
+    def __repr__(self):
+        return f"ModelBuildJob(model_id={self.model_id!r}, status={self.status!r}, elapsed_seconds={self.elapsed_seconds:.1f})"
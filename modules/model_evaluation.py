@@ -0,0 +1,391 @@
+"""Evaluates the fields predicted by versions of a Document Intelligence model against ground-truth labels.
+
+Each `<document>.ocr_<version>.json` analysis result is scored against the document's `<document>.labels.json`. A predicted
+field is correct when its region overlaps the labeled region with at least the IoU threshold and, except for region labels
+such as signatures, its text matches the labeled text. Results are aggregated into per-field precision and recall for each
+model version, with the rows of table fields grouped as `field/*/rowField`.
+
+Run from the repository root with, for example:
+
+    python -m modules.model_evaluation pdfs --versions 1.0.0 1.1.0 --baseline 1.0.0
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from modules.labels_index import LabelsIndex
+
+
+def get_ground_truth(labels_result: dict):
+    """Gets the labeled text and region of each label in a labels.json file.
+
+    The values of a label on its first page are combined, as Document Intelligence Studio labels each word separately.
+
+    :param labels_result: The labels of the document, as loaded from a labels.json file.
+    :return: The text, page, normalized region as (start_x, start_y, end_x, end_y), and whether it is a region label, keyed by label.
+    """
+
+    ground_truth = {}
+    for label_json in labels_result.get('labels') or []:
+        values = label_json.get('value') or []
+        if len(values) == 0:
+            continue
+
+        page = values[0]['page']
+        page_values = [value for value in values if value['page'] == page]
+        polygons = np.array([bounding_box for value in page_values for bounding_box in value.get('boundingBoxes') or []],
+                            dtype=np.float64).reshape(-1, 8)
+        ground_truth[label_json['label']] = {
+            "text": ' '.join(value.get('text') or '' for value in page_values),
+            "page": page,
+            "box": _get_box(polygons),
+            "is_region": label_json.get('labelType') == 'region'
+        }
+
+    return ground_truth
+
+
+def get_predictions(analysis_result: dict):
+    """Gets the predicted text, region, and confidence of each field in an analysis result, keyed by label.
+
+    :param analysis_result: The `analyzeResult` of a Document Intelligence analysis using the custom model.
+    :return: The text, page, normalized region as (start_x, start_y, end_x, end_y), and confidence of each predicted field, keyed by label.
+    """
+
+    predictions = {}
+    documents = analysis_result.get('documents') or []
+    if len(documents) == 0:
+        return predictions
+
+    page_sizes = {page['pageNumber']: (page['width'], page['height'])
+                  for page in analysis_result.get('pages') or []}
+    _add_predictions(predictions, documents[0]['fields'], page_sizes, None, None)
+    return predictions
+
+
+def _add_predictions(predictions: dict, fields_result: dict, page_sizes: dict, parent_field: str | None, row_number: int | None):
+    for field_key, field_value in fields_result.items():
+        if field_value.get('valueType') == 'list':
+            for item_row_number, field_value_item in enumerate(field_value.get('value') or []):
+                _add_predictions(predictions, field_value_item.get('value') or {},
+                                 page_sizes, field_key, item_row_number)
+            continue
+
+        bounding_regions = [bounding_region for bounding_region in field_value.get('boundingRegions') or []
+                            if len(bounding_region.get('polygon') or []) >= 8]
+        if len(bounding_regions) == 0 and not field_value.get('content'):
+            continue
+
+        label = field_key if parent_field is None else f"{parent_field}/{row_number}/{field_key}"
+        page = bounding_regions[0]['pageNumber'] if bounding_regions else None
+        box = (np.nan, np.nan, np.nan, np.nan)
+        if page is not None:
+            width, height = page_sizes[page]
+            polygons = np.array([bounding_region['polygon'][:8] for bounding_region in bounding_regions
+                                 if bounding_region['pageNumber'] == page], dtype=np.float64)
+            polygons[:, 0::2] /= width
+            polygons[:, 1::2] /= height
+            box = _get_box(polygons)
+
+        confidence = field_value.get('confidence')
+        predictions[label] = {
+            "text": field_value.get('content') or '',
+            "page": page,
+            "box": box,
+            "confidence": np.nan if confidence is None else confidence
+        }
+
+
+def _get_box(polygons: np.ndarray):
+    if len(polygons) == 0:
+        return (np.nan, np.nan, np.nan, np.nan)
+
+    xs = polygons[:, 0::2]
+    ys = polygons[:, 1::2]
+    return (xs.min(), ys.min(), xs.max(), ys.max())
+
+
+def normalize_text(text: str):
+    """Normalizes text for matching, ignoring case and whitespace.
+
+    :param text: The text to normalize.
+    :return: The normalized text.
+    """
+
+    return re.sub(r'\s+', ' ', text).strip().casefold()
+
+
+def compute_iou(boxes: np.ndarray, other_boxes: np.ndarray):
+    """Computes the intersection over union of pairs of boxes.
+
+    :param boxes: The boxes, as an (N, 4) array of (start_x, start_y, end_x, end_y).
+    :param other_boxes: The boxes to compare with, as an (N, 4) array.
+    :return: The intersection over union of each pair of boxes, or 0 where either box is missing.
+    """
+
+    overlap_width = np.clip(np.minimum(boxes[:, 2], other_boxes[:, 2]) -
+                            np.maximum(boxes[:, 0], other_boxes[:, 0]), 0, None)
+    overlap_height = np.clip(np.minimum(boxes[:, 3], other_boxes[:, 3]) -
+                             np.maximum(boxes[:, 1], other_boxes[:, 1]), 0, None)
+    intersection = overlap_width * overlap_height
+    union = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]) + \
+        (other_boxes[:, 2] - other_boxes[:, 0]) * \
+        (other_boxes[:, 3] - other_boxes[:, 1]) - intersection
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        iou = intersection / union
+    return np.nan_to_num(iou, nan=0.0)
+
+
+def evaluate_document(labels_json_path: str, analysis_result_path: str, iou_threshold: float = 0.5):
+    """Scores the fields predicted for a document against its labels.
+
+    :param labels_json_path: The path to the ground-truth labels.json file of the document.
+    :param analysis_result_path: The path to the analysis result of the document using a version of the custom model.
+    :param iou_threshold: The minimum intersection over union for a predicted region to match the labeled region.
+    :return: The score of each label that was labeled or predicted.
+    """
+
+    with open(labels_json_path, 'r') as file:
+        ground_truth = get_ground_truth(json.load(file))
+    with open(analysis_result_path, 'r') as file:
+        predictions = get_predictions(json.load(file)['analyzeResult'])
+
+    labels = sorted(set(ground_truth.keys()) | set(predictions.keys()))
+    missing = {"text": '', "page": None, "box": (np.nan, np.nan, np.nan, np.nan),
+               "confidence": np.nan, "is_region": False}
+
+    expected = [ground_truth.get(label, missing) for label in labels]
+    actual = [predictions.get(label, missing) for label in labels]
+
+    is_labeled = np.array([label in ground_truth for label in labels], dtype=bool)
+    is_predicted = np.array([label in predictions for label in labels], dtype=bool)
+    same_page = np.array([expected_value['page'] == actual_value['page']
+                          for expected_value, actual_value in zip(expected, actual)], dtype=bool)
+    iou = compute_iou(np.array([value['box'] for value in expected], dtype=np.float64).reshape(-1, 4),
+                      np.array([value['box'] for value in actual], dtype=np.float64).reshape(-1, 4))
+    iou = np.where(same_page, iou, 0.0)
+    text_match = np.array([expected_value['is_region'] or normalize_text(expected_value['text']) == normalize_text(actual_value['text'])
+                           for expected_value, actual_value in zip(expected, actual)], dtype=bool)
+    correct = is_labeled & is_predicted & text_match & (iou >= iou_threshold)
+
+    return [{
+        "label": label,
+        "is_labeled": bool(is_labeled[i]),
+        "is_predicted": bool(is_predicted[i]),
+        "iou": float(iou[i]),
+        "text_match": bool(text_match[i]),
+        "correct": bool(correct[i]),
+        "confidence": float(actual[i]['confidence'])
+    } for i, label in enumerate(labels)]
+
+
+def _evaluate_document_version(document: str, version: str, labels_json_path: str, analysis_result_path: str, iou_threshold: float):
+    return document, version, evaluate_document(labels_json_path, analysis_result_path, iou_threshold)
+
+
+class EvaluationReport:
+    """A class representing the per-field precision and recall of each model version across a corpus of documents."""
+
+    def __init__(self, scores: dict[str, dict[str, list[dict]]]):
+        """Initializes the EvaluationReport.
+
+        :param scores: The scores of the labels of each document, keyed by model version and then document.
+        """
+
+        self.scores = scores
+        self.fields: dict[str, dict[str, dict]] = {
+            version: EvaluationReport.__aggregate__(document_scores) for version, document_scores in scores.items()}
+
+    @staticmethod
+    def __aggregate__(document_scores: dict[str, list[dict]]):
+        label_scores = [score for scores in document_scores.values() for score in scores]
+        if len(label_scores) == 0:
+            return {}
+
+        fields = np.array([EvaluationReport.get_field_key(score['label']) for score in label_scores])
+        is_labeled = np.array([score['is_labeled'] for score in label_scores], dtype=bool)
+        is_predicted = np.array([score['is_predicted'] for score in label_scores], dtype=bool)
+        correct = np.array([score['correct'] for score in label_scores], dtype=bool)
+        text_match = np.array([score['text_match'] for score in label_scores], dtype=bool)
+        iou = np.array([score['iou'] for score in label_scores], dtype=np.float64)
+        confidence = np.array([score['confidence'] for score in label_scores], dtype=np.float64)
+
+        unique_fields, field_indices = np.unique(fields, return_inverse=True)
+        field_count = len(unique_fields)
+
+        def count(mask):
+            return np.bincount(field_indices, weights=mask.astype(np.float64), minlength=field_count)
+
+        def mean(values, mask):
+            totals = np.bincount(field_indices, weights=np.where(mask, values, 0.0), minlength=field_count)
+            counts = count(mask)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return totals / counts
+
+        matched = is_labeled & is_predicted
+        true_positives = count(correct)
+        false_positives = count(is_predicted & ~correct)
+        false_negatives = count(is_labeled & ~correct)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            precision = true_positives / (true_positives + false_positives)
+            recall = true_positives / (true_positives + false_negatives)
+            f1 = 2 * precision * recall / (precision + recall)
+        mean_iou = mean(iou, matched)
+        text_accuracy = mean(text_match.astype(np.float64), matched)
+        mean_confidence = mean(np.nan_to_num(confidence), is_predicted & ~np.isnan(confidence))
+
+        return {str(field): {
+            "true_positives": int(true_positives[i]),
+            "false_positives": int(false_positives[i]),
+            "false_negatives": int(false_negatives[i]),
+            "precision": float(np.nan_to_num(precision[i])),
+            "recall": float(np.nan_to_num(recall[i])),
+            "f1": float(np.nan_to_num(f1[i])),
+            "mean_iou": _to_metric(mean_iou[i]),
+            "text_accuracy": _to_metric(text_accuracy[i]),
+            "mean_confidence": _to_metric(mean_confidence[i])
+        } for i, field in enumerate(unique_fields)}
+
+    @staticmethod
+    def get_field_key(label: str):
+        """Gets the key a label is aggregated under, grouping the rows of table fields.
+
+        :param label: The label, e.g. `InvoiceNumber` or `Items/0/Description`.
+        :return: The field key, e.g. `InvoiceNumber` or `Items/*/Description`.
+        """
+
+        field, row_number, row_field = LabelsIndex.parse_label_key(label)
+        return label if row_number is None else f"{field}/*/{row_field}"
+
+    def compare(self, baseline_version: str, candidate_version: str):
+        """Compares the per-field scores of a candidate model version against a baseline version.
+
+        :param baseline_version: The version of the baseline model, e.g. `1.0.0`.
+        :param candidate_version: The version of the candidate model, e.g. `1.1.0`.
+        :return: The change in precision, recall, and F1 of each field, keyed by field.
+        """
+
+        baseline = self.fields[baseline_version]
+        candidate = self.fields[candidate_version]
+        empty = {"precision": 0.0, "recall": 0.0, "f1": 0.0}
+
+        return {field: {metric: candidate.get(field, empty)[metric] - baseline.get(field, empty)[metric]
+                        for metric in ('precision', 'recall', 'f1')}
+                for field in sorted(set(baseline.keys()) | set(candidate.keys()))}
+
+    def format_table(self):
+        """Formats the per-field scores of each model version as a table.
+
+        :return: The table.
+        """
+
+        lines = [f"{'version':<10} {'field':<32} {'tp':>4} {'fp':>4} {'fn':>4} {'precision':>10} {'recall':>8} {'f1':>6} {'iou':>6} {'text':>6} {'conf':>6}"]
+        for version, fields in self.fields.items():
+            for field, metrics in sorted(fields.items()):
+                lines.append(f"{version:<10} {field:<32} {metrics['true_positives']:>4} {metrics['false_positives']:>4} "
+                             f"{metrics['false_negatives']:>4} {metrics['precision']:>10.3f} {metrics['recall']:>8.3f} "
+                             f"{metrics['f1']:>6.3f} {_format_metric(metrics['mean_iou'])} {_format_metric(metrics['text_accuracy'])} "
+                             f"{_format_metric(metrics['mean_confidence'])}")
+
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        return {"fields": self.fields}
+
+
+def _to_metric(value: float):
+    # A mean over no matched or predicted labels is undefined, and is reported as None so the report is valid JSON.
+    return float(value) if np.isfinite(value) else None
+
+
+def _format_metric(value: float | None):
+    return f"{'-':>6}" if value is None else f"{value:>6.3f}"
+
+
+def evaluate_corpus(documents_dir: str, versions: list[str], labels_dir: str | None = None, iou_threshold: float = 0.5, max_workers: int | None = None):
+    """Evaluates versions of a model against the labeled documents in a directory, scoring the documents in a process pool.
+
+    :param documents_dir: The directory containing the `<document>.ocr_<version>.json` analysis results.
+    :param versions: The versions of the model to evaluate, e.g. `['1.0.0', '1.1.0']`.
+    :param labels_dir: The directory containing the `<document>.labels.json` ground truth. Defaults to the documents directory.
+    :param iou_threshold: The minimum intersection over union for a predicted region to match the labeled region.
+    :param max_workers: The maximum number of worker processes.
+    :return: The evaluation report.
+    """
+
+    labels_dir = labels_dir or documents_dir
+    scores: dict[str, dict[str, list[dict]]] = {version: {} for version in versions}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for version in versions:
+            analysis_result_suffix = f".ocr_{version}.json"
+            for file in sorted(os.listdir(documents_dir)):
+                if not file.endswith(analysis_result_suffix):
+                    continue
+
+                document = file[:-len(analysis_result_suffix)]
+                labels_json_path = os.path.join(labels_dir, f"{document}.labels.json")
+                if not os.path.exists(labels_json_path):
+                    continue
+
+                futures.append(executor.submit(
+                    _evaluate_document_version, document, version, labels_json_path,
+                    os.path.join(documents_dir, file), iou_threshold))
+
+        for future in futures:
+            document, version, document_scores = future.result()
+            scores[version][document] = document_scores
+
+    return EvaluationReport(scores)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Evaluate versions of a Document Intelligence model against ground-truth labels.json files.')
+    parser.add_argument('documents_dir',
+                        help='The directory containing the <document>.ocr_<version>.json analysis results.')
+    parser.add_argument('--versions', nargs='+', required=True,
+                        help='The versions of the model to evaluate, e.g. 1.0.0 1.1.0.')
+    parser.add_argument('--labels-dir',
+                        help='The directory containing the <document>.labels.json ground truth. Defaults to the documents directory.')
+    parser.add_argument('--iou-threshold', type=float, default=0.5)
+    parser.add_argument('--max-workers', type=int,
+                        help='The maximum number of worker processes.')
+    parser.add_argument('--baseline',
+                        help='The version to compare the other versions against. Exits with an error if any field regresses.')
+    parser.add_argument('--max-f1-drop', type=float, default=0.0,
+                        help='The largest drop in a field F1 score from the baseline that is not a regression.')
+    parser.add_argument('--output',
+                        help='The path to save the report to as JSON.')
+    args = parser.parse_args()
+
+    report = evaluate_corpus(args.documents_dir, args.versions,
+                             args.labels_dir, args.iou_threshold, args.max_workers)
+    print(report.format_table())
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(report.to_dict(), file, indent=4, allow_nan=False)
+
+    if args.baseline is not None:
+        regressions = []
+        for version in args.versions:
+            if version == args.baseline:
+                continue
+            for field, delta in report.compare(args.baseline, version).items():
+                if delta['f1'] < -args.max_f1_drop:
+                    regressions.append(f"{version} {field} ({delta['f1']:+.3f} F1)")
+
+        if len(regressions) > 0:
+            print(f"Regressed from {args.baseline}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,40 @@
+import hashlib
 import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from azure.ai.formrecognizer import (DocumentModelAdministrationClient,
                                      ModelBuildMode,
-                                     DocumentAnalysisClient)
+                                     DocumentAnalysisClient,
+                                     DocumentAnalysisApiVersion)
 from azure.core.credentials import (TokenCredential, AzureKeyCredential)
-from azure.storage.blob import (BlobServiceClient)
+from azure.core.exceptions import (ResourceNotFoundError)
+from azure.storage.blob import (BlobServiceClient, ContentSettings)
+from modules import instrumentation
 from modules.document_intelligence_result_formatter import DocumentIntelligenceResultFormatter
+from modules.analysis_result_cache import AnalysisResultCache
+from modules.document_deduplication import (DocumentFingerprint, find_near_duplicates)
 from modules.app_settings import AppSettings
+from modules.model_build_job_manager import ModelBuildJobManager
+from modules.service_client_factory import ServiceClientFactory
+
+# The maximum number of blobs that can be deleted in a single batch request.
+DELETE_BATCH_SIZE = 256
+
+# The suffixes of the files that belong to a document, e.g. `.labels.json`, `.ocr.json`, or `.ocr_1.0.0.json`.
+_DOCUMENT_FILE_SUFFIX = re.compile(r'\.(labels|ocr(_[^/]+)?)\.json$')
 
 
 class ModelTrainingClient:
     """A client for training Document Intelligence models and running layout analysis on documents."""
 
-    def __init__(self, settings: AppSettings, use_azure_credential: bool = False, azure_credential: TokenCredential | None = None):
+    def __init__(self, settings: AppSettings, use_azure_credential: bool = False, azure_credential: TokenCredential | None = None, analysis_result_cache: AnalysisResultCache | None = None, client_factory: ServiceClientFactory | None = None):
         """Initializes the ModelTrainingClient.
 
         :param config: The configuration settings for the client.
         :param azure_credential: The Azure credential to use for authentication.
+        :param analysis_result_cache: The cache to serve repeated layout analysis of the same document and model from.
+        :param client_factory: The factory to get shared, pooled service clients from. If not provided, the client creates its own service clients.
         """
 
         document_intelligence_endpoint = settings.document_intelligence_endpoint
@@ -23,51 +42,246 @@ class ModelTrainingClient:
         storage_account_name = settings.storage_account_name
         storage_account_connection_string = settings.storage_account_connection_string
         training_data_container_name = settings.training_data_container_name
+        self.api_version = DocumentAnalysisApiVersion.V2023_07_31
 
-        if use_azure_credential:
-            blob_service_client = BlobServiceClient(
-                account_url=f"https://{storage_account_name}.blob.core.windows.net", credential=azure_credential)
-        else:
-            blob_service_client = BlobServiceClient.from_connection_string(
-                storage_account_connection_string
-            )
+        if not use_azure_credential:
             azure_credential = AzureKeyCredential(document_intelligence_key)
 
+        if client_factory is not None:
+            if use_azure_credential:
+                blob_service_client = client_factory.get_blob_service_client(
+                    account_url=f"https://{storage_account_name}.blob.core.windows.net", credential=azure_credential)
+            else:
+                blob_service_client = client_factory.get_blob_service_client(
+                    connection_string=storage_account_connection_string)
+
+            self.document_model_admin_client = client_factory.get_document_model_admin_client(
+                document_intelligence_endpoint, azure_credential)
+            self.document_analysis_client = client_factory.get_document_analysis_client(
+                document_intelligence_endpoint, azure_credential, self.api_version)
+        else:
+            if use_azure_credential:
+                blob_service_client = BlobServiceClient(
+                    account_url=f"https://{storage_account_name}.blob.core.windows.net", credential=azure_credential)
+            else:
+                blob_service_client = BlobServiceClient.from_connection_string(
+                    storage_account_connection_string
+                )
+
+            self.document_model_admin_client = DocumentModelAdministrationClient(
+                endpoint=document_intelligence_endpoint, credential=azure_credential)
+            self.document_analysis_client = DocumentAnalysisClient(
+                endpoint=document_intelligence_endpoint, credential=azure_credential, api_version=self.api_version)
+
         self.training_data_container_client = blob_service_client.get_container_client(
             training_data_container_name)
-        self.document_model_admin_client = DocumentModelAdministrationClient(
-            endpoint=document_intelligence_endpoint, credential=azure_credential)
-        self.document_analysis_client = DocumentAnalysisClient(
-            endpoint=document_intelligence_endpoint, credential=azure_credential)
+        self.analysis_result_cache = analysis_result_cache
+        self._model_versions: dict[str, str] = {}
 
-    def upload_training_data(self, training_data_folder_path: str):
+    def upload_training_data(self, training_data_folder_path: str, incremental: bool = False, max_concurrency: int = 8, near_duplicate_threshold: float | None = None, near_duplicate_layout_threshold: float = 0.8, raise_on_error: bool = True):
         """Uploads the training data to the Azure Blob Storage container.
 
+        Each file is uploaded with its MD5 hash stored in the blob's content settings. When running incrementally, the hashes
+        of the blobs already in the container are listed once up front, and any local file whose hash matches is skipped.
+
+        When a near-duplicate threshold is given, documents are fingerprinted from their `<document>.ocr.json` layout analysis
+        results, and the files of any document that is a near duplicate of another are not uploaded, keeping the training set
+        small and the model builds fast. Documents already in the container are always kept, so a new near duplicate of an
+        uploaded document is skipped rather than uploaded alongside it. Uploaded documents without a local analysis result are
+        fingerprinted from their `.ocr.json` blob. Of the other documents, the earliest added is kept.
+
         :param training_data_folder_path: The path to the folder containing the training data.
+        :param incremental: Whether to skip uploading files that are unchanged from the blobs already in the container.
+        :param max_concurrency: The maximum number of files to upload concurrently.
+        :param near_duplicate_threshold: The content similarity at or above which documents are near duplicates, e.g. 0.7. If None, every document is uploaded.
+        :param near_duplicate_layout_threshold: The layout similarity at or above which documents are near duplicates.
+        :param raise_on_error: Whether to raise a TrainingDataUploadError once every file has been attempted, if any file failed to upload. If False, the failures are only recorded in the result.
+        :return: The result of the upload, detailing the files uploaded, skipped, and failed, the number of bytes sent, and any near-duplicate documents.
         """
 
-        for root, _, files in os.walk(training_data_folder_path):
-            for file in files:
-                blob_client = self.training_data_container_client.get_blob_client(
-                    file)
-                with open(f"{root}/{file}", "rb") as data:
-                    blob_client.upload_blob(data, overwrite=True)
+        with instrumentation.span('upload_training_data') as span:
+            existing_blob_hashes = {}
+            existing_document_names = set()
+            existing_analysis_results = {}
+            if incremental or near_duplicate_threshold is not None:
+                with instrumentation.span('list_training_data') as list_span:
+                    blob_count = 0
+                    for blob in self.training_data_container_client.list_blobs():
+                        blob_count += 1
+                        document_name = UploadTrainingDataResult.get_document_name(blob.name)
+                        existing_document_names.add(document_name)
+                        if blob.name.endswith('.ocr.json'):
+                            existing_analysis_results[document_name] = blob.name
+                        content_md5 = blob.content_settings.content_md5
+                        if incremental and content_md5:
+                            existing_blob_hashes[blob.name] = bytes(content_md5)
+                    list_span.set(items=blob_count)
+
+            file_paths = []
+            for root, _, files in os.walk(training_data_folder_path):
+                for file in files:
+                    file_paths.append((file, os.path.join(root, file)))
+
+            result = UploadTrainingDataResult()
+
+            if near_duplicate_threshold is not None:
+                analysis_result_paths = {UploadTrainingDataResult.get_document_name(blob_name): file_path
+                                         for blob_name, file_path in file_paths if blob_name.endswith('.ocr.json')}
+                kept_fingerprints = self.__get_blob_fingerprints__(
+                    [blob_name for document_name, blob_name in existing_analysis_results.items()
+                     if document_name not in analysis_result_paths], max_concurrency)
+                with instrumentation.span('find_near_duplicates') as duplicates_span:
+                    deduplication = find_near_duplicates(
+                        list(analysis_result_paths.values()),
+                        threshold=near_duplicate_threshold, layout_threshold=near_duplicate_layout_threshold,
+                        kept_names=existing_document_names, kept_fingerprints=kept_fingerprints)
+                    duplicates_span.set(items=len(deduplication.unique) + len(deduplication.duplicates),
+                                        duplicates=len(deduplication.duplicates))
+                result.near_duplicates = deduplication.duplicates
+                # The document and its labels.json and ocr.json files share its name as their prefix.
+                file_paths = [(blob_name, file_path) for blob_name, file_path in file_paths
+                              if UploadTrainingDataResult.get_document_name(blob_name) not in result.near_duplicates]
+
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                futures = {executor.submit(self.__upload_training_file__, blob_name, file_path, existing_blob_hashes.get(blob_name)): blob_name
+                           for blob_name, file_path in file_paths}
+                for future, blob_name in futures.items():
+                    try:
+                        bytes_uploaded = future.result()
+                    except Exception as e:
+                        result.failed[blob_name] = e
+                        continue
+
+                    if bytes_uploaded is None:
+                        result.skipped.append(blob_name)
+                    else:
+                        result.uploaded.append(blob_name)
+                        result.bytes_uploaded += bytes_uploaded
+
+            span.set(items=len(result.uploaded), bytes=result.bytes_uploaded,
+                     skipped=len(result.skipped), failed=len(result.failed), near_duplicates=len(result.near_duplicates))
 
         self.training_data_container_client_sas_url = f"{
             self.training_data_container_client.url}"
 
-    def delete_training_data(self, blob_name_search: str):
+        if raise_on_error and len(result.failed) > 0:
+            raise TrainingDataUploadError(result)
+
+        return result
+
+    def __get_blob_fingerprints__(self, blob_names: list[str], max_concurrency: int):
+        """Fingerprints uploaded documents from their `<document>.ocr.json` layout analysis result blobs.
+
+        :param blob_names: The names of the layout analysis result blobs.
+        :param max_concurrency: The maximum number of blobs to download concurrently.
+        :return: The fingerprint of each document.
+        """
+
+        if len(blob_names) == 0:
+            return []
+
+        with instrumentation.span('fingerprint_training_data', items=len(blob_names)), \
+                tempfile.TemporaryDirectory() as download_dir:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                return list(executor.map(
+                    lambda blob_name: self.__get_blob_fingerprint__(blob_name, download_dir), blob_names))
+
+    def __get_blob_fingerprint__(self, blob_name: str, download_dir: str):
+        """Downloads a layout analysis result blob to a file, so large results are loaded incrementally, and fingerprints it."""
+
+        download_path = os.path.join(download_dir, os.path.basename(blob_name))
+        with open(download_path, 'wb') as file:
+            self.training_data_container_client.download_blob(blob_name).readinto(file)
+        return DocumentFingerprint.from_file(
+            download_path, name=UploadTrainingDataResult.get_document_name(blob_name))
+
+    def __upload_training_file__(self, blob_name: str, file_path: str, existing_content_md5: bytes | None):
+        """Uploads a single training data file, unless its content matches the existing blob.
+
+        :param blob_name: The name of the blob to upload the file to.
+        :param file_path: The path to the file to upload.
+        :param existing_content_md5: The MD5 hash of the existing blob, if known.
+        :return: The number of bytes uploaded, or None if the upload was skipped.
+        """
+
+        content_md5 = ModelTrainingClient.__get_file_md5__(file_path)
+        if existing_content_md5 is not None and existing_content_md5 == content_md5:
+            return None
+
+        file_size = os.path.getsize(file_path)
+        blob_client = self.training_data_container_client.get_blob_client(
+            blob_name)
+        with instrumentation.span('upload_training_file', bytes=file_size, items=1):
+            with open(file_path, "rb") as data:
+                blob_client.upload_blob(data, overwrite=True, content_settings=ContentSettings(
+                    content_md5=bytearray(content_md5)))
+
+        return file_size
+
+    @staticmethod
+    def __get_file_md5__(file_path: str):
+        md5 = hashlib.md5()
+        with open(file_path, "rb") as data:
+            for chunk in iter(lambda: data.read(1024 * 1024), b""):
+                md5.update(chunk)
+        return md5.digest()
+
+    def delete_training_data(self, blob_name_search: str, match_prefix: bool = True, dry_run: bool = False, max_concurrency: int = 4):
         """Deletes the training data from the Azure Blob Storage container.
 
+        By default, the blobs are filtered on the server by name prefix. Matching blobs are deleted using batch requests of up
+        to 256 blobs each, sent concurrently.
+
         :param blob_name_search: The search string to use to find the blobs to delete.
+        :param match_prefix: Whether to match blobs whose name starts with the search string, filtering on the server. If False, any blob containing the search string is matched, which requires listing the whole container.
+        :param dry_run: Whether to only return the matched blobs without deleting them.
+        :param max_concurrency: The maximum number of batch delete requests to send concurrently.
+        :return: The result of the deletion, detailing the blobs matched, deleted, and any that failed.
+        """
+
+        if match_prefix:
+            blob_list = self.training_data_container_client.list_blobs(
+                name_starts_with=blob_name_search)
+            matched = [blob.name for blob in blob_list]
+        else:
+            blob_list = self.training_data_container_client.list_blobs()
+            matched = [blob.name for blob in blob_list if blob_name_search in blob.name]
+
+        result = DeleteTrainingDataResult(matched, dry_run)
+        if dry_run or len(matched) == 0:
+            return result
+
+        batches = [matched[i:i + DELETE_BATCH_SIZE]
+                   for i in range(0, len(matched), DELETE_BATCH_SIZE)]
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = {executor.submit(self.__delete_training_data_batch__, batch): batch
+                       for batch in batches}
+            for future, batch in futures.items():
+                try:
+                    responses = future.result()
+                except Exception as e:
+                    for blob_name in batch:
+                        result.failed[blob_name] = str(e)
+                    continue
+
+                for blob_name, response in zip(batch, responses):
+                    if response.status_code in (200, 202):
+                        result.deleted.append(blob_name)
+                    else:
+                        result.failed[blob_name] = f"{
+                            response.status_code} {response.reason}"
+
+        return result
+
+    def __delete_training_data_batch__(self, blob_names: list[str]):
+        """Deletes a batch of blobs in a single request.
+
+        :param blob_names: The names of the blobs to delete.
+        :return: The responses for each blob deletion, in the order of the blob names.
         """
 
-        blob_list = self.training_data_container_client.list_blobs()
-        for blob in blob_list:
-            if blob_name_search in blob.name:
-                blob_client = self.training_data_container_client.get_blob_client(
-                    blob.name)
-                blob_client.delete_blob()
+        return list(self.training_data_container_client.delete_blobs(*blob_names, raise_on_any_failure=False))
 
     def create_model(self, model_name: str):
         """Creates a Document Intelligence model.
@@ -76,9 +290,10 @@ class ModelTrainingClient:
         :return: The created model details.
         """
 
+        self._model_versions.pop(model_name, None)
         try:
             self.document_model_admin_client.delete_document_model(model_name)
-        except:
+        except ResourceNotFoundError:
             pass
 
         poller = self.document_model_admin_client.begin_build_document_model(
@@ -87,8 +302,39 @@ class ModelTrainingClient:
             model_id=model_name
         )
         self.model = poller.result()
+        if self.model.created_on is not None:
+            self._model_versions[model_name] = self.model.created_on.isoformat()
         return self.model
 
+    def __get_model_version__(self, model_name: str):
+        """Gets the version of a model for the analysis cache key.
+
+        Custom models can be rebuilt under the same name by `create_model`, so their version is the time they were created. The
+        version is looked up once per client, and updated when the client rebuilds the model.
+
+        :param model_name: The name of the model.
+        :return: The time the model was created, or None for prebuilt models.
+        """
+
+        if AnalysisResultCache.is_prebuilt_model(model_name):
+            return None
+
+        model_version = self._model_versions.get(model_name)
+        if model_version is None:
+            model_version = self.document_model_admin_client.get_document_model(
+                model_name).created_on.isoformat()
+            self._model_versions[model_name] = model_version
+        return model_version
+
+    def create_model_build_job_manager(self, state_file_path: str):
+        """Creates a manager for building models without blocking, persisting the state of the builds to disk.
+
+        :param state_file_path: The path to the JSON file to persist the state of the build jobs to.
+        :return: The model build job manager.
+        """
+
+        return ModelBuildJobManager(self.document_model_admin_client, state_file_path)
+
     def run_layout_analysis(self, file_path: str, output_ocr_json_path: str, model_name='prebuilt-layout'):
         """Runs layout analysis on a document.
 
@@ -98,8 +344,88 @@ class ModelTrainingClient:
         :return: The OCR JSON output.
         """
 
-        with open(file_path, "rb") as f:
-            poller = self.document_analysis_client.begin_analyze_document(
-                model_id=model_name, document=f)
-            self.analysis_result = poller.result()
-        return DocumentIntelligenceResultFormatter.save_to_ocr_json(self.analysis_result, output_ocr_json_path)
+        with instrumentation.span('run_layout_analysis', model_id=model_name) as span:
+            with open(file_path, "rb") as f:
+                document = f.read()
+            span.set(bytes=len(document))
+
+            cache_key = None
+            self.analysis_result = None
+            if self.analysis_result_cache is not None:
+                cache_key = AnalysisResultCache.get_key(
+                    document, model_name, self.api_version.value, self.__get_model_version__(model_name))
+                self.analysis_result = self.analysis_result_cache.get(cache_key)
+            span.set(cached=self.analysis_result is not None)
+
+            if self.analysis_result is None:
+                with instrumentation.span('analyze_document', model_id=model_name, bytes=len(document)) as service_span:
+                    poller = self.document_analysis_client.begin_analyze_document(
+                        model_id=model_name, document=document)
+                    self.analysis_result = poller.result()
+                    service_span.set(items=len(self.analysis_result.pages or []))
+
+                if cache_key is not None:
+                    self.analysis_result_cache.set(cache_key, self.analysis_result)
+
+            return DocumentIntelligenceResultFormatter.save_to_ocr_json(self.analysis_result, output_ocr_json_path)
+
+
+class UploadTrainingDataResult:
+    """A class representing the outcome of uploading training data to the Azure Blob Storage container."""
+
+    def __init__(self):
+        """Initializes the UploadTrainingDataResult."""
+
+        self.uploaded: list[str] = []
+        self.skipped: list[str] = []
+        self.failed: dict[str, Exception] = {}
+        self.near_duplicates: dict[str, dict] = {}
+        self.bytes_uploaded = 0
+
+    @staticmethod
+    def get_document_name(file_name: str):
+        """Gets the name of the document a training data file belongs to.
+
+        :param file_name: The name of the file, e.g. `Invoice_1.pdf.labels.json` or `Invoice_1.pdf.ocr_1.0.0.json`.
+        :return: The name of the document, e.g. `Invoice_1.pdf`.
+        """
+
+        return _DOCUMENT_FILE_SUFFIX.sub('', file_name)
+
+    def __repr__(self):
+        return (f"UploadTrainingDataResult(uploaded={len(self.uploaded)}, skipped={len(self.skipped)}, "
+                f"failed={len(self.failed)}, near_duplicates={len(self.near_duplicates)}, bytes_uploaded={self.bytes_uploaded})")
+
+
+class TrainingDataUploadError(Exception):
+    """Raised when one or more training data files fail to upload to the Azure Blob Storage container."""
+
+    def __init__(self, result: UploadTrainingDataResult):
+        """Initializes the TrainingDataUploadError.
+
+        :param result: The result of the upload, including the exception raised for each file that failed.
+        """
+
+        self.result = result
+        failed = ', '.join(f"{blob_name} ({type(error).__name__})" for blob_name, error in result.failed.items())
+        super().__init__(f"{len(result.failed)} training data file(s) failed to upload: {failed}")
+
+
+class DeleteTrainingDataResult:
+    """A class representing the outcome of deleting training data from the Azure Blob Storage container."""
+
+    def __init__(self, matched: list[str], dry_run: bool):
+        """Initializes the DeleteTrainingDataResult.
+
+        :param matched: The names of the blobs matching the search.
+        :param dry_run: Whether the deletion was a dry run.
+        """
+
+        self.matched = matched
+        self.dry_run = dry_run
+        self.deleted: list[str] = []
+        self.failed: dict[str, str] = {}
+
+    def __repr__(self):
+        return (f"DeleteTrainingDataResult(matched={len(self.matched)}, deleted={len(self.deleted)}, "
+                f"failed={len(self.failed)}, dry_run={self.dry_run})")
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import tempfile
+from modules import instrumentation
+
+
+class PdfPageRenderer:
+    """A class to render the pages of a PDF file to images, caching the rendered pages on disk.
+
+    Pages are cached by the hash of the PDF file content, the DPI, and the image format, so a document that has already been
+    rendered is never rasterized again. Pages are rendered straight to files by Poppler and are never held in memory.
+    """
+
+    def __init__(self, pdf_file_path: str, cache_dir: str, dpi: int = 200, fmt: str = 'jpeg', thread_count: int = 1):
+        """Initializes the PdfPageRenderer.
+
+        :param pdf_file_path: The path to the PDF file to render.
+        :param cache_dir: The directory to cache the rendered pages in.
+        :param dpi: The resolution to render the pages at.
+        :param fmt: The image format to render the pages to.
+        :param thread_count: The number of Poppler processes to use when rendering several pages at once.
+        """
+
+        self.pdf_file_path = pdf_file_path
+        self.dpi = dpi
+        self.fmt = fmt
+        self.extension = 'jpg' if fmt == 'jpeg' else fmt
+        self.thread_count = thread_count
+
+        with open(pdf_file_path, 'rb') as file:
+            self.pdf_hash = hashlib.file_digest(file, 'sha256').hexdigest()
+
+        self.pages_dir = os.path.join(
+            cache_dir, f"{self.pdf_hash[:32]}_{dpi}_{fmt}")
+        if not os.path.exists(self.pages_dir):
+            os.makedirs(self.pages_dir)
+
+        self._page_count = None
+
+    @property
+    def page_count(self):
+        """The number of pages in the PDF file."""
+
+        if self._page_count is None:
+            manifest_path = os.path.join(self.pages_dir, 'manifest.json')
+            if os.path.exists(manifest_path):
+                with open(manifest_path, 'r') as file:
+                    self._page_count = json.load(file)['pages']
+            else:
+                from pdf2image import pdfinfo_from_path
+
+                self._page_count = pdfinfo_from_path(
+                    self.pdf_file_path)['Pages']
+                with open(manifest_path, 'w') as file:
+                    json.dump({'pages': self._page_count}, file)
+
+        return self._page_count
+
+    def get_page_path(self, page_number: int):
+        """Gets the path to the image of a page, rendering only that page if it is not cached.
+
+        :param page_number: The 1-based number of the page.
+        :return: The path to the image of the page.
+        """
+
+        page_path = self.get_cached_page_path(page_number)
+        if not os.path.exists(page_path):
+            self.__render_pages__(page_number, page_number)
+
+        return page_path
+
+    def get_cached_page_path(self, page_number: int):
+        """Gets the path the image of a page is cached at, without rendering the page.
+
+        :param page_number: The 1-based number of the page.
+        :return: The path to the image of the page, which may not exist yet.
+        """
+
+        return os.path.join(self.pages_dir, f"page_{page_number}.{self.extension}")
+
+    def get_page_paths(self):
+        """Gets the paths to the images of every page, rendering any pages that are not cached in a single pass.
+
+        :return: The paths to the images of the pages, in page order.
+        """
+
+        page_paths = [self.get_cached_page_path(page_number)
+                      for page_number in range(1, self.page_count + 1)]
+
+        missing_page_numbers = [page_number for page_number, page_path in enumerate(page_paths, start=1)
+                                if not os.path.exists(page_path)]
+        if len(missing_page_numbers) > 0:
+            self.__render_pages__(
+                missing_page_numbers[0], missing_page_numbers[-1])
+
+        return page_paths
+
+    def get_preview_path(self, page_number: int, max_dimension: int, fmt: str = 'webp', quality: int = 80):
+        """Gets the path to a downscaled preview image of a page, creating it from the rendered page if it is not cached.
+
+        The preview keeps the aspect ratio of the page, and is never larger than the rendered page. JPEG previews are saved as
+        progressive JPEGs, so they can be displayed while they are still loading.
+
+        :param page_number: The 1-based number of the page.
+        :param max_dimension: The maximum width or height of the preview, in pixels.
+        :param fmt: The image format of the preview, e.g. `webp` or `jpeg`.
+        :param quality: The quality to save the preview with, from 1 to 100.
+        :return: The path to the preview image of the page.
+        """
+
+        extension = 'jpg' if fmt == 'jpeg' else fmt
+        preview_path = os.path.join(
+            self.pages_dir, f"page_{page_number}_preview_{max_dimension}_{quality}.{extension}")
+        if os.path.exists(preview_path):
+            return preview_path
+
+        from PIL import Image
+
+        page_path = self.get_page_path(page_number)
+        temp_path = f"{preview_path}.{os.getpid()}.tmp"
+        with Image.open(page_path) as image:
+            image.thumbnail((max_dimension, max_dimension),
+                            Image.Resampling.LANCZOS)
+            if fmt == 'jpeg':
+                image.save(temp_path, format='JPEG', quality=quality,
+                           optimize=True, progressive=True)
+            else:
+                image.save(temp_path, format=fmt.upper(), quality=quality)
+        os.replace(temp_path, preview_path)
+
+        return preview_path
+
+    @staticmethod
+    def get_image_size(image_path: str):
+        """Gets the size of an image without decoding it.
+
+        :param image_path: The path to the image.
+        :return: The width and height of the image.
+        """
+
+        from PIL import Image
+
+        with Image.open(image_path) as image:
+            return image.size
+
+    def __render_pages__(self, first_page: int, last_page: int):
+        """Renders a range of pages into the cache.
+
+        :param first_page: The 1-based number of the first page to render.
+        :param last_page: The 1-based number of the last page to render.
+        """
+
+        from pdf2image import convert_from_path
+
+        with instrumentation.span('render_pages', dpi=self.dpi, items=last_page - first_page + 1):
+            with tempfile.TemporaryDirectory(dir=self.pages_dir) as output_folder:
+                rendered_paths = convert_from_path(
+                    self.pdf_file_path,
+                    dpi=self.dpi,
+                    fmt=self.fmt,
+                    first_page=first_page,
+                    last_page=last_page,
+                    thread_count=self.thread_count,
+                    output_folder=output_folder,
+                    paths_only=True)
+
+                for page_number, rendered_path in enumerate(rendered_paths, start=first_page):
+                    os.replace(rendered_path,
+                               self.get_cached_page_path(page_number))
@@ -0,0 +1,142 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from azure.ai.formrecognizer import (DocumentModelAdministrationClient,
+                                     DocumentAnalysisClient,
+                                     DocumentAnalysisApiVersion)
+from azure.core.credentials import (TokenCredential, AzureKeyCredential)
+from azure.core.pipeline.policies import (RetryPolicy, RetryMode)
+from azure.core.pipeline.transport import (RequestsTransport)
+from azure.storage.blob import (BlobServiceClient, ExponentialRetry)
+
+
+class ServiceClientFactory:
+    """A factory for Azure service clients that share a single pooled, keep-alive HTTP transport.
+
+    Clients are cached by endpoint and credential, so many short-lived operations reuse the same clients and warm connections
+    instead of each creating its own HTTP pipeline. Every client is created with explicit exponential-backoff retry and
+    timeout policies.
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 32, retry_total: int = 5, retry_backoff_factor: float = 0.8, retry_backoff_max: int = 60, connection_timeout: float = 10, read_timeout: float = 120):
+        """Initializes the ServiceClientFactory.
+
+        :param pool_connections: The number of hosts to keep connection pools for.
+        :param pool_maxsize: The maximum number of connections to keep open to each host.
+        :param retry_total: The maximum number of retries for a failed request.
+        :param retry_backoff_factor: The backoff factor, in seconds, for exponential retries.
+        :param retry_backoff_max: The maximum backoff between retries, in seconds.
+        :param connection_timeout: The timeout for establishing a connection, in seconds.
+        :param read_timeout: The timeout for reading a response, in seconds.
+        """
+
+        self.retry_total = retry_total
+        self.retry_backoff_factor = retry_backoff_factor
+        self.retry_backoff_max = retry_backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # The factory owns the session, so closing a client does not close the connections shared with the other clients.
+        self.transport = RequestsTransport(
+            session=self.session,
+            session_owner=False,
+            connection_timeout=connection_timeout,
+            read_timeout=read_timeout)
+
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes the clients created by the factory and the shared HTTP connections."""
+
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+
+        for client in clients:
+            client.close()
+
+        self.session.close()
+
+    def get_blob_service_client(self, account_url: str | None = None, credential: TokenCredential | None = None, connection_string: str | None = None):
+        """Gets a Blob Storage service client for an account URL and credential, or a connection string.
+
+        :param account_url: The URL of the storage account.
+        :param credential: The credential to authenticate with the account URL.
+        :param connection_string: The connection string for the storage account.
+        :return: The Blob Storage service client.
+        """
+
+        if connection_string is not None:
+            key = ('blob', connection_string)
+        else:
+            key = ('blob', account_url, ServiceClientFactory.__get_credential_key__(credential))
+
+        def create_client():
+            retry_policy = ExponentialRetry(
+                initial_backoff=self.retry_backoff_factor, increment_base=2, retry_total=self.retry_total)
+            if connection_string is not None:
+                return BlobServiceClient.from_connection_string(
+                    connection_string, transport=self.transport, retry_policy=retry_policy)
+            return BlobServiceClient(
+                account_url=account_url, credential=credential, transport=self.transport, retry_policy=retry_policy)
+
+        return self.__get_or_create_client__(key, create_client)
+
+    def get_document_model_admin_client(self, endpoint: str, credential: AzureKeyCredential | TokenCredential):
+        """Gets a Document Intelligence model administration client for an endpoint and credential.
+
+        :param endpoint: The Document Intelligence endpoint.
+        :param credential: The credential to authenticate with.
+        :return: The model administration client.
+        """
+
+        key = ('admin', endpoint, ServiceClientFactory.__get_credential_key__(credential))
+        return self.__get_or_create_client__(key, lambda: DocumentModelAdministrationClient(
+            endpoint=endpoint, credential=credential, transport=self.transport, retry_policy=self.__create_retry_policy__()))
+
+    def get_document_analysis_client(self, endpoint: str, credential: AzureKeyCredential | TokenCredential, api_version: DocumentAnalysisApiVersion = DocumentAnalysisApiVersion.V2023_07_31):
+        """Gets a Document Intelligence analysis client for an endpoint, credential, and API version.
+
+        :param endpoint: The Document Intelligence endpoint.
+        :param credential: The credential to authenticate with.
+        :param api_version: The API version to use for analysis.
+        :return: The analysis client.
+        """
+
+        key = ('analysis', endpoint, ServiceClientFactory.__get_credential_key__(credential), api_version)
+        return self.__get_or_create_client__(key, lambda: DocumentAnalysisClient(
+            endpoint=endpoint, credential=credential, api_version=api_version, transport=self.transport, retry_policy=self.__create_retry_policy__()))
+
+    def __create_retry_policy__(self):
+        return RetryPolicy(
+            retry_total=self.retry_total,
+            retry_backoff_factor=self.retry_backoff_factor,
+            retry_backoff_max=self.retry_backoff_max,
+            retry_mode=RetryMode.Exponential)
+
+    def __get_or_create_client__(self, key: tuple, create_client):
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = create_client()
+                self._clients[key] = client
+            return client
+
+    @staticmethod
+    def __get_credential_key__(credential):
+        # Key credentials are created per client from the same key, so they are matched by value rather than by identity.
+        if isinstance(credential, AzureKeyCredential):
+            return ('key', credential.key)
+        return ('credential', id(credential))
+
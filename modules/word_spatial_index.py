@@ -0,0 +1,176 @@
+import json
+import numpy as np
+
+
+class WordSpatialIndex:
+    """A per-page grid index over the words and lines of a Document Intelligence layout analysis result.
+
+    Words and lines are indexed by their normalized bounding boxes into a uniform grid of cells, so finding the words within
+    a region only tests the words in the cells the region overlaps, rather than every word on the page.
+    """
+
+    def __init__(self, layout_result: dict, cell_size: float = 0.05):
+        """Initializes the WordSpatialIndex.
+
+        :param layout_result: The `analyzeResult` of a Document Intelligence layout analysis.
+        :param cell_size: The size of each grid cell, as a fraction of the page width and height.
+        """
+
+        self.cell_size = cell_size
+        self._pages: dict[int, dict[str, PageElementGrid]] = {}
+
+        for page in layout_result.get('pages') or []:
+            self._pages[page['pageNumber']] = {
+                'words': PageElementGrid(page.get('words') or [], page['width'], page['height'], cell_size),
+                'lines': PageElementGrid(page.get('lines') or [], page['width'], page['height'], cell_size)
+            }
+
+    @staticmethod
+    def from_file(layout_result_path: str, cell_size: float = 0.05):
+        """Creates a WordSpatialIndex from a layout analysis result file, e.g. `<document>.ocr.json`.
+
+        :param layout_result_path: The path to the layout analysis result file.
+        :param cell_size: The size of each grid cell, as a fraction of the page width and height.
+        :return: The index of the words and lines in the layout analysis result.
+        """
+
+        with open(layout_result_path, 'r') as file:
+            return WordSpatialIndex(json.load(file)['analyzeResult'], cell_size)
+
+    def query(self, page_number: int, box: tuple[float, float, float, float], min_overlap: float = 0.5, kind: str = 'words'):
+        """Finds the words or lines within a region of a page.
+
+        :param page_number: The page number to search.
+        :param box: The normalized region to search, as (start_x, start_y, end_x, end_y).
+        :param min_overlap: The fraction of an element's area that must be within the region for it to match. 0 matches any element intersecting the region, and 1 only elements entirely within it.
+        :param kind: Whether to search the `words` or `lines` of the page.
+        :return: The matching elements, in reading order.
+        """
+
+        page = self._pages.get(page_number)
+        if page is None:
+            return []
+
+        return page[kind].query(box, min_overlap)
+
+    def get_text(self, page_number: int, box: tuple[float, float, float, float], min_overlap: float = 0.5):
+        """Gets the text of the words within a region of a page, in reading order.
+
+        :param page_number: The page number to search.
+        :param box: The normalized region to search, as (start_x, start_y, end_x, end_y).
+        :param min_overlap: The fraction of a word's area that must be within the region for it to be included.
+        :return: The text of the words within the region.
+        """
+
+        return ' '.join(word['content'] for word in self.query(page_number, box, min_overlap))
+
+    def snap(self, page_number: int, box: tuple[float, float, float, float], min_overlap: float = 0.5):
+        """Snaps a region of a page to the union of the bounding boxes of the words within it.
+
+        :param page_number: The page number of the region.
+        :param box: The normalized region, as (start_x, start_y, end_x, end_y).
+        :param min_overlap: The fraction of a word's area that must be within the region for it to be included.
+        :return: The normalized union of the word boxes, as (start_x, start_y, end_x, end_y), or None if there are no words in the region.
+        """
+
+        page = self._pages.get(page_number)
+        if page is None:
+            return None
+
+        return page['words'].get_union(box, min_overlap)
+
+
+class PageElementGrid:
+    """A uniform grid over the normalized bounding boxes of the words or lines on a single page."""
+
+    def __init__(self, elements: list[dict], page_width: float, page_height: float, cell_size: float):
+        """Initializes the PageElementGrid.
+
+        :param elements: The words or lines of the page.
+        :param page_width: The width of the page in the analysis result.
+        :param page_height: The height of the page in the analysis result.
+        :param cell_size: The size of each grid cell, as a fraction of the page width and height.
+        """
+
+        self.elements = [element for element in elements if len(
+            element.get('polygon') or []) >= 2]
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], list[int]] = {}
+
+        self.boxes = np.empty((len(self.elements), 4), dtype=np.float64)
+        for i, element in enumerate(self.elements):
+            polygon = np.asarray(element['polygon'], dtype=np.float64)
+            xs = polygon[0::2] / page_width
+            ys = polygon[1::2] / page_height
+            self.boxes[i] = (xs.min(), ys.min(), xs.max(), ys.max())
+
+        self.areas = np.maximum((self.boxes[:, 2] - self.boxes[:, 0]) *
+                                (self.boxes[:, 3] - self.boxes[:, 1]), 1e-12)
+        self.reading_order = np.array([PageElementGrid.__get_offset__(element, i)
+                                       for i, element in enumerate(self.elements)], dtype=np.int64)
+
+        for i, box in enumerate(self.boxes):
+            for cell in self.__get_cells__(box):
+                self.cells.setdefault(cell, []).append(i)
+
+    def query(self, box: tuple[float, float, float, float], min_overlap: float):
+        """Finds the elements within a normalized region, in reading order.
+
+        :param box: The normalized region to search, as (start_x, start_y, end_x, end_y).
+        :param min_overlap: The fraction of an element's area that must be within the region for it to match.
+        :return: The matching elements.
+        """
+
+        return [self.elements[i] for i in self.__query_indices__(box, min_overlap)]
+
+    def get_union(self, box: tuple[float, float, float, float], min_overlap: float):
+        """Gets the union of the bounding boxes of the elements within a normalized region.
+
+        :param box: The normalized region to search, as (start_x, start_y, end_x, end_y).
+        :param min_overlap: The fraction of an element's area that must be within the region for it to match.
+        :return: The normalized union of the element boxes, or None if there are no elements in the region.
+        """
+
+        indices = self.__query_indices__(box, min_overlap)
+        if len(indices) == 0:
+            return None
+
+        boxes = self.boxes[indices]
+        return (float(boxes[:, 0].min()), float(boxes[:, 1].min()), float(boxes[:, 2].max()), float(boxes[:, 3].max()))
+
+    def __query_indices__(self, box: tuple[float, float, float, float], min_overlap: float):
+        start_x, start_y, end_x, end_y = min(box[0], box[2]), min(
+            box[1], box[3]), max(box[0], box[2]), max(box[1], box[3])
+
+        candidates = set()
+        for cell in self.__get_cells__((start_x, start_y, end_x, end_y)):
+            candidates.update(self.cells.get(cell, ()))
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        indices = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        boxes = self.boxes[indices]
+        overlap_width = np.minimum(boxes[:, 2], end_x) - \
+            np.maximum(boxes[:, 0], start_x)
+        overlap_height = np.minimum(boxes[:, 3], end_y) - \
+            np.maximum(boxes[:, 1], start_y)
+        intersects = (overlap_width >= 0) & (overlap_height >= 0)
+        overlap = np.clip(overlap_width, 0, None) * \
+            np.clip(overlap_height, 0, None) / self.areas[indices]
+
+        indices = indices[intersects & (overlap >= min_overlap)]
+        return indices[np.argsort(self.reading_order[indices], kind='stable')]
+
+    def __get_cells__(self, box):
+        start_cell_x = int(max(box[0], 0) // self.cell_size)
+        start_cell_y = int(max(box[1], 0) // self.cell_size)
+        end_cell_x = int(min(box[2], 1) // self.cell_size)
+        end_cell_y = int(min(box[3], 1) // self.cell_size)
+        return [(x, y) for x in range(start_cell_x, end_cell_x + 1) for y in range(start_cell_y, end_cell_y + 1)]
+
+    @staticmethod
+    def __get_offset__(element: dict, index: int):
+        if 'span' in element:
+            return element['span']['offset']
+        spans = element.get('spans') or []
+        return spans[0]['offset'] if len(spans) > 0 else index
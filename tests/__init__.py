@@ -0,0 +1,5 @@
+import os
+
+REPOSITORY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRAINING_DATA_DIR = os.path.join(REPOSITORY_DIR, 'model_training')
+PDFS_DIR = os.path.join(REPOSITORY_DIR, 'pdfs')
@@ -0,0 +1,12 @@
+import pytest
+from benchmarks.service_emulator import ServiceEmulator
+from tests import TRAINING_DATA_DIR
+
+
+@pytest.fixture
+def emulator():
+    """A service emulator with no latency or faults, and operations that complete almost immediately."""
+
+    with ServiceEmulator(TRAINING_DATA_DIR, latency_seconds=0.0, latency_jitter_seconds=0.0, analyze_seconds=0.0,
+                         build_seconds=0.0, poll_interval_seconds=0.01, seed=1) as service_emulator:
+        yield service_emulator
@@ -0,0 +1,89 @@
+import os
+import time
+import pytest
+from azure.ai.formrecognizer import AnalyzeResult
+from benchmarks.fixtures import (load_analyze_result, to_analyze_result_dict)
+from modules.analysis_result_cache import AnalysisResultCache
+from tests import PDFS_DIR
+
+
+@pytest.fixture(scope='module')
+def analyze_result():
+    return AnalyzeResult.from_dict(to_analyze_result_dict(
+        load_analyze_result(os.path.join(PDFS_DIR, 'Invoice_6.pdf.ocr_1.0.0.json'))))
+
+
+def set_times(cache, key, accessed_time, created_time):
+    os.utime(os.path.join(cache.cache_dir, f"{key}.json"), (accessed_time, created_time))
+
+
+def test_get_returns_the_cached_result(tmp_path, analyze_result):
+    cache = AnalysisResultCache(str(tmp_path))
+    key = AnalysisResultCache.get_key(b'document', 'invoices', '2023-07-31', '2024-01-01T00:00:00')
+
+    assert cache.get(key) is None
+    cache.set(key, analyze_result)
+    cached_result = cache.get(key)
+
+    assert cached_result.to_dict() == analyze_result.to_dict()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_keys_differ_by_model_version():
+    key = AnalysisResultCache.get_key(b'document', 'invoices', '2023-07-31', '2024-01-01T00:00:00')
+
+    assert key != AnalysisResultCache.get_key(b'document', 'invoices', '2023-07-31', '2024-02-01T00:00:00')
+    assert key != AnalysisResultCache.get_key(b'other document', 'invoices', '2023-07-31', '2024-01-01T00:00:00')
+
+
+def test_entries_expire_by_the_time_they_were_cached_even_when_read(tmp_path, analyze_result):
+    cache = AnalysisResultCache(str(tmp_path), max_age_seconds=60)
+    cache.set('recent', analyze_result)
+    cache.set('old', analyze_result)
+    now = time.time()
+    set_times(cache, 'recent', now, now - 30)
+    set_times(cache, 'old', now, now - 90)
+
+    assert cache.get('recent') is not None
+    assert cache.get('old') is None
+    assert not os.path.exists(os.path.join(cache.cache_dir, 'old.json'))
+    # Reading an entry marks it as used without resetting its age.
+    assert os.path.getmtime(os.path.join(cache.cache_dir, 'recent.json')) == pytest.approx(now - 30)
+
+
+def test_evict_removes_expired_entries(tmp_path, analyze_result):
+    cache = AnalysisResultCache(str(tmp_path), max_age_seconds=60)
+    cache.set('old', analyze_result)
+    now = time.time()
+    set_times(cache, 'old', now, now - 90)
+
+    cache.evict()
+
+    assert os.listdir(cache.cache_dir) == []
+    assert cache.evictions == 1
+
+
+def test_evict_removes_the_least_recently_used_entries_over_the_maximum_size(tmp_path, analyze_result):
+    cache = AnalysisResultCache(str(tmp_path), max_size_bytes=None)
+    for key in ('first', 'second', 'third'):
+        cache.set(key, analyze_result)
+    entry_size = os.path.getsize(os.path.join(cache.cache_dir, 'first.json'))
+    now = time.time()
+    set_times(cache, 'first', now - 10, now - 30)
+    set_times(cache, 'second', now - 30, now - 20)
+    set_times(cache, 'third', now - 20, now - 10)
+
+    cache.max_size_bytes = entry_size * 2
+    cache.evict()
+
+    assert sorted(os.listdir(cache.cache_dir)) == ['first.json', 'third.json']
+
+
+def test_a_corrupt_entry_is_a_miss_and_is_removed(tmp_path):
+    cache = AnalysisResultCache(str(tmp_path))
+    with open(os.path.join(cache.cache_dir, 'corrupt.json'), 'w') as file:
+        file.write('{"pages": [')
+
+    assert cache.get('corrupt') is None
+    assert cache.misses == 1
+    assert os.listdir(cache.cache_dir) == []
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import threading
+import time
+from azure.ai.formrecognizer.aio import (DocumentAnalysisClient)
+from azure.core.credentials import (AzureKeyCredential)
+from azure.core.exceptions import (HttpResponseError)
+from modules.batch_analysis_client import BatchAnalysisClient
+from tests import TRAINING_DATA_DIR
+
+DOCUMENTS = BatchAnalysisClient.get_documents(TRAINING_DATA_DIR)
+
+
+def analyze(client: BatchAnalysisClient, output_dir: str, on_result=None):
+    async def run():
+        async with client:
+            results = []
+            async for result in client.analyze_documents_iter(DOCUMENTS, output_dir=output_dir):
+                if on_result is not None:
+                    on_result(result)
+                results.append(result)
+            return results
+
+    return asyncio.run(run())
+
+
+def disable_policy_retries(client: BatchAnalysisClient, emulator):
+    # Without the SDK's own retries, throttling reaches the client's backoff loop.
+    settings = emulator.get_settings()
+    client.document_analysis_client = DocumentAnalysisClient(
+        endpoint=settings.document_intelligence_endpoint, credential=AzureKeyCredential(settings.document_intelligence_key),
+        api_version=client.api_version, retry_total=0)
+
+
+def test_analyze_documents_limits_concurrent_analyses(emulator, tmp_path):
+    emulator.analyze_seconds = 0.1
+    client = BatchAnalysisClient(emulator.get_settings(), max_concurrency=2)
+    begin_analyze_document = client.__begin_analyze_document__
+    in_flight = 0
+    max_in_flight = 0
+
+    async def counting_begin_analyze_document(model_id, document):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        try:
+            return await begin_analyze_document(model_id, document)
+        finally:
+            in_flight -= 1
+
+    client.__begin_analyze_document__ = counting_begin_analyze_document
+    results = analyze(client, str(tmp_path))
+
+    assert len(results) == len(DOCUMENTS)
+    assert all(result.succeeded for result in results)
+    assert max_in_flight == 2
+
+
+def test_analyze_documents_iter_saves_each_result_before_yielding_it(emulator, tmp_path):
+    client = BatchAnalysisClient(emulator.get_settings(), max_concurrency=3)
+    saved_when_yielded = []
+
+    results = analyze(client, str(tmp_path), lambda result: saved_when_yielded.append(
+        os.path.exists(result.output_path)))
+
+    assert sorted(result.document_path for result in results) == DOCUMENTS
+    assert saved_when_yielded == [True] * len(DOCUMENTS)
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        f"{os.path.basename(document)}.ocr.json" for document in DOCUMENTS)
+
+
+def test_analyze_documents_backs_off_while_throttled(emulator, tmp_path):
+    client = BatchAnalysisClient(emulator.get_settings(), max_concurrency=2, max_throttle_retries=5)
+    disable_policy_retries(client, emulator)
+    emulator.throttle_rate = 1.0
+    threading.Timer(0.5, lambda: setattr(emulator, 'throttle_rate', 0.0)).start()
+
+    start_time = time.perf_counter()
+    results = analyze(client, str(tmp_path))
+    elapsed_seconds = time.perf_counter() - start_time
+
+    assert all(result.succeeded for result in results)
+    assert emulator.reset_stats().get('formrecognizer/throttled', 0) > 0
+    # The throttled responses ask the client to retry after a second.
+    assert elapsed_seconds >= 1.0
+
+
+def test_analyze_documents_reports_throttling_once_retries_are_exhausted(emulator, tmp_path):
+    client = BatchAnalysisClient(emulator.get_settings(), max_throttle_retries=0)
+    disable_policy_retries(client, emulator)
+    emulator.throttle_rate = 1.0
+
+    results = analyze(client, str(tmp_path))
+
+    assert len(results) == len(DOCUMENTS)
+    assert all(isinstance(result.error, HttpResponseError) and result.error.status_code == 429
+               for result in results)
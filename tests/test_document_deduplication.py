@@ -0,0 +1,67 @@
+import json
+import os
+import shutil
+from modules.document_deduplication import (DocumentFingerprint, find_near_duplicates)
+from tests import TRAINING_DATA_DIR
+
+
+def copy_analysis_result(source_name, target_dir, target_name, added_time, replace_word=None):
+    target_path = os.path.join(target_dir, f"{target_name}.ocr.json")
+    if replace_word is None:
+        shutil.copyfile(os.path.join(TRAINING_DATA_DIR, f"{source_name}.ocr.json"), target_path)
+    else:
+        with open(os.path.join(TRAINING_DATA_DIR, f"{source_name}.ocr.json"), 'r') as file:
+            analysis_result = json.load(file)
+        analysis_result['analyzeResult']['pages'][0]['words'][0]['content'] = replace_word
+        with open(target_path, 'w') as file:
+            json.dump(analysis_result, file)
+    os.utime(target_path, (added_time, added_time))
+    return target_path
+
+
+def test_a_near_duplicate_is_attributed_to_the_earlier_document(tmp_path):
+    paths = [
+        copy_analysis_result('Invoice_1.pdf', tmp_path, 'Invoice_1_rescan.pdf', 2_000, replace_word='INVOICE'),
+        copy_analysis_result('Invoice_1.pdf', tmp_path, 'Invoice_1.pdf', 1_000),
+        copy_analysis_result('Invoice_3.pdf', tmp_path, 'Invoice_3.pdf', 3_000)
+    ]
+
+    result = find_near_duplicates(paths)
+
+    assert result.unique == ['Invoice_1.pdf', 'Invoice_3.pdf']
+    assert list(result.duplicates.keys()) == ['Invoice_1_rescan.pdf']
+    duplicate = result.duplicates['Invoice_1_rescan.pdf']
+    assert duplicate['duplicateOf'] == 'Invoice_1.pdf'
+    assert duplicate['contentSimilarity'] >= 0.7
+    assert duplicate['layoutSimilarity'] >= 0.8
+
+
+def test_kept_documents_are_never_near_duplicates(tmp_path):
+    paths = [
+        copy_analysis_result('Invoice_1.pdf', tmp_path, 'Invoice_1.pdf', 1_000),
+        copy_analysis_result('Invoice_1.pdf', tmp_path, 'Invoice_1_uploaded.pdf', 2_000)
+    ]
+
+    result = find_near_duplicates(paths, kept_names={'Invoice_1_uploaded.pdf'})
+
+    assert result.unique == ['Invoice_1_uploaded.pdf']
+    assert result.duplicates['Invoice_1.pdf']['duplicateOf'] == 'Invoice_1_uploaded.pdf'
+
+
+def test_different_documents_are_not_near_duplicates():
+    paths = [os.path.join(TRAINING_DATA_DIR, f"Invoice_{number}.pdf.ocr.json") for number in (1, 2, 3)]
+
+    result = find_near_duplicates(paths)
+
+    assert result.duplicates == {}
+    assert sorted(result.unique) == ['Invoice_1.pdf', 'Invoice_2.pdf', 'Invoice_3.pdf']
+
+
+def test_fingerprint_similarity_of_identical_and_different_documents():
+    invoice_1 = DocumentFingerprint.from_file(os.path.join(TRAINING_DATA_DIR, 'Invoice_1.pdf.ocr.json'))
+    invoice_3 = DocumentFingerprint.from_file(os.path.join(TRAINING_DATA_DIR, 'Invoice_3.pdf.ocr.json'))
+
+    assert invoice_1.name == 'Invoice_1.pdf'
+    assert invoice_1.content_similarity(invoice_1) == 1.0
+    assert invoice_1.layout_similarity(invoice_1) == 1.0
+    assert invoice_1.content_similarity(invoice_3) < 0.7
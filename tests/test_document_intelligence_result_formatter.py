@@ -0,0 +1,52 @@
+import glob
+import json
+import os
+import pytest
+from benchmarks.fixtures import to_analyze_result_dict
+from benchmarks.reformat_analyze_result_dict import legacy_reformat_analyze_result_dict
+from modules.document_intelligence_result_formatter import DocumentIntelligenceResultFormatter
+from tests import TRAINING_DATA_DIR
+
+
+@pytest.mark.parametrize('ocr_json_path', sorted(glob.glob(os.path.join(TRAINING_DATA_DIR, '*.ocr.json'))),
+                         ids=os.path.basename)
+def test_reformat_matches_the_previous_implementation(ocr_json_path):
+    with open(ocr_json_path, 'r') as file:
+        analyze_result_dict = to_analyze_result_dict(json.load(file)['analyzeResult'])
+
+    expected = legacy_reformat_analyze_result_dict(analyze_result_dict)
+
+    assert DocumentIntelligenceResultFormatter.reformat_analyze_result_dict(analyze_result_dict) == expected
+
+
+def test_reformat_converts_keys_and_polygons():
+    analyze_result_dict = {
+        'model_id': 'prebuilt-layout',
+        'pages': [{'page_number': 1, 'words': [{'content': 'Total', 'polygon': [{'x': 1, 'y': 2}, {'x': 3, 'y': 4}],
+                                                'span': {'offset': 0, 'length': 5}}]}],
+        'languages': ['en', 'fr'],
+        'nested_lists': [[{'inner_key': 1}], [2, 3]]
+    }
+
+    assert DocumentIntelligenceResultFormatter.reformat_analyze_result_dict(analyze_result_dict) == {
+        'modelId': 'prebuilt-layout',
+        'pages': [{'pageNumber': 1, 'words': [{'content': 'Total', 'polygon': [1, 2, 3, 4],
+                                               'span': {'offset': 0, 'length': 5}}]}],
+        'languages': ['en', 'fr'],
+        'nestedLists': [[{'innerKey': 1}], [2, 3]]
+    }
+
+
+def test_reformat_handles_results_nested_beyond_the_recursion_limit():
+    analyze_result_dict = leaf = {}
+    for _ in range(5000):
+        leaf['child_value'] = {}
+        leaf = leaf['child_value']
+
+    reformatted = DocumentIntelligenceResultFormatter.reformat_analyze_result_dict(analyze_result_dict)
+
+    depth = 0
+    while reformatted:
+        reformatted = reformatted['childValue']
+        depth += 1
+    assert depth == 5000
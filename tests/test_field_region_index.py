@@ -0,0 +1,65 @@
+import pytest
+from modules.field_region_index import FieldRegionIndex
+
+
+def create_region(page_number, start_x, start_y, end_x, end_y):
+    return {"pageNumber": page_number, "polygon": [start_x, start_y, end_x, start_y, end_x, end_y, start_x, end_y]}
+
+
+def create_analysis_result():
+    return {
+        "pages": [{"pageNumber": 1, "width": 8.5, "height": 11}, {"pageNumber": 2, "width": 8.5, "height": 11}],
+        "documents": [{"fields": {
+            "Address": {"valueType": "string", "content": "1 Main Street London", "boundingRegions": [
+                create_region(1, 1, 9, 3, 10), create_region(2, 1, 1, 3, 2)]},
+            "Total": {"valueType": "number", "content": "10.00", "boundingRegions": [create_region(2, 6, 8, 7, 8.5)]},
+            "Items": {"valueType": "list", "value": [
+                {"valueType": "dictionary", "value": {
+                    "Description": {"valueType": "string", "content": "Widget", "boundingRegions": [
+                        create_region(1, 1, 5, 4, 5.5), create_region(1, 1, 5.5, 4, 6)]}}},
+                {"valueType": "dictionary", "value": {
+                    "Description": {"valueType": "string", "content": "Gadget", "boundingRegions": [
+                        create_region(2, 1, 5, 4, 5.5)]}}}
+            ]},
+            "Missing": {"valueType": "string", "content": None, "boundingRegions": [{"pageNumber": 1, "polygon": []}]}
+        }}]
+    }
+
+
+def test_every_region_of_a_multi_region_field_is_indexed_on_its_page():
+    field_region_index = FieldRegionIndex.from_analysis_result(create_analysis_result())
+
+    assert field_region_index.page_numbers == [1, 2]
+    page_1_labels = [bbox['label'] for bbox in field_region_index.get_bboxes(1, 1, 1)]
+    page_2_labels = [bbox['label'] for bbox in field_region_index.get_bboxes(2, 1, 1)]
+    assert sorted(page_1_labels) == ['Address', 'Description', 'Description']
+    assert sorted(page_2_labels) == ['Address', 'Description', 'Total']
+
+
+def test_table_row_regions_keep_their_field_and_row_number():
+    field_region_index = FieldRegionIndex.from_analysis_result(create_analysis_result())
+
+    rows = [(bbox['field'], bbox['row_field'], bbox['row_number'], bbox['content'])
+            for page_number in field_region_index.page_numbers
+            for bbox in field_region_index.get_bboxes(page_number, 1, 1) if bbox['label'] == 'Description']
+
+    assert rows == [('Items', 'Description', 0, 'Widget'), ('Items', 'Description', 0, 'Widget'),
+                    ('Items', 'Description', 1, 'Gadget')]
+
+
+def test_bboxes_are_scaled_to_the_rendered_page_size():
+    field_region_index = FieldRegionIndex.from_analysis_result(create_analysis_result())
+
+    total = [bbox for bbox in field_region_index.get_bboxes(2, 100, 200) if bbox['label'] == 'Total'][0]
+
+    assert total['x'] == pytest.approx(600)
+    assert total['y'] == pytest.approx(1600)
+    assert total['width'] == pytest.approx(100)
+    assert total['height'] == pytest.approx(100)
+
+
+def test_pages_without_regions_and_results_without_documents():
+    field_region_index = FieldRegionIndex.from_analysis_result(create_analysis_result())
+
+    assert field_region_index.get_bboxes(3, 1, 1) == []
+    assert FieldRegionIndex.from_analysis_result({"pages": [], "documents": []}) is None
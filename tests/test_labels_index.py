@@ -0,0 +1,90 @@
+import os
+from modules.document_intelligence_result_formatter import DocumentIntelligenceResultFormatter
+from modules.labels_index import LabelsIndex
+
+
+def create_label(label, page, text, label_type=None):
+    label_json = {"label": label, "value": [{"page": page, "text": text, "boundingBoxes": [[0, 0, 1, 0, 1, 1, 0, 1]]}]}
+    if label_type is not None:
+        label_json['labelType'] = label_type
+    return label_json
+
+
+def create_labels_result(labels):
+    return {"$schema": "schema.json", "document": "Invoice_1.pdf", "labels": labels}
+
+
+def test_apply_replaces_only_the_pages_of_the_new_labels():
+    existing_total = create_label('Total', 1, '10.00')
+    existing_total['value'].append(create_label('Total', 2, '20.00')['value'][0])
+    labels_index = LabelsIndex('Invoice_1.pdf', create_labels_result(
+        [existing_total, create_label('InvoiceNumber', 1, 'INV-1')]))
+
+    diff = labels_index.apply([create_label('Total', 2, '25.00'), create_label('Customer', 1, 'Contoso')])
+
+    assert diff.changed == [('Total', 2)]
+    assert diff.added == [('Customer', 1)]
+    assert diff.removed == []
+    assert [value['text'] for value in labels_index.get('Total')] == ['10.00', '25.00']
+    assert [value['text'] for value in labels_index.get('InvoiceNumber')] == ['INV-1']
+
+
+def test_apply_unchanged_labels_has_no_changes():
+    labels_index = LabelsIndex('Invoice_1.pdf', create_labels_result([create_label('Total', 1, '10.00')]))
+
+    diff = labels_index.apply([create_label('Total', 1, '10.00')])
+
+    assert not diff.has_changes
+
+
+def test_apply_a_changed_label_type_is_a_change():
+    labels_index = LabelsIndex('Invoice_1.pdf', create_labels_result([create_label('Signature', 1, '')]))
+
+    diff = labels_index.apply([create_label('Signature', 1, '', label_type='region')])
+
+    assert diff.changed == [('Signature', 1)]
+    assert labels_index.to_dict()['labels'][0]['labelType'] == 'region'
+
+
+def test_apply_removes_a_label_from_one_page_or_a_whole_table():
+    labels_index = LabelsIndex('Invoice_1.pdf', create_labels_result([
+        create_label('Items/0/Description', 1, 'Widget'),
+        create_label('Items/1/Description', 2, 'Gadget'),
+        create_label('Total', 1, '10.00'),
+        create_label('Total', 2, '20.00')
+    ]))
+
+    diff = labels_index.apply([], removed_labels=['Items', ('Total', 2)])
+
+    assert sorted(diff.removed) == [('Items/0/Description', 1), ('Items/1/Description', 2), ('Total', 2)]
+    assert labels_index.labels == ['Total']
+    assert labels_index.get_table_labels('Items') == []
+    assert [value['page'] for value in labels_index.get('Total')] == [1]
+
+
+def test_merge_into_an_empty_file_matches_save_to_labels_json(tmp_path):
+    labels = [create_label('Total', 1, '10.00'), create_label('Customer', 1, 'Contoso'),
+              create_label('Customer', 2, 'Contoso Ltd')]
+    saved_path = str(tmp_path / 'saved.labels.json')
+    merged_path = str(tmp_path / 'merged.labels.json')
+
+    saved = DocumentIntelligenceResultFormatter.save_to_labels_json(labels, 'Invoice_1.pdf', saved_path)
+    diff = DocumentIntelligenceResultFormatter.merge_to_labels_json(labels, 'Invoice_1.pdf', merged_path)
+
+    assert [label['label'] for label in saved['labels']] == ['Customer', 'Total']
+    assert LabelsIndex.from_file(merged_path, 'Invoice_1.pdf').to_dict() == saved
+    assert sorted(diff.added) == [('Customer', 1), ('Customer', 2), ('Total', 1)]
+
+
+def test_merge_does_not_rewrite_unchanged_labels(tmp_path):
+    labels_json_path = str(tmp_path / 'Invoice_1.pdf.labels.json')
+    DocumentIntelligenceResultFormatter.save_to_labels_json(
+        [create_label('Total', 1, '10.00')], 'Invoice_1.pdf', labels_json_path)
+    modified_time = 1_000_000_000
+    os.utime(labels_json_path, (modified_time, modified_time))
+
+    diff = DocumentIntelligenceResultFormatter.merge_to_labels_json(
+        [create_label('Total', 1, '10.00')], 'Invoice_1.pdf', labels_json_path)
+
+    assert not diff.has_changes
+    assert os.path.getmtime(labels_json_path) == modified_time
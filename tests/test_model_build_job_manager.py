@@ -0,0 +1,79 @@
+import json
+import pytest
+from azure.core.exceptions import HttpResponseError
+from modules.model_build_job_manager import ModelBuildJobManager
+from modules.model_training_client import ModelTrainingClient
+from tests import TRAINING_DATA_DIR
+
+
+def create_manager(emulator, state_file_path):
+    client = ModelTrainingClient(emulator.get_settings())
+    client.upload_training_data(TRAINING_DATA_DIR)
+    return client, client.create_model_build_job_manager(state_file_path)
+
+
+def read_jobs(state_file_path):
+    with open(state_file_path, 'r') as file:
+        return {job['modelId']: job for job in json.load(file)['jobs']}
+
+
+def test_wait_persists_the_succeeded_build(emulator, tmp_path):
+    state_file_path = str(tmp_path / 'jobs.json')
+    client, manager = create_manager(emulator, state_file_path)
+
+    manager.start_build('invoices', client.training_data_container_client_sas_url)
+    model = manager.wait('invoices', timeout=10)
+
+    assert model.model_id == 'invoices'
+    job = read_jobs(state_file_path)['invoices']
+    assert job['status'] == 'succeeded'
+    assert job['completedOn'] is not None
+    assert manager.get_progress('invoices')['percent_completed'] == 100
+
+
+def test_wait_records_the_error_of_a_failed_build(emulator, tmp_path):
+    state_file_path = str(tmp_path / 'jobs.json')
+    client, manager = create_manager(emulator, state_file_path)
+    emulator.containers['training-data'].clear()
+
+    manager.start_build('invoices', client.training_data_container_client_sas_url)
+    with pytest.raises(HttpResponseError) as error:
+        manager.wait('invoices', timeout=10)
+
+    job = read_jobs(state_file_path)['invoices']
+    assert job['status'] == 'failed'
+    assert job['error'] == str(error.value)
+    assert job['errorCode'] == 'TrainingContentMissing'
+
+
+def test_wait_returns_the_persisted_state_after_a_restart(emulator, tmp_path):
+    state_file_path = str(tmp_path / 'jobs.json')
+    client, manager = create_manager(emulator, state_file_path)
+    manager.start_build('invoices', client.training_data_container_client_sas_url)
+    manager.wait('invoices', timeout=10)
+    emulator.containers['training-data'].clear()
+    manager.start_build('empty', client.training_data_container_client_sas_url)
+    with pytest.raises(HttpResponseError):
+        manager.wait('empty', timeout=10)
+
+    restarted_manager = ModelBuildJobManager(client.document_model_admin_client, state_file_path)
+
+    assert restarted_manager.resume() == []
+    assert restarted_manager.wait('invoices').model_id == 'invoices'
+    progress = restarted_manager.wait('empty')
+    assert progress['status'] == 'failed'
+    assert progress['error_code'] == 'TrainingContentMissing'
+
+
+def test_resume_polls_a_build_that_was_running(emulator, tmp_path):
+    state_file_path = str(tmp_path / 'jobs.json')
+    emulator.build_seconds = 0.5
+    client, manager = create_manager(emulator, state_file_path)
+    manager.start_build('invoices', client.training_data_container_client_sas_url)
+
+    restarted_manager = ModelBuildJobManager(client.document_model_admin_client, state_file_path)
+    resumed_jobs = restarted_manager.resume()
+
+    assert [job.model_id for job in resumed_jobs] == ['invoices']
+    assert restarted_manager.wait('invoices', timeout=10).model_id == 'invoices'
+    assert read_jobs(state_file_path)['invoices']['status'] == 'succeeded'
@@ -0,0 +1,17 @@
+import json
+from modules.model_evaluation import evaluate_corpus
+from tests import PDFS_DIR
+
+
+def test_fields_without_matches_have_no_mean_scores_and_the_report_is_valid_json():
+    report = evaluate_corpus(PDFS_DIR, ['1.0.0'], max_workers=1)
+
+    # The signature is predicted but not labeled, so no labels were matched.
+    customer_signature = report.fields['1.0.0']['Customer Signature']
+    assert customer_signature['false_positives'] == 1
+    assert customer_signature['mean_iou'] is None
+    assert customer_signature['text_accuracy'] is None
+    assert customer_signature['mean_confidence'] is not None
+    assert json.loads(json.dumps(report.to_dict(), allow_nan=False)) == report.to_dict()
+    customer_signature_row = [line for line in report.format_table().splitlines() if 'Customer Signature ' in line][0]
+    assert customer_signature_row.split()[-3:-1] == ['-', '-']
@@ -0,0 +1,85 @@
+import os
+import shutil
+from modules.model_training_client import (ModelTrainingClient, UploadTrainingDataResult)
+from tests import TRAINING_DATA_DIR
+
+
+def create_client(emulator):
+    client = ModelTrainingClient(emulator.get_settings())
+    client.upload_training_data(TRAINING_DATA_DIR)
+    return client
+
+
+def get_blob_names(emulator):
+    return sorted(emulator.containers['training-data'].keys())
+
+
+def copy_document(source_name, target_dir, target_name, suffixes=('', '.labels.json', '.ocr.json')):
+    os.makedirs(target_dir, exist_ok=True)
+    for suffix in suffixes:
+        shutil.copyfile(os.path.join(TRAINING_DATA_DIR, f"{source_name}{suffix}"),
+                        os.path.join(target_dir, f"{target_name}{suffix}"))
+
+
+def test_delete_training_data_deletes_matching_blobs_in_batches(emulator):
+    client = create_client(emulator)
+
+    result = client.delete_training_data('Invoice_1.pdf')
+
+    assert sorted(result.deleted) == ['Invoice_1.pdf', 'Invoice_1.pdf.labels.json', 'Invoice_1.pdf.ocr.json']
+    assert result.failed == {}
+    assert not any(name.startswith('Invoice_1.pdf') for name in get_blob_names(emulator))
+    assert emulator.reset_stats().get('blob/batch/202') == 3
+
+
+def test_delete_training_data_dry_run_deletes_nothing(emulator):
+    client = create_client(emulator)
+    blob_names = get_blob_names(emulator)
+
+    result = client.delete_training_data('Invoice_2', dry_run=True)
+
+    assert result.matched == ['Invoice_2.pdf', 'Invoice_2.pdf.labels.json', 'Invoice_2.pdf.ocr.json']
+    assert result.deleted == []
+    assert get_blob_names(emulator) == blob_names
+
+
+def test_delete_training_data_reports_each_failed_blob(emulator):
+    client = create_client(emulator)
+    delete_batch = client.__delete_training_data_batch__
+
+    def delete_batch_after_concurrent_delete(blob_names):
+        # Another client deletes one of the matched blobs between the listing and the batch request.
+        emulator.containers['training-data'].pop('Invoice_3.pdf.ocr.json')
+        return delete_batch(blob_names)
+
+    client.__delete_training_data_batch__ = delete_batch_after_concurrent_delete
+    result = client.delete_training_data('Invoice_3')
+
+    assert sorted(result.deleted) == ['Invoice_3.pdf', 'Invoice_3.pdf.labels.json']
+    assert list(result.failed.keys()) == ['Invoice_3.pdf.ocr.json']
+    assert result.failed['Invoice_3.pdf.ocr.json'].startswith('404')
+
+
+def test_upload_skips_a_near_duplicate_of_a_document_only_in_the_container(emulator, tmp_path):
+    client = ModelTrainingClient(emulator.get_settings())
+    copy_document('Invoice_1.pdf', tmp_path / 'uploaded', 'Invoice_1.pdf')
+    client.upload_training_data(str(tmp_path / 'uploaded'))
+    copy_document('Invoice_1.pdf', tmp_path / 'new', 'Invoice_1_rescan.pdf')
+    shutil.copyfile(os.path.join(TRAINING_DATA_DIR, 'Invoice_1.pdf.ocr.json'),
+                    tmp_path / 'new' / 'Invoice_1_rescan.pdf.ocr_1.0.0.json')
+    copy_document('Invoice_3.pdf', tmp_path / 'new', 'Invoice_3.pdf')
+
+    result = client.upload_training_data(str(tmp_path / 'new'), near_duplicate_threshold=0.7)
+
+    assert list(result.near_duplicates.keys()) == ['Invoice_1_rescan.pdf']
+    assert result.near_duplicates['Invoice_1_rescan.pdf']['duplicateOf'] == 'Invoice_1.pdf'
+    assert sorted(result.uploaded) == ['Invoice_3.pdf', 'Invoice_3.pdf.labels.json', 'Invoice_3.pdf.ocr.json']
+    assert not any(name.startswith('Invoice_1_rescan.pdf') for name in get_blob_names(emulator))
+
+
+def test_get_document_name_strips_the_suffixes_of_the_document_files():
+    assert UploadTrainingDataResult.get_document_name('Invoice_1.pdf.labels.json') == 'Invoice_1.pdf'
+    assert UploadTrainingDataResult.get_document_name('Invoice_1.pdf.ocr.json') == 'Invoice_1.pdf'
+    assert UploadTrainingDataResult.get_document_name('Invoice_1.pdf.ocr_1.0.0.json') == 'Invoice_1.pdf'
+    assert UploadTrainingDataResult.get_document_name('Invoice_1.pdf') == 'Invoice_1.pdf'
+    assert UploadTrainingDataResult.get_document_name('fields.json') == 'fields.json'
@@ -0,0 +1,61 @@
+import pytest
+from modules.word_spatial_index import WordSpatialIndex
+
+
+def create_word(content, offset, start_x, start_y, end_x, end_y):
+    return {"content": content, "span": {"offset": offset, "length": len(content)},
+            "polygon": [start_x, start_y, end_x, start_y, end_x, end_y, start_x, end_y]}
+
+
+def create_index():
+    # The words are listed out of reading order, which is given by their span offsets.
+    return WordSpatialIndex({"pages": [{
+        "pageNumber": 1, "width": 10, "height": 10,
+        "words": [
+            create_word('Total', 20, 1, 8, 2, 8.5),
+            create_word('Invoice', 0, 1, 1, 3, 1.5),
+            create_word('INV-1', 8, 3.5, 1, 5, 1.5),
+            create_word('10.00', 26, 7, 8, 8, 8.5)
+        ],
+        "lines": []
+    }]}, cell_size=0.1)
+
+
+def test_query_returns_the_words_within_a_region_in_reading_order():
+    index = create_index()
+
+    words = index.query(1, (0.05, 0.05, 0.55, 0.2))
+
+    assert [word['content'] for word in words] == ['Invoice', 'INV-1']
+    assert index.get_text(1, (0.05, 0.75, 0.9, 0.9)) == 'Total 10.00'
+
+
+def test_query_respects_the_minimum_overlap():
+    index = create_index()
+    # The region covers 40% of the width of INV-1 and all of Invoice.
+    box = (0.1, 0.1, 0.41, 0.15)
+
+    assert [word['content'] for word in index.query(1, box)] == ['Invoice']
+    assert [word['content'] for word in index.query(1, box, min_overlap=0)] == ['Invoice', 'INV-1']
+
+
+def test_query_accepts_a_region_drawn_from_bottom_right_to_top_left():
+    index = create_index()
+
+    assert index.get_text(1, (0.55, 0.2, 0.05, 0.05)) == 'Invoice INV-1'
+
+
+def test_snap_returns_the_union_of_the_words_within_a_region():
+    index = create_index()
+
+    snapped_box = index.snap(1, (0.05, 0.05, 0.55, 0.2))
+
+    assert snapped_box == pytest.approx((0.1, 0.1, 0.5, 0.15))
+
+
+def test_snap_returns_none_without_words_or_pages():
+    index = create_index()
+
+    assert index.snap(1, (0.6, 0.3, 0.9, 0.5)) is None
+    assert index.snap(2, (0, 0, 1, 1)) is None
+    assert index.query(2, (0, 0, 1, 1)) == []